@@ -1,6 +1,6 @@
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
 from mistralai import Mistral
 import json
@@ -13,7 +13,6 @@ from pydantic_settings import BaseSettings
 from functools import lru_cache
 import uvicorn
 from pathlib import Path
-from pptx import Presentation
 from PIL import Image
 import base64
 import io
@@ -26,15 +25,28 @@ import shutil
 import traceback
 import time
 import asyncio
-from config import config
-from utils import load_json, save_json, extract_json
+import subprocess
+import tempfile
+import copy
+from config import config, TTS_CONFIG
+from utils import load_json, save_json, extract_json, canonical_document_id, canonical_document_url
+from workspace import JobWorkspace, create_workspace, open_workspace
+from ocr_cache import ocr_document_async
+from mistral_client import get_mistral_client, close_mistral_clients
+from single_flight import single_flight, flight_key
+from disk_cache import DiskLRUCache
+from slide_stream import SlideStreamParser
+from image_sizing import fit_image_to_placeholder, prepare_images, shutdown_image_pool
+from template_registry import get_template_index, get_layout_details, load_stripped_template, index_templates, TemplateIndex
+from layout_mapper import plan_slide_layouts, layout_summary
+from deck_sections import FIXED_SLIDES, SectionMerger, allocate_section_slides
 from mistralai.client import MistralClient
 # from mistralai.models.chat_completion import ChatMessage
 import random
 from pydub import AudioSegment
-from melo.api import TTS
 import json
-from podcast_api import generate_podcast
+from podcast_api import generate_podcast, start_podcast_stream, get_podcast_stream, podcast_stream_response, start_podcast_job, get_podcast_job
+from tts_registry import warm_up_tts_model, shutdown_tts_pool
 
 from dotenv import load_dotenv
 load_dotenv(override=True)
@@ -46,6 +58,10 @@ class Settings(BaseSettings):
     EXECUTION_AGENT_ID: Optional[str] = None
     MODEL_NAME_OCR: str = "mistral-ocr-latest"
     ENHANCE_AGENT_ID: Optional[str] = None
+    # Decks with at least this many slides are generated section by section in "auto" mode
+    SECTION_PARALLEL_MIN_SLIDES: int = 16
+    # "agent" (LLM only), "refine" (rules draft improved by the LLM) or the opt-in "rules" (local, deterministic)
+    LAYOUT_MAPPER: str = "agent"
     class Config:
         env_file = ".env"
         extra = 'ignore'
@@ -75,12 +91,50 @@ os.makedirs("data/output", exist_ok=True)
 os.makedirs("podcast", exist_ok=True)
 os.makedirs("images", exist_ok=True)
 
+# The event loop only keeps weak references to tasks, so fire-and-forget work is held here until it finishes
+background_tasks = set()
+
+def run_in_background(coro, description: str) -> asyncio.Task:
+    """Start a task that nobody awaits, keeping it alive and logging it if it fails"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+
+    def on_done(done: asyncio.Task):
+        background_tasks.discard(done)
+        if not done.cancelled() and done.exception() is not None:
+            print(f"❌ Background task '{description}' failed: {done.exception()}")
+
+    task.add_done_callback(on_done)
+    return task
+
+@app.on_event("startup")
+async def preload_tts_model():
+    """Warm up the podcast TTS model in the background when TTS_PRELOAD is set"""
+    if TTS_CONFIG["preload"]:
+        run_in_background(
+            asyncio.to_thread(warm_up_tts_model, TTS_CONFIG["language"], TTS_CONFIG["device"]),
+            "TTS warm-up"
+        )
+
+@app.on_event("startup")
+async def preload_template_index():
+    """Index the uploaded templates in the background so the first deck does not pay for parsing them"""
+    run_in_background(asyncio.to_thread(index_templates), "template indexing")
+
+@app.on_event("shutdown")
+async def close_http_pools():
+    """Close the pooled Mistral connections and stop the image and TTS worker processes"""
+    await close_mistral_clients()
+    shutdown_image_pool()
+    shutdown_tts_pool()
+
 # Mount the images directory
 app.mount("/images", StaticFiles(directory="images"), name="images")
 
 # Define models
 class AnalysisResponse(BaseModel):
     prerequisites: dict
+    job_id: Optional[str] = None
 
 class Formula(BaseModel):
     formula: str
@@ -96,6 +150,19 @@ class Slides(BaseModel):
 class Ppt(BaseModel):
     content: List[Slides]
 
+class DeckSection(BaseModel):
+    title: str
+    summary: str
+    num_slides: int
+
+class DeckOutline(BaseModel):
+    title: str
+    subtitle: Optional[str]
+    sections: List[DeckSection]
+
+SLIDE_GENERATION_MODES = ("auto", "single", "sections")
+LAYOUT_MAPPERS = ("rules", "agent", "refine")
+
 
 class Slide(BaseModel):
     slide_name: str
@@ -105,9 +172,20 @@ class PresentationData(BaseModel):
     slides: List[Slide]
 
 
-# Cache for analysis results
-analysis_cache = {}
-formula_cache = {}
+# Prerequisite analyses keyed by (document, student level, model), shared by every job
+analysis_cache = DiskLRUCache(
+    Path(config.CACHE_DIR) / "analysis",
+    max_bytes=int(config.ANALYSIS_CACHE_MAX_MB * 1024 * 1024),
+    suffix=".json"
+)
+
+# Rendered formula PNGs keyed by (formula, dpi, renderer), shared by every job
+formula_cache = DiskLRUCache(
+    Path(config.CACHE_DIR) / "formulas",
+    max_bytes=int(config.FORMULA_CACHE_MAX_MB * 1024 * 1024),
+    suffix=".png"
+)
+FORMULA_RENDERERS = ("latex", "matplotlib")
 
 # Directory for PDFs
 PDF_DIR = "data/upload"
@@ -119,9 +197,53 @@ def isValidArxivUrl(url: str) -> bool:
     pattern = r'^https?://arxiv\.org/(?:abs|pdf)/\d{4}\.\d+(?:v\d+)?(?:\.pdf)?$'
     return re.match(pattern, url) is not None
 
-def generate_cache_key(url, student_level):
+def generate_cache_key(document_id: str, student_level: str, model_name: str) -> str:
     """Generate cache key for analysis results"""
-    return f"{url}_{student_level}"
+    return hashlib.sha256(f"{model_name}|{student_level}|{document_id}".encode("utf-8")).hexdigest()
+
+def load_cached_analysis(key: str) -> Optional[Dict[str, Any]]:
+    """Return cached prerequisites for the key, or None on a miss or an expired entry"""
+    path = analysis_cache.get(key)
+    if path is None:
+        return None
+    try:
+        entry = load_json(path)
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable analysis cache entry {path}: {e}")
+        return None
+    ttl_seconds = config.ANALYSIS_CACHE_TTL_HOURS * 3600
+    if ttl_seconds > 0 and time.time() - entry.get("created_at", 0) > ttl_seconds:
+        path.unlink(missing_ok=True)
+        return None
+    return entry.get("prerequisites")
+
+def save_cached_analysis(key: str, prerequisites: Dict[str, Any], source: str):
+    """Store parsed prerequisites so the same paper and level skip the LLM call next time"""
+    entry = {"created_at": time.time(), "source": source, "prerequisites": prerequisites}
+    try:
+        analysis_cache.put_bytes(key, json.dumps(entry).encode("utf-8"))
+    except Exception as e:
+        print(f"⚠️ Could not cache analysis: {e}")
+
+def write_prerequisites(workspace: JobWorkspace, prerequisites: Dict[str, Any]):
+    """Save the prerequisites where the later pipeline steps of the job look for them"""
+    raw_path = workspace.metadata_dir / "prerequisites_dict.json"
+    raw_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(raw_path, "w") as outfile:
+        outfile.write(json.dumps(prerequisites, indent=4))
+
+def formula_cache_key(formula: str, dpi: int, renderer: str) -> str:
+    """Cache key for a rendered formula image"""
+    return hashlib.sha256(f"{renderer}|{dpi}|{formula.strip()}".encode("utf-8")).hexdigest()
+
+def resolve_workspace(job_id: Optional[str]) -> JobWorkspace:
+    """Open the workspace of an existing job, or the legacy shared one when job_id is empty"""
+    try:
+        return open_workspace(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 def clean_data_folder():
     """Ensure data folder contains only paper.pdf"""
@@ -161,22 +283,27 @@ def parse_prerequisites(text: str) -> dict:
             ]
     return prerequisites
 
-def render_latex_to_image(formula: str, name: str="latex", dpi: int=200) -> str:
+def render_latex_to_image(formula: str, name: str="latex", dpi: int=200, out_dir: Optional[Path]=None) -> str:
     """
     Generate high-quality formula PNG using LaTeX + dvipng.
 
     Args:
     - formula: Raw LaTeX math content, without enclosing $...$.
-    - name: Identifier for the file name; the output will be saved as data/formulas/{name}.png
+    - name: Identifier for the file name; the output will be saved as {out_dir}/{name}.png
     - dpi: Resolution (dots per inch) for the output PNG.
+    - out_dir: Target directory, defaults to data/formulas.
 
     Returns:
     - Path to the generated PNG file.
     """
-    out_dir = Path("data/formulas")
+    out_dir = Path(out_dir) if out_dir else Path("data/formulas")
     out_dir.mkdir(parents=True, exist_ok=True)
     output_path = out_dir / f"{name.replace(' ', '_')}.png"
 
+    # Reuse an earlier render of the same formula, from this or any previous job
+    if copy_cached_formula(formula, dpi, output_path):
+        return str(output_path)
+
     # Sympy.preview will:
     #   1) Write a minimal standalone LaTeX document in a temporary directory
     #   2) Compile it to DVI/PDF using pdflatex
@@ -190,6 +317,7 @@ def render_latex_to_image(formula: str, name: str="latex", dpi: int=200) -> str:
             filename=str(output_path),
             dvioptions=[f"-D{dpi}", "-Ttight"]
         )
+        cache_formula_image(formula, dpi, "latex", output_path)
         return str(output_path)
     except Exception as e:
         print(f"❌ render_latex_to_image failed，back to Matplotlib: {e}")
@@ -202,11 +330,32 @@ def render_latex_to_image(formula: str, name: str="latex", dpi: int=200) -> str:
         fig.text(0.5, 0.5, f"${formula}$", ha='center', va='center', fontsize=20)
         plt.savefig(output_path, dpi=dpi, bbox_inches='tight', pad_inches=0.1, transparent=True)
         plt.close(fig)
+        cache_formula_image(formula, dpi, "matplotlib", output_path)
         return str(output_path)
     except Exception as e2:
         print(f"⚠️ Matplotlib also failed：{e2}")
         return ""
 
+def copy_cached_formula(formula: str, dpi: int, output_path: Path) -> bool:
+    """Copy a cached render of the formula to output_path, returning False on a miss"""
+    for renderer in FORMULA_RENDERERS:
+        cached_path = formula_cache.get(formula_cache_key(formula, dpi, renderer))
+        if cached_path is not None:
+            try:
+                shutil.copyfile(cached_path, output_path)
+                return True
+            except FileNotFoundError:
+                # Evicted between lookup and copy
+                return False
+    return False
+
+def cache_formula_image(formula: str, dpi: int, renderer: str, image_path: Path):
+    """Store a freshly rendered formula in the persistent formula cache"""
+    try:
+        formula_cache.put(formula_cache_key(formula, dpi, renderer), image_path)
+    except Exception as e:
+        print(f"⚠️ Could not cache formula image {image_path}: {e}")
+
 # # Function to render LaTeX formulas as images
 # def render_latex_to_image(formula, name="latex"):
 #     """Render LaTeX formula to image using matplotlib"""
@@ -255,6 +404,93 @@ def render_latex_to_image(formula: str, name: str="latex", dpi: int=200) -> str:
 #             print(f"❌ Error rendering formula '{name}': {str(e)}")
 #             return ""
 
+# Same preamble as sympy.preview, with every formula on its own page
+BATCH_LATEX_PREAMBLE = r"""\documentclass[varwidth,12pt,multi=formula]{standalone}
+\usepackage{amsmath,amsfonts}
+\newenvironment{formula}{$}{$}
+\begin{document}
+"""
+
+def render_formulas_batch(formulas: List[tuple], dpi: int=200, out_dir: Optional[Path]=None) -> Dict[str, str]:
+    """
+    Render many formulas with a single latex run and a single dvipng run.
+
+    If the batch run fails (one bad formula aborts it), each formula is compiled
+    on its own so the others are still rendered.
+
+    Args:
+    - formulas: List of (formula, name) tuples, formulas without enclosing $...$.
+    - dpi: Resolution (dots per inch) for the output PNGs.
+    - out_dir: Target directory, defaults to data/formulas.
+
+    Returns:
+    - Dict mapping each successfully rendered name to its PNG path. Names missing
+      from the result should be rendered one by one with render_latex_to_image.
+    """
+    out_dir = Path(out_dir) if out_dir else Path("data/formulas")
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    results = {}
+    pending = {}  # formula -> [(name, output_path)], so duplicates are compiled once
+    for formula, name in formulas:
+        output_path = out_dir / f"{name.replace(' ', '_')}.png"
+        if copy_cached_formula(formula, dpi, output_path):
+            results[name] = str(output_path)
+        else:
+            pending.setdefault(formula, []).append((name, output_path))
+
+    if not pending:
+        return results
+    if shutil.which("latex") is None or shutil.which("dvipng") is None:
+        print("⚠️ latex/dvipng not found, skipping batch formula rendering")
+        return results
+
+    unique_formulas = list(pending)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        try:
+            pages = compile_formula_pages(tmp_path, "formulas", unique_formulas, dpi)
+        except Exception as e:
+            # -halt-on-error stops the whole run at the first bad formula, so no page of this batch
+            # can be trusted; compile each formula on its own to keep the good ones
+            print(f"⚠️ Batch LaTeX compilation failed, compiling formulas one at a time: {e}")
+            pages = []
+            for number, formula in enumerate(unique_formulas):
+                try:
+                    pages.extend(compile_formula_pages(tmp_path, f"formula_{number}", [formula], dpi))
+                except Exception as single_error:
+                    print(f"⚠️ Could not compile formula '{formula[:30]}': {single_error}")
+                    pages.append(None)
+
+        for formula, page_path in zip(unique_formulas, pages):
+            if page_path is None or not page_path.exists():
+                continue
+            cache_formula_image(formula, dpi, "latex", page_path)
+            for name, output_path in pending[formula]:
+                shutil.copyfile(page_path, output_path)
+                results[name] = str(output_path)
+
+    return results
+
+def compile_formula_pages(tmp_path: Path, stem: str, formulas: List[str], dpi: int) -> List[Path]:
+    """
+    Compile formulas into one PNG page each with one latex run and one dvipng run.
+
+    Raises if latex or dvipng fails; with -halt-on-error one bad formula fails the
+    whole run, so the caller decides how to isolate it.
+    """
+    body = "\n".join(f"\\begin{{formula}}{formula}\\end{{formula}}" for formula in formulas)
+    (tmp_path / f"{stem}.tex").write_text(f"{BATCH_LATEX_PREAMBLE}{body}\n\\end{{document}}\n", encoding="utf-8")
+    subprocess.run(
+        ["latex", "-halt-on-error", "-interaction=nonstopmode", f"{stem}.tex"],
+        cwd=tmp_path, check=True, capture_output=True, timeout=120
+    )
+    subprocess.run(
+        ["dvipng", f"-D{dpi}", "-Ttight", "-o", f"{stem}_%d.png", f"{stem}.dvi"],
+        cwd=tmp_path, check=True, capture_output=True, timeout=120
+    )
+    return [tmp_path / f"{stem}_{page}.png" for page in range(1, len(formulas) + 1)]
+
 # Directory cleaning function
 def clean_directories(directories=None):
     """
@@ -292,7 +528,7 @@ def clean_directories(directories=None):
     print(f"✅ Directory cleaning completed in {elapsed:.2f}s")
 
 # Parallel formula processing
-def process_formulas_parallel(slides_data):
+def process_formulas_parallel(slides_data, out_dir: Optional[Path]=None):
     """Process all formulas in slides data in parallel for better performance"""
     formula_tasks = []
     
@@ -311,25 +547,1052 @@ def process_formulas_parallel(slides_data):
         for formula, name, item in formula_tasks[:3]:  # Print first 3 for debugging
             print(f"  - Formula: '{name}' -> '{formula[:30]}...'")
         start_time = time.time()
-        print(f"🧮 Processing {len(formula_tasks)} formulas in parallel")
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(formula_tasks))) as executor:
-            futures = {executor.submit(render_latex_to_image, formula, name): (formula, name, item) 
-                    for formula, name, item in formula_tasks}
-            
-            for future in concurrent.futures.as_completed(futures):
-                _, _, item = futures[future]
-                try:
-                    image_filename = future.result()
-                    item["formula"] = image_filename
-                except Exception as e:
-                    print(f"❌ Error processing formula: {e}")
+        # Compile the whole deck in one TeX run, then render whatever it could not handle one by one
+        batch_results = render_formulas_batch([(formula, name) for formula, name, _ in formula_tasks], out_dir=out_dir)
+        remaining_tasks = []
+        for formula, name, item in formula_tasks:
+            if name in batch_results:
+                item["formula"] = batch_results[name]
+            else:
+                remaining_tasks.append((formula, name, item))
+        print(f"⚡ {len(formula_tasks) - len(remaining_tasks)} formulas rendered in batch")
+        
+        if remaining_tasks:
+            print(f"🧮 Processing {len(remaining_tasks)} formulas in parallel")
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(remaining_tasks))) as executor:
+                futures = {executor.submit(render_latex_to_image, formula, name, out_dir=out_dir): (formula, name, item) 
+                        for formula, name, item in remaining_tasks}
+                
+                for future in concurrent.futures.as_completed(futures):
+                    _, _, item = futures[future]
+                    try:
+                        image_filename = future.result()
+                        item["formula"] = image_filename
+                    except Exception as e:
+                        print(f"❌ Error processing formula: {e}")
         
         elapsed = time.time() - start_time
         print(f"✅ Formula processing completed in {elapsed:.2f}s")
     
     return slides_data 
 
+# Pipeline stages
+# Each stage is a plain function shared by the single-step endpoints and /pipeline/run.
+def resolve_template_path(template_name: str) -> Path:
+    """Find a template in data/upload, trying an exact then a case-insensitive file name match"""
+    upload_dir = Path("data/upload")
+    
+    # Try exact match first
+    exact_match = upload_dir / template_name
+    if exact_match.exists():
+        print(f"📌 Using exact template match: {template_name}")
+        return exact_match
+    
+    # Try case-insensitive matching
+    for file in upload_dir.glob("*.pptx"):
+        if file.name.lower() == template_name.lower():
+            print(f"📌 Found template with case-insensitive match: {file.name}")
+            return file
+    
+    raise HTTPException(
+        status_code=400, 
+        detail=f"Template file {template_name} not found. Available templates: {', '.join([f.name for f in upload_dir.glob('*.pptx')])}"
+    )
+
+def extract_layout_details(template_path: Path, workspace: JobWorkspace) -> List[dict]:
+    """Read every layout and its placeholders from the template index and save layout_details.json"""
+    layout_details = get_layout_details(template_path)
+
+    # Convert to JSON string and write to file
+    layout_details_json = json.dumps(layout_details, indent=4)
+
+    output_dir = workspace.metadata_dir
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = output_dir / "layout_details.json"
+
+    with open(output_file, "w") as file:
+        file.write(layout_details_json)
+
+    return layout_details
+
+def convert_layout_placeholders(layout_details: List[dict], workspace: JobWorkspace) -> List[dict]:
+    """Turn layout details into name_index placeholder keys and save processed_layout.json"""
+    layout_list = layout_placeholder_keys(layout_details)
+
+    # Save processed layout to JSON
+    raw_path = workspace.metadata_dir
+    os.makedirs(raw_path, exist_ok=True)
+    output_path = raw_path / "processed_layout.json"
+    save_json(layout_list, output_path)
+    return layout_list
+
+def layout_placeholder_keys(layout_details: List[dict]) -> List[dict]:
+    """The processed_layout.json structure: each layout with its placeholders as name_index keys"""
+    layout_list = []
+    for single_layout_details in layout_details:
+        layout_name = single_layout_details["name"]
+        layout_dict = {}
+        layout_dict["slide_name"] = layout_name
+        
+        placeholderlist = []
+        for placeholder in single_layout_details["placeholders"]:
+            placeholderdict = {}
+            placeholderdict["name"] = placeholder["name"] + "_" + str(placeholder["index"])
+            placeholderlist.append(placeholderdict)
+
+        layout_dict["placeholders"] = placeholderlist
+        layout_list.append(layout_dict)
+    return layout_list
+
+async def run_figure_ocr(client: Mistral, settings: Settings, document_url: str):
+    """OCR a document URL including the base64 page images, going through the shared OCR cache"""
+    print(f"🔍 Performing OCR on URL: {document_url}")
+    return await ocr_document_async(
+        client,
+        document_url=document_url,
+        model=settings.MODEL_NAME_OCR,
+        include_image_base64=True
+    )
+
+def save_figures(ocr_response: dict, workspace: JobWorkspace) -> dict:
+    """Decode the images of an OCR response into the figures folder and save figures_metadata.json"""
+    output_folder = workspace.figures_dir
+    os.makedirs(output_folder, exist_ok=True)
+    figures_metadata = {}
+
+    for page in ocr_response.get("pages", []):
+        page_index = page.get("index")
+        markdown = page.get("markdown", "")
+        images = page.get("images", [])
+
+        for i, image in enumerate(images):
+            image_id = image.get("id", f"figure_{page_index}_{i}.jpeg")
+            img_data = image.get("image_base64")
+
+            if img_data:
+                if ',' in img_data:
+                    img_data = img_data.split(',', 1)[1]
+
+                img_bytes = base64.b64decode(img_data)
+                img = Image.open(io.BytesIO(img_bytes))
+
+                image_filename = os.path.basename(image_id)
+                save_path = output_folder / image_filename
+
+                img.save(save_path)
+
+                figure_key = extract_figure_tag(markdown, image_id) or f"Figure_{page_index}_{i}"
+                figures_metadata[figure_key] = str(save_path)
+
+    metadata_path = output_folder / "figures_metadata.json"
+    with open(metadata_path, "w") as meta_file:
+        json.dump(figures_metadata, meta_file, indent=4)
+
+    print(f"✅ Saved {len(figures_metadata)} figures")
+    return figures_metadata
+
+def load_prerequisites(workspace: JobWorkspace, selected_topics: List[str], required: bool = True) -> dict:
+    """Load the analyzed prerequisites of a job, filtered down to the selected topics"""
+    prerequisites_path = workspace.metadata_dir / "prerequisites_dict.json"
+    if not prerequisites_path.exists():
+        if not required:
+            print("⚠️ No prerequisites found, using the whole paper")
+            return {}
+        raise HTTPException(
+            status_code=404, 
+            detail="Prerequisites data not found. Please run analyze/url or analyze/pdf first."
+        )
+        
+    try:
+        prerequisites_dict = load_json(prerequisites_path)
+        print(f"✅ Loaded prerequisites with {len(prerequisites_dict)} topics")
+    except Exception as e:
+        print(f"❌ Error loading prerequisites: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to load prerequisites data: {str(e)}")
+    
+    # Filter prerequisites based on selected topics
+    if selected_topics:
+        filtered_prerequisites = {topic: prerequisites_dict[topic] 
+                                for topic in selected_topics 
+                                if topic in prerequisites_dict}
+        print(f"🔍 Filtered prerequisites down to {len(filtered_prerequisites)} selected topics")
+    else:
+        filtered_prerequisites = prerequisites_dict
+        print("⚠️ No topics selected, using all prerequisite topics")
+    return filtered_prerequisites
+
+def build_slide_prompt(student_level: str, num_slides: int, filtered_prerequisites: dict) -> str:
+    """Build the slide outline prompt, restricted to the selected prerequisite topics if any"""
+    slide_prompt_1 = f"""Analyze this research paper and create a structured outline for a PowerPoint presentation tailored for a {student_level} audience, where student_level is either 'PhD researcher', 'Master's student', or 'Undergrad student'. Follow these guidelines:
+
+Pictures should only contain figure number, example (figure 2)
+
+Important: Once a formula is shown do not use it again
+
+CONSIDER Pictures AND FORMULA AS IMAGES
+
+DO NOT KEEP IMAGE/Pictures AND FORMULA IN SAME SLIDE
+
+Total slides should be : {num_slides} **Always follow this, must not be more than this**
+
+Title Slide: Create a concise, engaging title that captures the paper's essence.
+
+This is the first slide and a catchy subtitle. Bullets must be empty in this
+
+Agenda slide: The second slide which contains all subtitles of other slides as its bullet points
+
+Then State the paper's main research question and significance
+
+This acts like the title
+
+Highlight key background information relevant to the {student_level} audience
+
+For each section of the paper:
+
+Create 'Section Overview' slide with:
+
+Section title: bullet points summarizing key concepts in content
+
+Any critical formulas, using LaTeX notation
+
+Followed with in depth explanation slides that only if necessary and also break each point in section overview into one slide explaining in depth:
+
+Explain complex ideas using analogies or visualizations
+
+Break down important formulas step-by-step
+
+Highlight connections to prerequisite knowledge for the {student_level}
+
+Do this for all the chosen topics
+
+Make sure to
+
+Present key findings with supporting data or graphs
+
+Interpret results at a level appropriate for the {student_level}
+
+With great amount of details not missing any key information
+
+Discussion & Implications (1-2 slides):
+
+Outline the paper's main conclusions
+
+Discuss potential applications or future research directions
+
+Relate findings to broader field context for the {student_level}
+
+Key Takeaways slide:
+
+List 3-5 main points to remember, tailored to the {student_level}'s level
+
+Further Reading slide:
+
+Suggest 3-4 related papers or resources appropriate for the {student_level}
+
+For each slide, provide:
+
+A clear, concise headline as the subtitle
+
+Bullet points for main content (5-7 per slide)
+
+Notes on any visuals, charts, or diagrams to include from the paper mention the figure number
+
+Adjust the depth and complexity of the content based on the {student_level}, ensuring the presentation is informative and engaging for the specified audience level.
+
+Make sure to include the mathematical formulas where ever necessary
+
+Give the output in a json format and a dictionary tagging formuala and its name in json
+"""
+    
+    # Create slide prompt
+    slide_prompt_2 = f"""Analyze this research paper and create a structured outline for a PowerPoint presentation tailored for a {student_level} audience, where student_level is either 'PhD researcher', 'Master's student', or 'Undergrad student'. Follow these guidelines:
+
+Pictures should only contain figure number, example (figure 2)
+
+ONLY INCLUDE THE TOPICS IN {filtered_prerequisites} FOR THE SLIDES
+
+Important: Once a formula is shown do not use it again
+
+CONSIDER Pictures AND FORMULA AS IMAGES
+
+DO NOT KEEP IMAGE/Pictures AND FORMULA IN SAME SLIDE
+
+Total slides should be : {num_slides} **Always follow this, must not be more than this**
+
+Title Slide: Create a concise, engaging title that captures the paper's essence.
+
+This is the first slide and a catchy subtitle. Bullets must be empty in this
+
+Agenda slide: The second slide which contains all subtitles of other slides as its bullet points
+
+Then State the paper's main research question and significance
+
+This acts like the title
+
+Highlight key background information relevant to the {student_level} audience
+
+For each section of the paper:
+
+Create 'Section Overview' slide with:
+
+Section title: bullet points summarizing key concepts in content
+
+Any critical formulas, using LaTeX notation
+
+Followed with in depth explanation slides that only if necessary and also break each point in section overview into one slide explaining in depth:
+
+Explain complex ideas using analogies or visualizations
+
+Break down important formulas step-by-step
+
+Highlight connections to prerequisite knowledge for the {student_level}
+
+Do this for all the chosen topics
+
+Make sure to
+
+Present key findings with supporting data or graphs
+
+Interpret results at a level appropriate for the {student_level}
+
+With great amount of details not missing any key information
+
+Discussion & Implications (1-2 slides):
+
+Outline the paper's main conclusions
+
+Discuss potential applications or future research directions
+
+Relate findings to broader field context for the {student_level}
+
+Key Takeaways slide:
+
+List 3-5 main points to remember, tailored to the {student_level}'s level
+
+Further Reading slide:
+
+Suggest 3-4 related papers or resources appropriate for the {student_level}
+
+For each slide, provide:
+
+A clear, concise headline as the subtitle
+
+Bullet points for main content (5-7 per slide)
+
+Notes on any visuals, charts, or diagrams to include from the paper mention the figure number
+
+Adjust the depth and complexity of the content based on the {student_level}, ensuring the presentation is informative and engaging for the specified audience level.
+
+Make sure to include the mathematical formulas where ever necessary
+
+Give the output in a json format and a dictionary tagging formuala and its name in json
+"""        
+    if len(filtered_prerequisites) == 0:
+        slide_prompt = slide_prompt_1
+    else:
+        slide_prompt = slide_prompt_2
+    return slide_prompt
+
+async def generate_slide_data(
+    client: Mistral,
+    settings: Settings,
+    workspace: JobWorkspace,
+    student_level: str,
+    document_url: str,
+    num_slides: int,
+    filtered_prerequisites: dict
+) -> dict:
+    """Generate the deck content with the LLM and save it as slides_data.json"""
+    messages = build_slide_messages(student_level, document_url, num_slides, filtered_prerequisites)
+
+    api_start = time.time()
+    print("📞 Calling Mistral API for slide generation...")
+    try:
+        chat_response = await client.chat.parse_async(
+            model=settings.MODEL_NAME,
+            messages=messages,
+            response_format=Ppt
+        )
+        api_time = time.time() - api_start
+        print(f"✅ API call completed in {api_time:.2f}s")
+        
+        slides = chat_response.choices[0].message.content
+    except Exception as e:
+        print(f"❌ Error in Mistral API call: {e}")
+        # Still rate limited after the client-side retries: report 429 so callers back off instead of seeing a 500
+        status_code = 429 if getattr(e, "status_code", None) == 429 else 500
+        raise HTTPException(status_code=status_code, detail=f"Error generating slides content: {str(e)}")
+    
+    slides_data = json.loads(slides) if isinstance(slides, str) else slides
+    save_slide_data(slides_data, workspace)
+    return slides_data
+
+def build_slide_messages(student_level: str, document_url: str, num_slides: int, filtered_prerequisites: dict) -> List[dict]:
+    """Chat messages asking for the deck content of a paper"""
+    return build_document_messages(build_slide_prompt(student_level, num_slides, filtered_prerequisites), document_url)
+
+def build_document_messages(prompt: str, document_url: str) -> List[dict]:
+    """A single user message with a prompt and the paper attached"""
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": prompt
+                },
+                {
+                    "type": "document_url",
+                    "document_url": document_url
+                }
+            ]
+        }
+    ]
+
+def save_slide_data(slides_data: dict, workspace: JobWorkspace):
+    input_slides_path = workspace.metadata_dir / "slides_data.json"
+    try:
+        save_json(slides_data, input_slides_path)
+        print(f"✅ Saved slides data to {input_slides_path}")
+    except Exception as e:
+        print(f"❌ Error saving slides data: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to save slides data: {str(e)}")
+
+async def stream_slide_data(
+    client: Mistral,
+    settings: Settings,
+    workspace: JobWorkspace,
+    student_level: str,
+    document_url: str,
+    num_slides: int,
+    filtered_prerequisites: dict
+):
+    """
+    Streaming variant of generate_slide_data.
+
+    Yields each slide dict as soon as the LLM has finished writing it, and
+    saves the complete deck as slides_data.json once the stream ends, so the
+    later steps read exactly what generate_slide_data would have written.
+    """
+    messages = build_slide_messages(student_level, document_url, num_slides, filtered_prerequisites)
+    parser = SlideStreamParser()
+    streamed_slides = []
+
+    api_start = time.time()
+    print("📞 Streaming slide generation from Mistral API...")
+    try:
+        stream = await client.chat.parse_stream_async(
+            model=settings.MODEL_NAME,
+            messages=messages,
+            response_format=Ppt
+        )
+        async with stream as events:
+            async for event in events:
+                if not event.data.choices:
+                    continue
+                content = event.data.choices[0].delta.content
+                if not isinstance(content, str):
+                    continue
+                for slide in parser.feed(content):
+                    if not streamed_slides:
+                        print(f"⚡ First slide ready after {time.time() - api_start:.2f}s")
+                    streamed_slides.append(slide)
+                    yield slide
+        print(f"✅ Streamed {len(streamed_slides)} slides in {time.time() - api_start:.2f}s")
+    except Exception as e:
+        print(f"❌ Error in Mistral API call: {e}")
+        status_code = 429 if getattr(e, "status_code", None) == 429 else 500
+        raise HTTPException(status_code=status_code, detail=f"Error generating slides content: {str(e)}")
+
+    try:
+        slides_data = parser.result()
+    except ValueError:
+        # Keep the slides that did arrive complete rather than losing the whole deck
+        print(f"⚠️ Streamed deck was not valid JSON, keeping {len(streamed_slides)} complete slides")
+        slides_data = {"content": streamed_slides}
+    save_slide_data(slides_data, workspace)
+
+def prerender_formulas(slides: List[dict], out_dir: Path):
+    """Render the formulas of some slides ahead of the formula stage, which then finds them in the formula cache"""
+    slides = [copy.deepcopy(slide) for slide in slides if slide.get("formula_images")]
+    if slides:
+        process_formulas_parallel({"content": slides}, out_dir=out_dir)
+
+class FormulaPrerenderer:
+    """
+    Render formulas of streamed slides in the background, one batch at a time.
+
+    A single worker drains the queue: every slide that arrived while the
+    previous batch was rendering goes into the next TeX run, so at most one
+    rendering thread is busy per stream and slides still share batch runs.
+    """
+
+    def __init__(self, out_dir: Path):
+        self.out_dir = out_dir
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.worker = asyncio.create_task(self._run())
+
+    def submit(self, slide: dict):
+        self.queue.put_nowait(slide)
+
+    async def _run(self):
+        finished = False
+        while not finished:
+            batch = [await self.queue.get()]
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            # None marks the end of the stream
+            finished = None in batch
+            slides = [slide for slide in batch if slide is not None]
+            if not slides:
+                continue
+            try:
+                await asyncio.to_thread(prerender_formulas, slides, self.out_dir)
+            except Exception as e:
+                print(f"⚠️ Formula pre-rendering failed: {e}")
+
+    async def finish(self):
+        """Wait until every submitted slide has been rendered"""
+        self.queue.put_nowait(None)
+        await self.worker
+
+    async def close(self):
+        """Stop the worker if the stream ended early; a batch already in its thread still runs to completion"""
+        if not self.worker.done():
+            self.worker.cancel()
+        try:
+            await self.worker
+        except asyncio.CancelledError:
+            pass
+
+async def generate_slide_data_streaming(
+    client: Mistral,
+    settings: Settings,
+    workspace: JobWorkspace,
+    student_level: str,
+    document_url: str,
+    num_slides: int,
+    filtered_prerequisites: dict
+) -> dict:
+    """Same result as generate_slide_data, with formula rendering overlapping the rest of the LLM output"""
+    prerenderer = FormulaPrerenderer(workspace.formulas_dir)
+    try:
+        async for slide in stream_slide_data(client, settings, workspace, student_level, document_url, num_slides, filtered_prerequisites):
+            prerenderer.submit(slide)
+        await prerenderer.finish()
+    finally:
+        await prerenderer.close()
+    return load_json(workspace.metadata_dir / "slides_data.json")
+
+def attach_figures(slides_data: dict, image_data: dict) -> dict:
+    """Replace figure references such as 'figure 2' with the saved figure paths"""
+    for slide in slides_data.get("content", []):
+        if "picture" in slide and slide["picture"]:
+            for i in range(len(slide["picture"])):
+                key = slide["picture"][i].capitalize()
+                if key in image_data:
+                    slide["picture"][i] = image_data[key]
+                else:
+                    print(f"⚠️ Warning: Missing image data for key '{key}'")
+                    slide["picture"][i] = ""
+    return slides_data
+
+async def enhance_slides(client: Mistral, settings: Settings, slides_data: dict):
+    """
+    Ask the enhance agent to enrich the slides.
+
+    Returns:
+    - (enhanced slides data or None when the agent output is unusable, status message)
+    """
+    execution_agent_id = settings.ENHANCE_AGENT_ID
+    if not settings.ENHANCE_AGENT_ID:
+            print("⚠️ EXECUTION_AGENT_ID not found, falling back to standard chat completion")
+    query=f"""
+Understand the current slides data as provided:
+{slides_data}
+
+And more data to the slides and maintain the same json format as the output
+
+For slides with formulas, explain them in technical terms rather than giving examples of usage
+"""
+    async def run_analysis_execution_agent(query):
+        """
+        Sends a user query to a Python agent and returns the response.
+
+        Args:
+            query (str): The user query to be sent to the Python agent.
+
+        Returns:
+            str: The response content from the Python agent.
+        """
+        try:
+            response = await client.agents.complete_async(
+                agent_id= execution_agent_id,
+                messages = [
+                    {
+                        "role": "user",
+                        "content":  query
+                    },
+                ],
+                # response_format=Ppt
+            )
+            result = response.choices[0].message.content
+            return result
+        except Exception as e:
+            # Reached only after the shared client has exhausted its retries
+            print(f"Request failed: {e}. Please check your request.")
+            return None
+        
+    
+    enhance_agent = await run_analysis_execution_agent(query)
+    
+    # Add validation to prevent saving null data
+    try:
+        data = extract_json(enhance_agent)
+        
+        # Validate the data is not null/empty and has expected structure
+        if data is None:
+            print("⚠️ Warning: Agent returned null data. Not updating slides.")
+            return None, "Agent returned null data. Original slides kept unchanged."
+            
+        # Check if data has expected structure (content array)
+        if not isinstance(data, dict) or 'content' not in data or not isinstance(data['content'], list) or len(data['content']) == 0:
+            print("⚠️ Warning: Agent returned invalid data format. Not updating slides.")
+            print(f"Data structure received: {type(data)}")
+            return None, "Agent returned invalid data format. Original slides kept unchanged."
+            
+        # Verify content has some expected fields
+        sample_slide = data['content'][0]
+        required_fields = ['title', 'subtitle']
+        missing_fields = [field for field in required_fields if field not in sample_slide]
+        
+        if missing_fields:
+            print(f"⚠️ Warning: Agent output is missing required fields: {missing_fields}. Not updating slides.")
+            return None, f"Agent output is missing required fields: {missing_fields}. Original slides kept unchanged."
+        
+        print(f"✅ Agent returned valid data with {len(data['content'])} slides")
+        return data, "Slides data enhanced and saved successfully"
+    except Exception as e:
+        print(f"❌ Error processing agent output: {str(e)}")
+        traceback.print_exc()
+        return None, f"Error enhancing slides: {str(e)}. Original slides kept unchanged."
+
+
+async def map_slide_layouts(
+    client: Mistral,
+    settings: Settings,
+    slides_data: dict,
+    distinct_layout: List[str],
+    slides_layout: List[dict],
+    draft: Optional[dict] = None
+) -> dict:
+    """Ask the execution agent (or the chat model as a fallback) to map each slide onto a template layout"""
+    query=f"""
+        Understand the current slides data as provided:
+        {slides_data}
+
+        Now create a new json with layouts chosen from {distinct_layout} for each of the slide. The json contains the placeholders.name_placeholders.index from {slides_layout} as the key and the content as the values.
+
+        Using the fields in the slides data namely title, subtitle, text, formula_images and picture to the placeholder of the layout selected for the slide.
+
+        Give new titles for each slide and remove the subtitle
+
+        Treat both formulas and pictures as images when assigning the layout
+
+        If the content has bullet points, then be creative in choosing layouts which contain texts and title type
+
+        Always add the layout name in the json chosen from the {distinct_layout}
+
+        Add \ n in the placeholders to create new lines
+
+        ## Do not add your own custom placeholders in the slide layout, use only the ones provided in the layout_details.json
+
+        ##final output must in JSON only"""
+    if draft:
+        query += f"""
+
+        A rule-based draft mapping already exists:
+        {draft}
+
+        Start from it: keep its layouts and placeholder keys unless another layout from {distinct_layout} clearly fits the content better, and improve the titles and wording"""
+    
+    # Check if EXECUTION_AGENT_ID is available
+    if not settings.EXECUTION_AGENT_ID:
+        print("⚠️ EXECUTION_AGENT_ID not found, falling back to standard chat completion")
+        # Fallback to standard chat completion
+        response = await client.chat.complete_async(
+            model=settings.MODEL_NAME,
+            messages=[{"role": "user", "content": query}],
+            # response_format=PresentationData
+        )
+        agent_result = response.choices[0].message.content
+    else:
+        try:
+            print(f"🤖 Using execution agent ID: {settings.EXECUTION_AGENT_ID}")
+            response = await client.agents.complete_async(
+                agent_id=settings.EXECUTION_AGENT_ID,
+                messages=[{"role": "user", "content": query}],
+                # response_format=PresentationData
+            )
+            agent_result = response.choices[0].message.content
+        except Exception as agent_error:
+            print(f"⚠️ Agent execution failed, falling back to standard chat: {agent_error}")
+            # Fallback to standard chat completion
+            response = await client.chat.complete_async(
+                model=settings.MODEL_NAME,
+                messages=[{"role": "user", "content": query}],
+                # response_format=PresentationData
+            )
+            agent_result = response.choices[0].message.content
+    
+    print("Got the agent Response")
+
+    execution_agent_json = extract_json(agent_result)
+    
+    if not execution_agent_json:
+        raise HTTPException(status_code=400, detail="Failed to extract valid JSON from agent response")
+        
+    # Ensure the execution_agent_json has the required structure
+    if "slides" not in execution_agent_json:
+        print("⚠️ Adding missing 'slides' key to execution_agent_json")
+        execution_agent_json = {"slides": execution_agent_json}
+        
+    if len(execution_agent_json["slides"]) == 0:
+        raise HTTPException(status_code=400, detail="Generated JSON contains no slides")
+        
+    # Validate the structure
+    for slide in execution_agent_json["slides"]:
+        if "slide_name" not in slide:
+            raise HTTPException(status_code=400, detail=f"Missing slide_name in slide: {slide}")
+        if slide["slide_name"] not in distinct_layout:
+            print(f"⚠️ Warning: Slide layout '{slide['slide_name']}' not found in template layouts")
+        if "placeholders" not in slide:
+            raise HTTPException(status_code=400, detail=f"Missing placeholders in slide: {slide}")
+
+    return execution_agent_json
+
+
+async def choose_slide_layouts(
+    client: Mistral,
+    settings: Settings,
+    slides_data: dict,
+    template_index: TemplateIndex,
+    processed_layout: List[dict],
+    mapper: Optional[str] = None
+) -> dict:
+    """
+    Map every slide onto a template layout with the selected mapper.
+
+    "rules" scores the template's layouts locally (milliseconds, deterministic),
+    "agent" asks the LLM as before, and "refine" hands the rule-based mapping
+    to the LLM as a draft, keeping the draft if the LLM call fails. "rules"
+    falls back to "refine" when some slide's images have no placeholder to go
+    into, so no figure or formula is silently dropped.
+    """
+    mapper = mapper or settings.LAYOUT_MAPPER
+    if mapper not in LAYOUT_MAPPERS:
+        raise HTTPException(status_code=400, detail=f"Invalid layout mapper {mapper}. Choose one of: {', '.join(LAYOUT_MAPPERS)}")
+    if mapper == "agent":
+        return await map_slide_layouts(client, settings, slides_data, template_index.layout_names, processed_layout)
+
+    draft, incomplete = plan_slide_layouts(slides_data, template_index)
+    print(f"📐 Rule-based layouts: {layout_summary(draft)}")
+    if mapper == "rules":
+        if not incomplete:
+            return draft
+        print(f"⚠️ Images do not fit on slides {[index + 1 for index in incomplete]}, refining the layouts with the LLM")
+    try:
+        return await map_slide_layouts(client, settings, slides_data, template_index.layout_names, processed_layout, draft=draft)
+    except Exception as e:
+        print(f"⚠️ Layout refinement failed, keeping the rule-based mapping: {e}")
+        return draft
+
+PPTX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+
+def resolve_formula_image_path(content: str, workspace: JobWorkspace) -> str:
+    """Full path of a formula image referenced by a placeholder"""
+    if not os.path.exists(content) and not content.startswith("data/"):
+        return str(workspace.formulas_dir / os.path.basename(content))
+    return content
+
+def resolve_picture_path(pic_path: str, workspace: JobWorkspace) -> str:
+    """Full path of a figure or formula image referenced by a picture placeholder"""
+    if not os.path.exists(pic_path) and not pic_path.startswith("data/"):
+        if "formula" in pic_path.lower():
+            return str(workspace.formulas_dir / os.path.basename(pic_path))
+        elif "figure" in pic_path.lower() or "img" in pic_path.lower():
+            return str(workspace.figures_dir / os.path.basename(pic_path))
+    return pic_path
+
+def insert_image(slide, shape, image_path):
+    """
+    Put an image into a placeholder.
+
+    Picture placeholders crop the image to fill their frame. Other placeholders
+    (content/OBJECT) have no insert_picture, so the image is scaled to fit
+    inside the placeholder's frame, centred, and the empty placeholder removed.
+    """
+    if hasattr(shape, "insert_picture"):
+        return shape.insert_picture(image_path)
+    left, top, width, height = shape.left, shape.top, shape.width, shape.height
+    picture = slide.shapes.add_picture(image_path, left, top)
+    scale = min(width / picture.width, height / picture.height)
+    picture.width = int(picture.width * scale)
+    picture.height = int(picture.height * scale)
+    picture.left = left + (width - picture.width) // 2
+    picture.top = top + (height - picture.height) // 2
+    shape._element.getparent().remove(shape._element)
+    return picture
+
+def collect_image_jobs(json_data: dict, template_index, workspace: JobWorkspace) -> List[tuple]:
+    """Every (image path, placeholder width, placeholder height) the execution agent JSON will embed"""
+    jobs = set()
+    for slide_data in json_data.get("slides", []):
+        layout_name = slide_data.get("layout") or slide_data.get("slide_name")
+        for placeholder_name, content in (slide_data.get("placeholders") or {}).items():
+            if not isinstance(content, str) or not content.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            try:
+                idx = int(placeholder_name.split("_")[-1])
+            except ValueError:
+                continue
+            geometry = template_index.placeholder(layout_name, idx)
+            if not geometry or not geometry["width"] or not geometry["height"]:
+                continue
+            # Same resolution rules as the assembly loop below
+            for path in {resolve_formula_image_path(content, workspace), resolve_picture_path(content.replace("\\", "/"), workspace)}:
+                if os.path.exists(path):
+                    jobs.add((path, geometry["width"], geometry["height"]))
+    return sorted(jobs)
+
+def render_presentation(
+    template_path: Path,
+    json_data: dict,
+    workspace: JobWorkspace,
+    optimize_images: bool = True
+):
+    """
+    Fill the template with the slides of the execution agent JSON, without writing it anywhere.
+
+    Returns:
+    - A (Presentation, slides added) tuple; build_presentation and
+      build_presentation_bytes write the package exactly once.
+    """
+    template_dir = template_path
+
+    # Load the presentation
+    try:
+        prs = load_stripped_template(Path(template_dir))
+        print(f"✅ Presentation loaded from {template_dir}")
+    except Exception as e:
+        print(f"❌ Error loading template: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to load presentation template: {str(e)}")
+        
+    # Layout positions come from the template index; the layout objects belong to this Presentation
+    template_index = get_template_index(Path(template_dir))
+    layout_names = template_index.layout_names
+    print(f"📋 Available layouts in template: {layout_names}")
+    slide_layouts = prs.slide_master.slide_layouts
+    
+    def get_layout_by_name(prs_obj, layout_name):
+        position = template_index.layout_position(layout_name)
+        return slide_layouts[position] if position is not None else None
+
+    # Decode and resize every referenced image concurrently before the (serial) python-pptx work starts
+    prepared_images = {}
+    if optimize_images:
+        image_jobs = collect_image_jobs(json_data, template_index, workspace)
+        if image_jobs:
+            prepare_start = time.time()
+            prepared_images = prepare_images(image_jobs)
+            print(f"🖼️ Prepared {len(prepared_images)}/{len(image_jobs)} images in {time.time() - prepare_start:.2f}s")
+
+    # Resize images to the placeholder they go into, so the deck does not carry full-resolution copies.
+    # Prepared images are held in memory, so cache eviction cannot remove them before they are embedded.
+    def optimize_image(image_path, shape):
+        if not optimize_images:
+            return image_path
+        job = (str(image_path), shape.width, shape.height)
+        if job in prepared_images:
+            data = prepared_images[job]
+        else:
+            try:
+                data = fit_image_to_placeholder(image_path, shape.width, shape.height)
+            except Exception as e:
+                print(f"⚠️ Image optimization failed: {e}")
+                return image_path
+        return io.BytesIO(data) if data is not None else image_path
+
+    # Add slides based on JSON data
+    slides_added = 0
+    print(f"🔄 Creating slides from JSON data...")
+    
+    for slide_index, slide_data in enumerate(json_data.get("slides", [])):
+        layout_name = slide_data.get("layout")
+        if not layout_name:
+            try:
+                layout_name = slide_data.get("slide_name")
+            except Exception as e:
+                print(f"⚠️ Missing slide_name in slide {slide_index+1}, skipping")
+                continue
+            
+        layout = get_layout_by_name(prs, layout_name)
+
+        if layout:
+            try:
+                slide = prs.slides.add_slide(layout)
+                slides_added += 1
+                print(f"✅ Added slide {slide_index+1} with layout '{layout_name}'")
+                # One pass over the shapes, then every placeholder key is a dict lookup
+                slide_placeholders = {shape.placeholder_format.idx: shape for shape in slide.placeholders}
+                
+                if "placeholders" not in slide_data:
+                    print(f"⚠️ No placeholders found in slide {slide_index+1}")
+                    continue
+                    
+                for placeholder_name, content in slide_data["placeholders"].items():
+                    name_parts = placeholder_name.split("_")
+                    if len(name_parts) < 2:
+                        print(f"⚠️ Invalid placeholder name format: {placeholder_name}, expected name_index")
+                        continue
+                        
+                    name = name_parts[0]
+                    index = name_parts[-1]
+                    
+                    try:
+                        # Find placeholder by index
+                        idx = int(index)
+                        shape = slide_placeholders.get(idx)
+                        if shape is None:
+                            print(f"⚠️ Placeholder with index {index} not found in slide {slide_index+1}")
+                            continue
+                        
+                        is_picture_placeholder = name.startswith("Picture") or "Picture" in name or shape.placeholder_format.type == 18  # 18 is picture type
+                        
+                        # Handle text content
+                        if shape.has_text_frame:
+                            if content is None:
+                                shape.text_frame.text = ""
+                            elif isinstance(content, list):
+                                shape.text_frame.clear()
+                                for item in content:
+                                    paragraph = shape.text_frame.add_paragraph()
+                                    paragraph.text = str(item)
+                            else:
+                                # Check if this is a formula path
+                                if isinstance(content, str) and ("formulas" in content or "Formula" in content) and content.endswith(".png"):
+                                    try:
+                                        # This is a formula image, insert it
+                                        formula_path = resolve_formula_image_path(content, workspace)
+                                        
+                                        if os.path.exists(formula_path):
+                                            print(f"🔤 Inserting formula image at {formula_path}")
+                                            insert_image(slide, shape, optimize_image(formula_path, shape))
+                                        else:
+                                            print(f"⚠️ Formula image not found: {formula_path}")
+                                            # Try to re-render if possible
+                                            shape.text_frame.text = "Formula image missing"
+                                    except Exception as e:
+                                        print(f"⚠️ Error inserting formula image: {e}")
+                                        shape.text_frame.text = ""  # Don't show the path
+                                elif isinstance(content, str) and content.lower().endswith(IMAGE_EXTENSIONS) and not is_picture_placeholder:
+                                    # Content (OBJECT) placeholders take figures too, e.g. in templates without picture layouts
+                                    pic_path = resolve_picture_path(content.replace("\\", "/"), workspace)
+                                    if os.path.exists(pic_path):
+                                        try:
+                                            print(f"🖼️ Inserting picture into content placeholder: {pic_path}")
+                                            insert_image(slide, shape, optimize_image(pic_path, shape))
+                                        except Exception as img_error:
+                                            print(f"❌ Error inserting image: {str(img_error)}")
+                                            shape.text_frame.text = f"[Image: {os.path.basename(pic_path)}]"
+                                    else:
+                                        print(f"⚠️ Image file not found: {pic_path} (exists check failed)")
+                                        shape.text_frame.text = f"[Missing image: {os.path.basename(pic_path)}]"
+                                else:
+                                    shape.text_frame.text = str(content)
+                        
+                        # Handle picture content
+                        if is_picture_placeholder:
+                            try:
+                                if content and isinstance(content, str):
+                                    # Path normalization - replace backslashes with forward slashes
+                                    pic_path = content.replace("\\", "/")
+                                    
+                                    # Check if this is actually an image path
+                                    if not pic_path.lower().endswith(IMAGE_EXTENSIONS):
+                                        shape.text_frame.text = str(content)
+                                        continue
+                                        
+                                    # Make sure it has the full path
+                                    pic_path = resolve_picture_path(pic_path, workspace)
+                                    
+                                    # Final existence check with detailed error
+                                    if os.path.exists(pic_path):
+                                        try:
+                                            print(f"🖼️ Inserting picture: {pic_path}")
+                                            # Direct insertion attempt
+                                            shape.insert_picture(optimize_image(pic_path, shape))
+                                        except Exception as img_error:
+                                            print(f"❌ Error inserting image: {str(img_error)}")
+                                            # Try to insert in text frame as fallback
+                                            if hasattr(shape, 'text_frame'):
+                                                shape.text_frame.text = f"[Image: {os.path.basename(pic_path)}]"
+                                    else:
+                                        print(f"⚠️ Image file not found: {pic_path} (exists check failed)")
+                                        if hasattr(shape, 'text_frame'):
+                                            shape.text_frame.text = f"[Missing image: {os.path.basename(pic_path)}]"
+                            except Exception as e:
+                                print(f"⚠️ Error handling picture placeholder: {e}")
+                                traceback.print_exc()
+                                if hasattr(shape, 'text_frame'):
+                                    shape.text_frame.text = "[Image error]"
+                    
+                    except ValueError as e:
+                        print(f"⚠️ Error processing placeholder {placeholder_name}: {e}")
+                        continue
+            
+            except Exception as e:
+                print(f"❌ Error adding slide {slide_index+1}: {e}")
+                traceback.print_exc()
+                continue
+        else:
+            print(f"⚠️ Layout '{layout_name}' not found in the template. Available layouts: {layout_names}")
+
+    if slides_added == 0:
+        raise HTTPException(status_code=400, detail="No slides could be added to the presentation. Check log for details.")
+        
+    print(f"📊 Total slides added: {slides_added}")
+    return prs, slides_added
+
+def build_presentation(
+    template_path: Path,
+    json_data: dict,
+    output_ppt_path: Path,
+    workspace: JobWorkspace,
+    optimize_images: bool = True
+) -> int:
+    """Render the deck and save it to output_ppt_path, returning the number of slides added"""
+    prs, slides_added = render_presentation(template_path, json_data, workspace, optimize_images)
+    prs.save(str(output_ppt_path))
+    print(f"✅ Final presentation saved to {output_ppt_path}")
+    return slides_added
+
+def build_presentation_bytes(
+    template_path: Path,
+    json_data: dict,
+    workspace: JobWorkspace,
+    optimize_images: bool = True
+) -> bytes:
+    """Render the deck in memory so it can go straight into a response"""
+    prs, _ = render_presentation(template_path, json_data, workspace, optimize_images)
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    print(f"✅ Final presentation built in memory ({buffer.tell()} bytes)")
+    return buffer.getvalue()
+
 # API Endpoints
 
 @app.get("/student-levels")
@@ -350,9 +1613,6 @@ async def analyze_url(
     settings: Settings = Depends(get_settings)
 ):
     """Analyze paper from URL and extract prerequisites"""
-    # Clean directories before starting new analysis
-    clean_directories()
-    
     if not isValidArxivUrl(url):
         raise HTTPException(400, "Invalid arXiv URL format. Expected format: https://arxiv.org/abs/2406.15758 or https://arxiv.org/pdf/2406.15758")
     
@@ -365,23 +1625,38 @@ async def analyze_url(
     if student_level not in level_map:
         raise HTTPException(400, "Invalid student level")
     
+    # Every analysis starts a new job; later steps receive its job_id
+    workspace = create_workspace()
+    
     # Start API call timer for performance monitoring
     start_time = time.time()
     
+    # abs/pdf/.pdf spellings of the same paper and version share one cache entry
+    document_id = canonical_document_id(url)
+    cache_key = generate_cache_key(document_id, student_level, settings.MODEL_NAME)
+    cached_prerequisites = await asyncio.to_thread(load_cached_analysis, cache_key)
+    if cached_prerequisites is not None:
+        print(f"💾 Analysis cache hit for {document_id}")
+        write_prerequisites(workspace, cached_prerequisites)
+        return {"prerequisites": cached_prerequisites, "job_id": workspace.job_id}
+    
     try:
-        client = Mistral(api_key=settings.MISTRAL_API_KEY)
+        client = get_mistral_client(settings.MISTRAL_API_KEY)
         prompt = f"""Analyze this research paper and provide a comprehensive list of prerequisite topics that a {level_map[student_level]} should be familiar with to fully understand the concepts presented"""
         
-        # Make the API call
-        response = client.chat.complete(
-            model=settings.MODEL_NAME,
-            messages=[{
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "document_url", "document_url": url}
-                ]
-            }]
+        # Make the API call without blocking the event loop; identical concurrent analyses share one call
+        response = await single_flight.do(
+            flight_key("analyze", settings.MODEL_NAME, prompt, document_id),
+            lambda: client.chat.complete_async(
+                model=settings.MODEL_NAME,
+                messages=[{
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {"type": "document_url", "document_url": canonical_document_url(url)}
+                    ]
+                }]
+            )
         )
         
         # Log performance metrics
@@ -390,19 +1665,14 @@ async def analyze_url(
         
         # Parse the response and save results
         parsed_prerequisites = parse_prerequisites(response.choices[0].message.content)
-        json_object = json.dumps(parsed_prerequisites, indent=4)
-        raw_path = Path(config.TEMPLATE_METADATA_DIR) / "prerequisites_dict.json"
-
-        # Ensure the directory exists
-        raw_path.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(raw_path, "w") as outfile:
-            outfile.write(json_object)
+        write_prerequisites(workspace, parsed_prerequisites)
+        if parsed_prerequisites:
+            save_cached_analysis(cache_key, parsed_prerequisites, document_id)
             
         total_time = time.time() - start_time
         print(f"✅ Total processing time: {total_time:.2f}s")
         
-        return {"prerequisites": parsed_prerequisites}
+        return {"prerequisites": parsed_prerequisites, "job_id": workspace.job_id}
     
     except Exception as e:
         print(f"❌ Error analyzing URL: {e}")
@@ -416,21 +1686,10 @@ async def analyze_pdf(
     settings: Settings = Depends(get_settings)
 ):
     """Analyze paper from uploaded PDF and extract prerequisites"""
-    # Clean directories before starting new analysis
-    clean_directories()
-    
     # Validate file
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
     
-    # Save new PDF
-    pdf_path = os.path.join(PDF_DIR, "paper.pdf")
-    try:
-        with open(pdf_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        raise HTTPException(500, f"Failed to save PDF: {str(e)}")
-    
     # Validate student level
     level_map = {
         "1": "phd researcher",
@@ -443,20 +1702,41 @@ async def analyze_pdf(
     
     student_level_description = level_map.get(student_level)
     
+    # Read the file content
+    file_content = await file.read()
+    if not file_content:
+        raise HTTPException(status_code=400, detail="Uploaded PDF is empty")
+    
     # Start timer for performance monitoring
     start_time = time.time()
     
+    # Every analysis starts a new job, created only once the input is valid; later steps receive its job_id
+    workspace = create_workspace()
+    
+    # Save new PDF
+    pdf_path = workspace.root / "paper.pdf"
+    try:
+        with open(pdf_path, "wb") as buffer:
+            buffer.write(file_content)
+    except Exception as e:
+        raise HTTPException(500, f"Failed to save PDF: {str(e)}")
+    
+    # The same PDF uploaded again (under any name) reuses its analysis
+    document_id = f"sha256:{hashlib.sha256(file_content).hexdigest()}"
+    cache_key = generate_cache_key(document_id, student_level, settings.MODEL_NAME)
+    cached_prerequisites = await asyncio.to_thread(load_cached_analysis, cache_key)
+    if cached_prerequisites is not None:
+        print(f"💾 Analysis cache hit for {file.filename}")
+        write_prerequisites(workspace, cached_prerequisites)
+        return {"prerequisites": cached_prerequisites, "job_id": workspace.job_id}
+    
     try:
         # Set up the Mistral client
-        client = Mistral(api_key=settings.MISTRAL_API_KEY)
-        
-        # Read the file content
-        file.file.seek(0)  # Reset file pointer
-        file_content = await file.read()
+        client = get_mistral_client(settings.MISTRAL_API_KEY)
         
         # Upload the PDF to Mistral
         upload_start = time.time()
-        uploaded_pdf = client.files.upload(
+        uploaded_pdf = await client.files.upload_async(
             file={
                 "file_name": file.filename,
                 "content": file_content,
@@ -467,7 +1747,7 @@ async def analyze_pdf(
         print(f"📤 PDF upload completed in {upload_time:.2f}s")
         
         # Get a signed URL for the uploaded file
-        signed_url = client.files.get_signed_url(file_id=uploaded_pdf.id)
+        signed_url = await client.files.get_signed_url_async(file_id=uploaded_pdf.id)
         
         # Format the prompt based on student level
         title_prompt = f"""Analyze this research paper and provide a comprehensive list of prerequisite topics that a {student_level_description} should be familiar with to fully understand the concepts presented"""
@@ -490,7 +1770,7 @@ async def analyze_pdf(
             }
         ]
         
-        title_chat_response = client.chat.complete(
+        title_chat_response = await client.chat.complete_async(
             model=settings.MODEL_NAME,
             messages=messages
         )
@@ -500,13 +1780,9 @@ async def analyze_pdf(
         # Parse and save results
         parse_start = time.time()
         parsed_prerequisites = parse_prerequisites(title_chat_response.choices[0].message.content)
-        json_object = json.dumps(parsed_prerequisites, indent=4)
-
-        raw_path = Path(config.TEMPLATE_METADATA_DIR) / "prerequisites_dict.json"
-        raw_path.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(raw_path, "w") as outfile:
-            outfile.write(json_object)
+        write_prerequisites(workspace, parsed_prerequisites)
+        if parsed_prerequisites:
+            save_cached_analysis(cache_key, parsed_prerequisites, file.filename)
             
         parse_time = time.time() - parse_start
         print(f"🔍 Parsing and saving completed in {parse_time:.2f}s")
@@ -514,7 +1790,7 @@ async def analyze_pdf(
         total_time = time.time() - start_time
         print(f"✅ Total processing time: {total_time:.2f}s")
 
-        return {"prerequisites": parsed_prerequisites}
+        return {"prerequisites": parsed_prerequisites, "job_id": workspace.job_id}
     
     except Exception as e:
         print(f"❌ Error analyzing PDF: {e}")
@@ -522,10 +1798,11 @@ async def analyze_pdf(
         raise HTTPException(status_code=500, detail=f"Error analyzing paper: {str(e)}")
 
 @app.get("/use-generated-prerequisite")
-async def use_generated_prerequisite(prequisite_json_filename: str = "prerequisites_dict.json"):
+async def use_generated_prerequisite(prequisite_json_filename: str = "prerequisites_dict.json", job_id: Optional[str] = None):
     """Load prerequisites from saved JSON file"""
+    workspace = resolve_workspace(job_id)
     try:
-        prequisite_json_path = Path("data/metadata") / prequisite_json_filename
+        prequisite_json_path = workspace.metadata_dir / prequisite_json_filename
         prerequisites_data = load_json(prequisite_json_path)
         return {"message": "Prerequisites loaded successfully", "prerequisites": prerequisites_data}
     
@@ -534,58 +1811,13 @@ async def use_generated_prerequisite(prequisite_json_filename: str = "prerequisi
         raise HTTPException(status_code=500, detail=f"Error loading prerequisites: {str(e)}")
 
 @app.post("/extract-template-layout")
-async def extract_template_layout(template_name: str = Form("template.pptx")):
+async def extract_template_layout(template_name: str = Form("template.pptx"), job_id: Optional[str] = Form(None)):
     """Extract layout from PowerPoint template"""
+    workspace = resolve_workspace(job_id)
+    template_path = resolve_template_path(template_name)
     try:
-        # Check for template with case-insensitive matching
-        upload_dir = Path("data/upload")
-        template_path = None
-        
-        # Try exact match first
-        exact_match = upload_dir / template_name
-        if exact_match.exists():
-            template_path = exact_match
-            print(f"📌 Using exact template match: {template_name}")
-        else:
-            # Try case-insensitive matching
-            for file in upload_dir.glob("*.pptx"):
-                if file.name.lower() == template_name.lower():
-                    template_path = file
-                    print(f"📌 Found template with case-insensitive match: {file.name}")
-                    break
-        
-        if not template_path:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Template file {template_name} not found. Available templates: {', '.join([f.name for f in upload_dir.glob('*.pptx')])}"
-            )
-        
-        presentation = Presentation(template_path)
-        master_slide = presentation.slide_master
-        layout_details = []
-
-        for layout in master_slide.slide_layouts:
-            layout_info = {"name": layout.name, "placeholders": []}
-
-            for placeholder in layout.placeholders:
-                placeholder_info = {
-                    "name": placeholder.name,
-                    "type": str(placeholder.placeholder_format.type),
-                    "index": placeholder.placeholder_format.idx
-                }
-                layout_info["placeholders"].append(placeholder_info)
-
-            layout_details.append(layout_info)
-
-        # Convert to JSON string and write to file
-        layout_details_json = json.dumps(layout_details, indent=4)
-
-        output_dir = Path("data/metadata")
-        os.makedirs(output_dir, exist_ok=True)
-        output_file = output_dir / "layout_details.json"
-
-        with open(output_file, "w") as file:
-            file.write(layout_details_json)
+        layout_details = extract_layout_details(template_path, workspace)
+        output_file = workspace.metadata_dir / "layout_details.json"
 
         return {
             "message": f"Layout details saved to {output_file}",
@@ -598,33 +1830,16 @@ async def extract_template_layout(template_name: str = Form("template.pptx")):
         raise HTTPException(status_code=500, detail=f"Error extracting layout: {str(e)}")
 
 @app.post("/convert-placeholders")
-async def convert_placeholders(layout_extracted_path: str = Form("data/metadata/layout_details.json")):
+async def convert_placeholders(layout_extracted_path: Optional[str] = Form(None), job_id: Optional[str] = Form(None)):
     """Convert layout details to placeholder format"""
+    workspace = resolve_workspace(job_id)
+    if not layout_extracted_path:
+        layout_extracted_path = workspace.metadata_dir / "layout_details.json"
     try:
         # Load layout details from JSON
         layout_details = load_json(layout_extracted_path)
-        
-        # Process each layout
-        layout_list = []
-        for single_layout_details in layout_details:
-            layout_name = single_layout_details["name"]
-            layout_dict = {}
-            layout_dict["slide_name"] = layout_name
-            
-            placeholderlist = []
-            for placeholder in single_layout_details["placeholders"]:
-                placeholderdict = {}
-                placeholderdict["name"] = placeholder["name"] + "_" + str(placeholder["index"])
-                placeholderlist.append(placeholderdict)
-
-            layout_dict["placeholders"] = placeholderlist
-            layout_list.append(layout_dict)
-
-        # Save processed layout to JSON
-        raw_path = Path(config.TEMPLATE_METADATA_DIR)
-        os.makedirs(raw_path, exist_ok=True)
-        output_path = raw_path / "processed_layout.json"
-        save_json(layout_list, output_path)
+        convert_layout_placeholders(layout_details, workspace)
+        output_path = workspace.metadata_dir / "processed_layout.json"
         
         return {"message": "Placeholders converted successfully", "path": str(output_path)}
     
@@ -637,17 +1852,8 @@ async def convert_placeholders(layout_extracted_path: str = Form("data/metadata/
 async def ocr_figure_onURL(document_url: str = Form(...), settings: Settings = Depends(get_settings)):
     """Perform OCR on a document URL to extract figures"""
     try:
-        client = Mistral(api_key=settings.MISTRAL_API_KEY)
-        print(f"🔍 Performing OCR on URL: {document_url}")
-        
-        ocr_response = client.ocr.process(
-            model=settings.MODEL_NAME_OCR,
-            document={
-                "type": "document_url",
-                "document_url": document_url
-            },
-            include_image_base64=True
-        )
+        client = get_mistral_client(settings.MISTRAL_API_KEY)
+        ocr_response = await run_figure_ocr(client, settings, document_url)
         
         # print(f"✅ OCR completed, extracted {len(ocr_response.get('pages', []))} pages")
         return {"message": "OCR completed successfully", "ocr_response": ocr_response}
@@ -663,28 +1869,16 @@ async def ocr_figure_pdf(file: UploadFile = File(...), settings: Settings = Depe
     if not file.filename.endswith('.pdf'):
         raise HTTPException(400, "PDF files only")
     
-    temp_path = f"data/upload/temp_{file.filename}"
     try:
-        with open(temp_path, "wb") as f:
-            f.write(await file.read())
+        file_content = await file.read()
         
-        client = Mistral(api_key=settings.MISTRAL_API_KEY)
-        uploaded_pdf = client.files.upload(
-            file={
-                "file_name": os.path.basename(temp_path),
-                "content": open(temp_path, "rb"),
-            },
-            purpose="ocr"
-        )
-
-        signed_url = client.files.get_signed_url(file_id=uploaded_pdf.id)
-
-        ocr_response = client.ocr.process(
-            model=settings.MODEL_NAME_OCR,
-            document={
-                "type": "document_url",
-                "document_url": signed_url.url,
-            }
+        client = get_mistral_client(settings.MISTRAL_API_KEY)
+        # The PDF is only uploaded to Mistral when its sha256 is not in the OCR cache
+        ocr_response = await ocr_document_async(
+            client,
+            document_bytes=file_content,
+            file_name=os.path.basename(file.filename),
+            model=settings.MODEL_NAME_OCR
         )
         
         return {"message": "OCR completed successfully", "ocr_response": ocr_response}
@@ -693,48 +1887,15 @@ async def ocr_figure_pdf(file: UploadFile = File(...), settings: Settings = Depe
         print(f"❌ Error performing OCR: {e}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error performing OCR: {str(e)}")
-    
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
 
 @app.post("/save-figures")
-async def save_figures_from_ocr(ocr_response: dict):
+async def save_figures_from_ocr(ocr_response: dict, job_id: Optional[str] = None):
     """Save figures extracted from OCR response"""
+    workspace = resolve_workspace(job_id)
     try:
-        output_folder = Path("data/figures")
-        os.makedirs(output_folder, exist_ok=True)
-        figures_metadata = {}
-
-        for page in ocr_response.get("pages", []):
-            page_index = page.get("index")
-            markdown = page.get("markdown", "")
-            images = page.get("images", [])
-
-            for i, image in enumerate(images):
-                image_id = image.get("id", f"figure_{page_index}_{i}.jpeg")
-                img_data = image.get("image_base64")
-
-                if img_data:
-                    if ',' in img_data:
-                        img_data = img_data.split(',', 1)[1]
-
-                    img_bytes = base64.b64decode(img_data)
-                    img = Image.open(io.BytesIO(img_bytes))
-
-                    image_filename = os.path.basename(image_id)
-                    save_path = output_folder / image_filename
+        figures_metadata = save_figures(ocr_response, workspace)
+        metadata_path = workspace.figures_dir / "figures_metadata.json"
 
-                    img.save(save_path)
-
-                    figure_key = extract_figure_tag(markdown, image_id) or f"Figure_{page_index}_{i}"
-                    figures_metadata[figure_key] = str(save_path)
-
-        metadata_path = output_folder / "figures_metadata.json"
-        with open(metadata_path, "w") as meta_file:
-            json.dump(figures_metadata, meta_file, indent=4)
-
-        print(f"✅ Saved {len(figures_metadata)} figures")
         return {
             "message": f"Saved {len(figures_metadata)} figures",
             "metadata_path": str(metadata_path),
@@ -752,282 +1913,303 @@ async def slide_data_gen(
     document_url: str = Form(...),
     num_slides: int = Form(10),
     selected_topics: List[str] = Form([]),
+    job_id: Optional[str] = Form(None),
+    mode: str = Form("auto"),
     settings: Settings = Depends(get_settings)
 ):
-    """Generate slide data for presentation"""
+    """
+    Generate slide data for presentation.
+
+    mode is "single" (one LLM call for the whole deck), "sections" (outline
+    first, then the sections concurrently) or "auto", which picks sections for
+    decks of SECTION_PARALLEL_MIN_SLIDES slides or more.
+    """
+    by_section = use_section_mode(mode, num_slides, settings)
+    workspace = resolve_workspace(job_id)
     try:
         start_time = time.time()
         print(f"\n🔍 Starting slide-data-gen for {student_level} level with {num_slides} slides")
         print(f"  Document URL: {document_url}")
         
-        # Load prerequisites from file
-        prerequisites_path = Path("data/metadata/prerequisites_dict.json")
-        if not prerequisites_path.exists():
-            raise HTTPException(
-                status_code=404, 
-                detail="Prerequisites data not found. Please run analyze/url or analyze/pdf first."
-            )
-            
-        try:
-            prerequisites_dict = load_json(prerequisites_path)
-            print(f"✅ Loaded prerequisites with {len(prerequisites_dict)} topics")
-        except Exception as e:
-            print(f"❌ Error loading prerequisites: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to load prerequisites data: {str(e)}")
-        
-        # Filter prerequisites based on selected topics
-        if selected_topics:
-            filtered_prerequisites = {topic: prerequisites_dict[topic] 
-                                    for topic in selected_topics 
-                                    if topic in prerequisites_dict}
-            print(f"🔍 Filtered prerequisites down to {len(filtered_prerequisites)} selected topics")
-        else:
-            filtered_prerequisites = prerequisites_dict
-            print("⚠️ No topics selected, using all prerequisite topics")
+        filtered_prerequisites = load_prerequisites(workspace, selected_topics)
         
         # Initialize Mistral client
-        client = Mistral(api_key=settings.MISTRAL_API_KEY)
-
-        slide_prompt_1 = f"""Analyze this research paper and create a structured outline for a PowerPoint presentation tailored for a {student_level} audience, where student_level is either 'PhD researcher', 'Master's student', or 'Undergrad student'. Follow these guidelines:
-
-Pictures should only contain figure number, example (figure 2)
-
-Important: Once a formula is shown do not use it again
-
-CONSIDER Pictures AND FORMULA AS IMAGES
-
-DO NOT KEEP IMAGE/Pictures AND FORMULA IN SAME SLIDE
-
-Total slides should be : {num_slides} **Always follow this, must not be more than this**
-
-Title Slide: Create a concise, engaging title that captures the paper's essence.
-
-This is the first slide and a catchy subtitle. Bullets must be empty in this
-
-Agenda slide: The second slide which contains all subtitles of other slides as its bullet points
-
-Then State the paper's main research question and significance
-
-This acts like the title
-
-Highlight key background information relevant to the {student_level} audience
-
-For each section of the paper:
-
-Create 'Section Overview' slide with:
-
-Section title: bullet points summarizing key concepts in content
-
-Any critical formulas, using LaTeX notation
-
-Followed with in depth explanation slides that only if necessary and also break each point in section overview into one slide explaining in depth:
+        client = get_mistral_client(settings.MISTRAL_API_KEY)
+        
+        generate = generate_slide_data_by_section if by_section else generate_slide_data
+        await generate(client, settings, workspace, student_level, document_url, num_slides, filtered_prerequisites)
+        input_slides_path = workspace.metadata_dir / "slides_data.json"
+        
+        total_time = time.time() - start_time
+        print(f"✅ Slide data generation completed in {total_time:.2f}s")
+        
+        return {"message": "Slide data generated successfully", "path": str(input_slides_path)}
+    
+    except HTTPException as he:
+        # Re-raise HTTP exceptions
+        raise he
+    except Exception as e:
+        print(f"🚨 Unexpected error in slide-data-gen: {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error generating slide data: {str(e)}")
 
-Explain complex ideas using analogies or visualizations
+def build_outline_prompt(student_level: str, num_slides: int, filtered_prerequisites: dict) -> str:
+    """Prompt for the deck outline used by the section-parallel mode"""
+    topics = f"ONLY COVER THE TOPICS IN {filtered_prerequisites}" if filtered_prerequisites else "Cover the whole paper"
+    return f"""Analyze this research paper and plan a PowerPoint presentation of {num_slides} slides for a {student_level} audience.
 
-Break down important formulas step-by-step
+Do not write the slides yet, only the outline:
 
-Highlight connections to prerequisite knowledge for the {student_level}
+title: a concise, engaging title that captures the paper's essence
 
-Do this for all the chosen topics
+subtitle: a catchy subtitle
 
-Make sure to
+sections: the ordered sections of the deck after the title and agenda slides, e.g. research question and significance, background, one section per key part of the paper, key findings, discussion & implications, key takeaways, further reading
 
-Present key findings with supporting data or graphs
+For each section give its title, a 2-3 sentence summary of what it must cover (so sections do not overlap) and its number of slides
 
-Interpret results at a level appropriate for the {student_level}
+{topics}
 
-With great amount of details not missing any key information
+The section slide counts must add up to {num_slides - FIXED_SLIDES}
+"""
 
-Discussion & Implications (1-2 slides):
+def build_section_prompt(student_level: str, outline: DeckOutline, section: DeckSection) -> str:
+    """Prompt for the slides of one outline section"""
+    other_sections = [s.title for s in outline.sections if s.title != section.title]
+    return f"""Analyze this research paper and write the slides of one section of the presentation "{outline.title}" for a {student_level} audience.
 
-Outline the paper's main conclusions
+Section: {section.title}
 
-Discuss potential applications or future research directions
+What it must cover: {section.summary}
 
-Relate findings to broader field context for the {student_level}
+Total slides for this section: {section.num_slides} **Always follow this, must not be more than this**
 
-Key Takeaways slide:
+Other sections are written separately, do not repeat their content: {other_sections}
 
-List 3-5 main points to remember, tailored to the {student_level}'s level
+Pictures should only contain figure number, example (figure 2)
 
-Further Reading slide:
+CONSIDER Pictures AND FORMULA AS IMAGES
 
-Suggest 3-4 related papers or resources appropriate for the {student_level}
+DO NOT KEEP IMAGE/Pictures AND FORMULA IN SAME SLIDE
 
 For each slide, provide:
 
-A clear, concise headline as the subtitle
+A clear, concise headline as the subtitle, the title is the section title
 
 Bullet points for main content (5-7 per slide)
 
 Notes on any visuals, charts, or diagrams to include from the paper mention the figure number
 
-Adjust the depth and complexity of the content based on the {student_level}, ensuring the presentation is informative and engaging for the specified audience level.
+Any critical formulas, using LaTeX notation, with a short name for each
 
-Make sure to include the mathematical formulas where ever necessary
+Adjust the depth and complexity of the content based on the {student_level}
 
 Give the output in a json format and a dictionary tagging formuala and its name in json
 """
-        
-        # Create slide prompt
-        slide_prompt_2 = f"""Analyze this research paper and create a structured outline for a PowerPoint presentation tailored for a {student_level} audience, where student_level is either 'PhD researcher', 'Master's student', or 'Undergrad student'. Follow these guidelines:
-
-Pictures should only contain figure number, example (figure 2)
-
-ONLY INCLUDE THE TOPICS IN {filtered_prerequisites} FOR THE SLIDES
-
-Important: Once a formula is shown do not use it again
-
-CONSIDER Pictures AND FORMULA AS IMAGES
-
-DO NOT KEEP IMAGE/Pictures AND FORMULA IN SAME SLIDE
-
-Total slides should be : {num_slides} **Always follow this, must not be more than this**
-
-Title Slide: Create a concise, engaging title that captures the paper's essence.
-
-This is the first slide and a catchy subtitle. Bullets must be empty in this
-
-Agenda slide: The second slide which contains all subtitles of other slides as its bullet points
-
-Then State the paper's main research question and significance
-
-This acts like the title
-
-Highlight key background information relevant to the {student_level} audience
-
-For each section of the paper:
-
-Create 'Section Overview' slide with:
-
-Section title: bullet points summarizing key concepts in content
-
-Any critical formulas, using LaTeX notation
-
-Followed with in depth explanation slides that only if necessary and also break each point in section overview into one slide explaining in depth:
-
-Explain complex ideas using analogies or visualizations
-
-Break down important formulas step-by-step
-
-Highlight connections to prerequisite knowledge for the {student_level}
-
-Do this for all the chosen topics
-
-Make sure to
-
-Present key findings with supporting data or graphs
-
-Interpret results at a level appropriate for the {student_level}
-
-With great amount of details not missing any key information
-
-Discussion & Implications (1-2 slides):
-
-Outline the paper's main conclusions
-
-Discuss potential applications or future research directions
-
-Relate findings to broader field context for the {student_level}
-
-Key Takeaways slide:
-
-List 3-5 main points to remember, tailored to the {student_level}'s level
-
-Further Reading slide:
-
-Suggest 3-4 related papers or resources appropriate for the {student_level}
-
-For each slide, provide:
-
-A clear, concise headline as the subtitle
-
-Bullet points for main content (5-7 per slide)
 
-Notes on any visuals, charts, or diagrams to include from the paper mention the figure number
+async def plan_deck_outline(
+    client: Mistral,
+    settings: Settings,
+    student_level: str,
+    document_url: str,
+    num_slides: int,
+    filtered_prerequisites: dict
+) -> Optional[DeckOutline]:
+    """Outline of a section-parallel deck, or None when the deck should be generated in one call"""
+    if num_slides <= FIXED_SLIDES:
+        print(f"⚠️ A {num_slides}-slide deck has no room for sections, generating it in one call")
+        return None
+    api_start = time.time()
+    print(f"📞 Planning outline for a {num_slides}-slide deck...")
+    try:
+        outline_response = await client.chat.parse_async(
+            model=settings.MODEL_NAME,
+            messages=build_document_messages(build_outline_prompt(student_level, num_slides, filtered_prerequisites), document_url),
+            response_format=DeckOutline
+        )
+        outline = outline_response.choices[0].message.parsed
+    except Exception as e:
+        print(f"⚠️ Outline generation failed, generating the deck in one call: {e}")
+        return None
+    if outline is None:
+        return None
+    # The title and agenda slides come from the outline, the sections share the rest
+    outline.sections = allocate_section_slides(outline.sections, num_slides - FIXED_SLIDES)
+    if not outline.sections:
+        return None
+    print(f"✅ Outline with {len(outline.sections)} sections ready in {time.time() - api_start:.2f}s")
+    return outline
+
+async def stream_slide_data_by_section(
+    client: Mistral,
+    settings: Settings,
+    workspace: JobWorkspace,
+    student_level: str,
+    document_url: str,
+    num_slides: int,
+    filtered_prerequisites: dict
+):
+    """
+    Map-reduce variant of stream_slide_data for large decks.
+
+    One call plans the outline (title, subtitle, sections with slide counts),
+    then the slides of every section are generated concurrently behind
+    generated title and agenda slides. Slides are yielded in deck order as soon
+    as their section and all earlier ones are done, and the merged deck, never
+    longer than num_slides, is saved as slides_data.json at the end. Falls back
+    to stream_slide_data if no outline comes back.
+    """
+    outline = await plan_deck_outline(client, settings, student_level, document_url, num_slides, filtered_prerequisites)
+    if outline is None:
+        async for slide in stream_slide_data(client, settings, workspace, student_level, document_url, num_slides, filtered_prerequisites):
+            yield slide
+        return
+
+    async def generate_section(section: DeckSection) -> List[dict]:
+        section_start = time.time()
+        response = await client.chat.parse_async(
+            model=settings.MODEL_NAME,
+            messages=build_document_messages(build_section_prompt(student_level, outline, section), document_url),
+            response_format=Ppt
+        )
+        slides = response.choices[0].message.content
+        slides_data = json.loads(slides) if isinstance(slides, str) else slides
+        print(f"  ✅ Section '{section.title}' ({section.num_slides} slides) done in {time.time() - section_start:.2f}s")
+        return slides_data.get("content", [])[:section.num_slides]
+
+    api_start = time.time()
+    merger = SectionMerger(outline, num_slides)
+    section_tasks = [asyncio.create_task(generate_section(section)) for section in outline.sections]
+    try:
+        for slide in merger.opening_slides():
+            yield slide
+        for task in section_tasks:
+            try:
+                slides = await task
+            except Exception as e:
+                print(f"❌ Error in Mistral API call: {e}")
+                status_code = 429 if getattr(e, "status_code", None) == 429 else 500
+                raise HTTPException(status_code=status_code, detail=f"Error generating slides content: {str(e)}")
+            for slide in merger.add_section(slides):
+                yield slide
+    finally:
+        # A failed section or a closed stream leaves nothing to wait for
+        for task in section_tasks:
+            task.cancel()
+        await asyncio.gather(*section_tasks, return_exceptions=True)
+    print(f"✅ All sections generated in {time.time() - api_start:.2f}s")
+
+    save_slide_data(merger.result(), workspace)
+
+async def generate_slide_data_by_section(
+    client: Mistral,
+    settings: Settings,
+    workspace: JobWorkspace,
+    student_level: str,
+    document_url: str,
+    num_slides: int,
+    filtered_prerequisites: dict
+) -> dict:
+    """
+    Section-parallel generation of the whole deck, see stream_slide_data_by_section.
 
-Adjust the depth and complexity of the content based on the {student_level}, ensuring the presentation is informative and engaging for the specified audience level.
+    Wall-clock time follows the slowest section instead of the whole deck, and
+    no single answer has to hold all slides.
+    """
+    async for _ in stream_slide_data_by_section(client, settings, workspace, student_level, document_url, num_slides, filtered_prerequisites):
+        pass
+    return load_json(workspace.metadata_dir / "slides_data.json")
 
-Make sure to include the mathematical formulas where ever necessary
+def use_section_mode(mode: str, num_slides: int, settings: Settings) -> bool:
+    if mode not in SLIDE_GENERATION_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid generation mode {mode}. Choose one of: {', '.join(SLIDE_GENERATION_MODES)}")
+    return mode == "sections" or (mode == "auto" and num_slides >= settings.SECTION_PARALLEL_MIN_SLIDES)
 
-Give the output in a json format and a dictionary tagging formuala and its name in json
-"""        
-        # Define the messages for the chat
-        if len(filtered_prerequisites) == 0:
-            slide_prompt = slide_prompt_1
-        else:
-            slide_prompt = slide_prompt_2
+def sse_event(event: str, data: Any) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": slide_prompt
-                    },
-                    {
-                        "type": "document_url",
-                        "document_url": document_url
-                    }
-                ]
-            }
-        ]
+@app.post("/slide-data-gen/stream")
+async def slide_data_gen_stream(
+    student_level: str = Form(...),
+    document_url: str = Form(...),
+    num_slides: int = Form(10),
+    selected_topics: List[str] = Form([]),
+    job_id: Optional[str] = Form(None),
+    mode: str = Form("auto"),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Generate slide data and push every slide to the client as soon as it is written (server-sent events).
 
-        api_start = time.time()
-        print("📞 Calling Mistral API for slide generation...")
-        try:
-            chat_response = client.chat.parse(
-                model=settings.MODEL_NAME,
-                messages=messages,
-                response_format=Ppt
-            )
-            api_time = time.time() - api_start
-            print(f"✅ API call completed in {api_time:.2f}s")
-            
-            slides = chat_response.choices[0].message.content
-        except Exception as e:
-            print(f"❌ Error in Mistral API call: {e}")
-            raise HTTPException(status_code=500, detail=f"Error generating slides content: {str(e)}")
-        
-        input_slides_path = Path(config.TEMPLATE_METADATA_DIR) / "slides_data.json"
+    mode works as for /slide-data-gen; in section mode slides arrive section by
+    section, in deck order.
+
+    Events:
+    - slide: {"index", "slide"} for each finished slide, in deck order.
+    - done: {"message", "path", "slides"} once slides_data.json is saved.
+    - error: {"status_code", "detail"} if generation fails midway.
+
+    Formulas of each slide are rendered while the rest of the deck is still
+    being generated, so /process-slides-data mostly hits the formula cache.
+    """
+    by_section = use_section_mode(mode, num_slides, settings)
+    workspace = resolve_workspace(job_id)
+    print(f"\n🔍 Starting streamed slide-data-gen for {student_level} level with {num_slides} slides")
+    filtered_prerequisites = load_prerequisites(workspace, selected_topics)
+    client = get_mistral_client(settings.MISTRAL_API_KEY)
+
+    async def events():
+        start_time = time.time()
+        prerenderer = FormulaPrerenderer(workspace.formulas_dir)
+        index = 0
         try:
-            save_json(slides, input_slides_path)
-            print(f"✅ Saved slides data to {input_slides_path}")
+            generate = stream_slide_data_by_section if by_section else stream_slide_data
+            async for slide in generate(client, settings, workspace, student_level, document_url, num_slides, filtered_prerequisites):
+                prerenderer.submit(slide)
+                yield sse_event("slide", {"index": index, "slide": slide})
+                index += 1
+            await prerenderer.finish()
+            print(f"✅ Streamed slide data generation completed in {time.time() - start_time:.2f}s")
+            yield sse_event("done", {
+                "message": "Slide data generated successfully",
+                "path": str(workspace.metadata_dir / "slides_data.json"),
+                "slides": index
+            })
+        except HTTPException as he:
+            yield sse_event("error", {"status_code": he.status_code, "detail": he.detail})
         except Exception as e:
-            print(f"❌ Error saving slides data: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to save slides data: {str(e)}")
-        
-        total_time = time.time() - start_time
-        print(f"✅ Slide data generation completed in {total_time:.2f}s")
-        
-        return {"message": "Slide data generated successfully", "path": str(input_slides_path)}
-    
-    except HTTPException as he:
-        # Re-raise HTTP exceptions
-        raise he
-    except Exception as e:
-        print(f"🚨 Unexpected error in slide-data-gen: {str(e)}")
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error generating slide data: {str(e)}")
+            print(f"🚨 Unexpected error in streamed slide-data-gen: {str(e)}")
+            traceback.print_exc()
+            yield sse_event("error", {"status_code": 500, "detail": f"Error generating slide data: {str(e)}"})
+        finally:
+            # Also reached when the client disconnects and the generator is closed
+            await prerenderer.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.post("/process-slides-data")
-async def process_slides_data():
+async def process_slides_data(job_id: Optional[str] = Form(None)):
     """Process slides data to include formulas and figures"""
+    workspace = resolve_workspace(job_id)
     try:
         start_time = time.time()
         print("\n🔥 Starting /process-slides-data")
 
-        input_slides_path = Path(config.TEMPLATE_METADATA_DIR) / "slides_data.json"
-        output_slides_path = Path(config.TEMPLATE_METADATA_DIR) / "updated_slides_data.json"
-        figures_metadata_path = Path(config.FIGURES_DIR) / "figures_metadata.json"
+        input_slides_path = workspace.metadata_dir / "slides_data.json"
+        output_slides_path = workspace.metadata_dir / "updated_slides_data.json"
+        figures_metadata_path = workspace.figures_dir / "figures_metadata.json"
 
         if not input_slides_path.exists():
             raise HTTPException(status_code=404, detail=f"Missing slides_data.json. Make sure slide-data-gen was called successfully.")
 
         # Print content of metadata directory for debugging
         print(f"📂 Contents of metadata directory:")
-        metadata_dir = Path(config.TEMPLATE_METADATA_DIR)
+        metadata_dir = workspace.metadata_dir
         for file_path in metadata_dir.glob("*"):
             print(f"  - {file_path.name} ({file_path.stat().st_size} bytes)")
 
@@ -1049,18 +2231,10 @@ async def process_slides_data():
             print(f"⚠️ Warning: Figures metadata file not found at {figures_metadata_path}")
 
         # Process formulas in parallel for better performance
-        slides_data = process_formulas_parallel(slides_data)
+        slides_data = process_formulas_parallel(slides_data, out_dir=workspace.formulas_dir)
 
         # Process pictures
-        for slide in slides_data.get("content", []):
-            if "picture" in slide and slide["picture"]:
-                for i in range(len(slide["picture"])):
-                    key = slide["picture"][i].capitalize()
-                    if key in image_data:
-                        slide["picture"][i] = image_data[key]
-                    else:
-                        print(f"⚠️ Warning: Missing image data for key '{key}'")
-                        slide["picture"][i] = ""
+        attach_figures(slides_data, image_data)
 
         # Save the updated JSON
         try:
@@ -1084,126 +2258,47 @@ async def process_slides_data():
 
 @app.post("/enhace-slides-agent")
 async def enhance_slides_agent(
+    job_id: Optional[str] = Form(None),
     settings: Settings = Depends(get_settings)
 ):
+    """Enhance slides data using execution agent"""
+    workspace = resolve_workspace(job_id)
     print(f"🔍 Starting enhancer agent parsing")
-    client = Mistral(api_key=settings.MISTRAL_API_KEY)
+    client = get_mistral_client(settings.MISTRAL_API_KEY)
     
-    execution_agent_id = settings.ENHANCE_AGENT_ID
-    json_dir = Path("data/metadata")
-    slides_data_path = json_dir / "updated_slides_data.json"
+    slides_data_path = workspace.metadata_dir / "updated_slides_data.json"
     slides_data = load_json(slides_data_path)
     print(f"📊 Loaded slides_data with {len(slides_data.get('content', []))} slides")
-    if not settings.ENHANCE_AGENT_ID:
-            print("⚠️ EXECUTION_AGENT_ID not found, falling back to standard chat completion")
-    query=f"""
-Understand the current slides data as provided:
-{slides_data}
-
-And more data to the slides and maintain the same json format as the output
-
-For slides with formulas, explain them in technical terms rather than giving examples of usage
-"""
-    def run_analysis_execution_agent(query):
-        """
-        Sends a user query to a Python agent and returns the response.
-
-        Args:
-            query (str): The user query to be sent to the Python agent.
-
-        Returns:
-            str: The response content from the Python agent.
-        """
-        try:
-            response = client.agents.complete(
-                agent_id= execution_agent_id,
-                messages = [
-                    {
-                        "role": "user",
-                        "content":  query
-                    },
-                ],
-                # response_format=Ppt
-            )
-            result = response.choices[0].message.content
-            return result
-        except Exception as e:
-            print(f"Request failed: {e}. Please check your request.")
-            return None
-        
-    
-    enhance_agent = run_analysis_execution_agent(query)
     
-    # Add validation to prevent saving null data
-    try:
-        data = extract_json(enhance_agent)
-        
-        # Validate the data is not null/empty and has expected structure
-        if data is None:
-            print("⚠️ Warning: Agent returned null data. Not updating slides.")
-            return {"message": "Agent returned null data. Original slides kept unchanged."}
-            
-        # Check if data has expected structure (content array)
-        if not isinstance(data, dict) or 'content' not in data or not isinstance(data['content'], list) or len(data['content']) == 0:
-            print("⚠️ Warning: Agent returned invalid data format. Not updating slides.")
-            print(f"Data structure received: {type(data)}")
-            return {"message": "Agent returned invalid data format. Original slides kept unchanged."}
-            
-        # Verify content has some expected fields
-        sample_slide = data['content'][0]
-        required_fields = ['title', 'subtitle']
-        missing_fields = [field for field in required_fields if field not in sample_slide]
-        
-        if missing_fields:
-            print(f"⚠️ Warning: Agent output is missing required fields: {missing_fields}. Not updating slides.")
-            return {"message": f"Agent output is missing required fields: {missing_fields}. Original slides kept unchanged."}
-        
-        # If we got here, data seems valid, so save it
-        print(f"✅ Agent returned valid data with {len(data['content'])} slides. Saving to {slides_data_path}")
+    data, message = await enhance_slides(client, settings, slides_data)
+    if data is not None:
+        # Only valid agent output replaces the original slides
+        print(f"💾 Saving enhanced slides to {slides_data_path}")
         save_json(data, slides_data_path)
         print(f"✅ Enhancer agent parsing completed successfully")
-        return {"message": "Slides data enhanced and saved successfully"}
-    except Exception as e:
-        print(f"❌ Error processing agent output: {str(e)}")
-        traceback.print_exc()
-        return {"message": f"Error enhancing slides: {str(e)}. Original slides kept unchanged."}
-    """Enhance slides data using execution agent"""
+    return {"message": message}
 
 @app.post("/execution-agent-parsing")
 async def execution_agent_parsing(
     template_name: str = Form("template.pptx"),
+    job_id: Optional[str] = Form(None),
+    mapper: Optional[str] = Form(None),
     settings: Settings = Depends(get_settings)
 ):
-    """Parse slides data using execution agent or model to create presentation structure"""
+    """
+    Map the slides data onto template layouts to create the presentation structure.
+
+    mapper is "rules", "agent" or "refine" (see choose_slide_layouts), LAYOUT_MAPPER by default.
+    """
+    workspace = resolve_workspace(job_id)
     try:
         start_time = time.time()
         print(f"🔍 Starting execution agent parsing with template: {template_name}")
         
-        # Check for template with case-insensitive matching
-        upload_dir = Path("data/upload")
-        template_path = None
-        
-        # Try exact match first
-        exact_match = upload_dir / template_name
-        if exact_match.exists():
-            template_path = exact_match
-            print(f"📌 Using exact template match: {template_name}")
-        else:
-            # Try case-insensitive matching
-            for file in upload_dir.glob("*.pptx"):
-                if file.name.lower() == template_name.lower():
-                    template_path = file
-                    print(f"📌 Found template with case-insensitive match: {file.name}")
-                    break
-        
-        if not template_path:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Template file {template_name} not found. Available templates: {', '.join([f.name for f in upload_dir.glob('*.pptx')])}"
-            )
+        template_path = resolve_template_path(template_name)
             
         template_dir = template_path
-        json_dir = Path("data/metadata")
+        json_dir = workspace.metadata_dir
         slides_data_path = json_dir / "updated_slides_data.json"
         layout_data_path = json_dir / "processed_layout.json"
         output_path = json_dir / "execution_agent.json"
@@ -1214,8 +2309,8 @@ async def execution_agent_parsing(
         if not layout_data_path.exists():
             raise HTTPException(status_code=404, detail="processed_layout.json not found")
 
-        presentation = Presentation(template_dir)
-        distinct_layout = [layout.name for layout in presentation.slide_master.slide_layouts]
+        template_index = get_template_index(template_dir)
+        distinct_layout = template_index.layout_names
         print(f"📊 Available layouts in template: {distinct_layout}")
 
         try:
@@ -1236,83 +2331,8 @@ async def execution_agent_parsing(
             print(f"❌ Error loading processed_layout.json: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to load processed_layout.json: {str(e)}")
 
-        query=f"""
-        Understand the current slides data as provided:
-        {slides_data}
-
-        Now create a new json with layouts chosen from {distinct_layout} for each of the slide. The json contains the placeholders.name_placeholders.index from {slides_layout} as the key and the content as the values.
-
-        Using the fields in the slides data namely title, subtitle, text, formula_images and picture to the placeholder of the layout selected for the slide.
-
-        Give new titles for each slide and remove the subtitle
-
-        Treat both formulas and pictures as images when assigning the layout
-
-        If the content has bullet points, then be creative in choosing layouts which contain texts and title type
-
-        Always add the layout name in the json chosen from the {distinct_layout}
-
-        Add \ n in the placeholders to create new lines
-
-        ## Do not add your own custom placeholders in the slide layout, use only the ones provided in the layout_details.json
-
-        ##final output must in JSON only"""
-        
-        client = Mistral(api_key=settings.MISTRAL_API_KEY)
-        
-        # Check if EXECUTION_AGENT_ID is available
-        if not settings.EXECUTION_AGENT_ID:
-            print("⚠️ EXECUTION_AGENT_ID not found, falling back to standard chat completion")
-            # Fallback to standard chat completion
-            response = client.chat.complete(
-                model=settings.MODEL_NAME,
-                messages=[{"role": "user", "content": query}],
-                # response_format=PresentationData
-            )
-            agent_result = response.choices[0].message.content
-        else:
-            try:
-                print(f"🤖 Using execution agent ID: {settings.EXECUTION_AGENT_ID}")
-                response = client.agents.complete(
-                    agent_id=settings.EXECUTION_AGENT_ID,
-                    messages=[{"role": "user", "content": query}],
-                    # response_format=PresentationData
-                )
-                agent_result = response.choices[0].message.content
-            except Exception as agent_error:
-                print(f"⚠️ Agent execution failed, falling back to standard chat: {agent_error}")
-                # Fallback to standard chat completion
-                response = client.chat.complete(
-                    model=settings.MODEL_NAME,
-                    messages=[{"role": "user", "content": query}],
-                    # response_format=PresentationData
-                )
-                agent_result = response.choices[0].message.content
-        
-        print("Got the agent Response")
-        
-
-        execution_agent_json = extract_json(agent_result)
-        
-        if not execution_agent_json:
-            raise HTTPException(status_code=400, detail="Failed to extract valid JSON from agent response")
-            
-        # Ensure the execution_agent_json has the required structure
-        if "slides" not in execution_agent_json:
-            print("⚠️ Adding missing 'slides' key to execution_agent_json")
-            execution_agent_json = {"slides": execution_agent_json}
-            
-        if len(execution_agent_json["slides"]) == 0:
-            raise HTTPException(status_code=400, detail="Generated JSON contains no slides")
-            
-        # Validate the structure
-        for slide in execution_agent_json["slides"]:
-            if "slide_name" not in slide:
-                raise HTTPException(status_code=400, detail=f"Missing slide_name in slide: {slide}")
-            if slide["slide_name"] not in distinct_layout:
-                print(f"⚠️ Warning: Slide layout '{slide['slide_name']}' not found in template layouts")
-            if "placeholders" not in slide:
-                raise HTTPException(status_code=400, detail=f"Missing placeholders in slide: {slide}")
+        client = get_mistral_client(settings.MISTRAL_API_KEY)
+        execution_agent_json = await choose_slide_layouts(client, settings, slides_data, template_index, slides_layout, mapper)
 
         save_json(execution_agent_json, output_path)
         
@@ -1334,45 +2354,37 @@ async def generate_presentation_from_execution_json(
     template_name: str = Form("template.pptx"),
     execution_json_filename: str = Form("execution_agent.json"),
     output_ppt_filename: str = Form("modified_presentation.pptx"),
-    processed_layout_filename: str = Form("processed_layout.json"),
+    processed_layout_filename: Optional[str] = Form(None, deprecated=True),
     optimize_images: bool = Form(True),
-    remove_slides_count: int = Form(13)
+    remove_slides_count: Optional[int] = Form(None, deprecated=True),
+    job_id: Optional[str] = Form(None),
+    download: bool = Form(False)
 ):
-    """Generate the final presentation based on execution agent JSON"""
+    """
+    Generate the final presentation based on execution agent JSON.
+
+    With download=true the deck is returned directly as the response body
+    instead of being saved to the job's output folder.
+
+    processed_layout_filename and remove_slides_count are ignored and only kept
+    so older clients keep working: layouts come from the template index and
+    sample slides are stripped from the cached template.
+    """
+    workspace = resolve_workspace(job_id)
     print(f"📌 Starting generate-presentation with template: {template_name}")
     try:
         start_time = time.time()
         
         # Prepare directories
-        output_dir = Path("data/output")
+        output_dir = workspace.output_dir
         output_dir.mkdir(parents=True, exist_ok=True)
         
         # Find the template file with case-insensitive matching
-        upload_dir = Path("data/upload")
-        template_path = None
-        
-        # Try exact match first
-        exact_match = upload_dir / template_name
-        if exact_match.exists():
-            template_path = exact_match
-            print(f"📌 Using exact template match: {template_name}")
-        else:
-            # Try case-insensitive matching
-            for file in upload_dir.glob("*.pptx"):
-                if file.name.lower() == template_name.lower():
-                    template_path = file
-                    print(f"📌 Found template with case-insensitive match: {file.name}")
-                    break
-        
-        if not template_path:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Template file {template_name} not found. Available templates: {', '.join([f.name for f in upload_dir.glob('*.pptx')])}"
-            )
+        template_path = resolve_template_path(template_name)
             
         # Set up paths
         template_dir = template_path
-        json_dir = Path("data/metadata")
+        json_dir = workspace.metadata_dir
         execution_agent_json = json_dir / execution_json_filename
         output_ppt_path = output_dir / output_ppt_filename
 
@@ -1385,18 +2397,6 @@ async def generate_presentation_from_execution_json(
         for file_path in json_dir.glob("*"):
             print(f"  - {file_path.name} ({file_path.stat().st_size} bytes)")
             
-        # Load the presentation
-        try:
-            prs = Presentation(template_dir)
-            print(f"✅ Presentation loaded from {template_dir}")
-        except Exception as e:
-            print(f"❌ Error loading template: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to load presentation template: {str(e)}")
-            
-        # Get available layouts for debugging
-        layout_names = [layout.name for layout in prs.slide_master.slide_layouts]
-        print(f"📋 Available layouts in template: {layout_names}")
-        
         # Load the JSON data
         try:
             json_data = load_json(execution_agent_json)
@@ -1420,200 +2420,17 @@ async def generate_presentation_from_execution_json(
         for i, slide in enumerate(json_data.get("slides", [])):
             print(f"  - Slide {i+1}: {slide.get('slide_name', 'UNKNOWN')} with {len(slide.get('placeholders', {}))} placeholders")
 
-        def get_layout_by_name(prs_obj, layout_name):
-            for layout in prs_obj.slide_layouts:
-                if layout.name == layout_name:
-                    return layout
-            return None
-
-        # Function to optimize images if needed
-        def optimize_image(image_path, max_width=1280, quality=85):
-            if not optimize_images:
-                return image_path
-                
-            try:
-                image = Image.open(image_path)
-                # Only resize if image is larger than max dimensions
-                if image.width > max_width:
-                    ratio = max_width / image.width
-                    new_height = int(image.height * ratio)
-                    image = image.resize((max_width, new_height), Image.LANCZOS)
-                
-                # Save optimized version
-                optimized_path = f"{os.path.splitext(image_path)[0]}_optimized.jpg"
-                image.save(optimized_path, "JPEG", quality=quality, optimize=True)
-                print(f"🔍 Optimized image: {os.path.basename(image_path)}")
-                return optimized_path
-            except Exception as e:
-                print(f"⚠️ Image optimization failed: {e}")
-                return image_path
-
-        # Add slides based on JSON data
-        slides_added = 0
-        print(f"🔄 Creating slides from JSON data...")
-        
-        for slide_index, slide_data in enumerate(json_data.get("slides", [])):
-            layout_name = slide_data.get("layout")
-            if not layout_name:
-                try:
-                    layout_name = slide_data.get("slide_name")
-                except Exception as e:
-                    print(f"⚠️ Missing slide_name in slide {slide_index+1}, skipping")
-                    continue
-                
-            layout = get_layout_by_name(prs, layout_name)
-
-            if layout:
-                try:
-                    slide = prs.slides.add_slide(layout)
-                    slides_added += 1
-                    print(f"✅ Added slide {slide_index+1} with layout '{layout_name}'")
-                    
-                    if "placeholders" not in slide_data:
-                        print(f"⚠️ No placeholders found in slide {slide_index+1}")
-                        continue
-                        
-                    for placeholder_name, content in slide_data["placeholders"].items():
-                        name_parts = placeholder_name.split("_")
-                        if len(name_parts) < 2:
-                            print(f"⚠️ Invalid placeholder name format: {placeholder_name}, expected name_index")
-                            continue
-                            
-                        name = name_parts[0]
-                        index = name_parts[-1]
-                        
-                        try:
-                            # Find placeholder by index
-                            placeholder_found = False
-                            idx = int(index)
-                            for shape in slide.shapes:
-                                if hasattr(shape, 'placeholder_format') and shape.placeholder_format.idx == idx:
-                                    placeholder_found = True
-                                    
-                                    # Handle text content
-                                    if shape.has_text_frame:
-                                        if content is None:
-                                            shape.text_frame.text = ""
-                                        elif isinstance(content, list):
-                                            shape.text_frame.clear()
-                                            for item in content:
-                                                paragraph = shape.text_frame.add_paragraph()
-                                                paragraph.text = str(item)
-                                        else:
-                                            # Check if this is a formula path
-                                            if isinstance(content, str) and ("formulas" in content or "Formula" in content) and content.endswith(".png"):
-                                                try:
-                                                    # This is a formula image, insert it
-                                                    formula_path = content
-                                                    # Ensure full path
-                                                    if not os.path.exists(formula_path) and not formula_path.startswith("data/"):
-                                                        formula_path = f"data/formulas/{os.path.basename(formula_path)}"
-                                                    
-                                                    if os.path.exists(formula_path):
-                                                        print(f"🔤 Inserting formula image at {formula_path}")
-                                                        shape.insert_picture(formula_path)
-                                                    else:
-                                                        print(f"⚠️ Formula image not found: {formula_path}")
-                                                        # Try to re-render if possible
-                                                        shape.text_frame.text = "Formula image missing"
-                                                except Exception as e:
-                                                    print(f"⚠️ Error inserting formula image: {e}")
-                                                    shape.text_frame.text = ""  # Don't show the path
-                                            else:
-                                                shape.text_frame.text = str(content)
-                                    
-                                    # Handle picture content
-                                    if name.startswith("Picture") or "Picture" in name or shape.placeholder_format.type == 18:  # 18 is picture type
-                                        try:
-                                            if content and isinstance(content, str):
-                                                # Path normalization - replace backslashes with forward slashes
-                                                pic_path = content.replace("\\", "/")
-                                                
-                                                # Check if this is actually an image path
-                                                if not pic_path.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-                                                    shape.text_frame.text = str(content)
-                                                    continue
-                                                    
-                                                # Make sure it has the full path
-                                                if not os.path.exists(pic_path):
-                                                    if not pic_path.startswith("data/"):
-                                                        if "formula" in pic_path.lower():
-                                                            pic_path = f"data/formulas/{os.path.basename(pic_path)}"
-                                                        elif "figure" in pic_path.lower() or "img" in pic_path.lower():
-                                                            pic_path = f"data/figures/{os.path.basename(pic_path)}"
-                                                
-                                                # Final existence check with detailed error
-                                                if os.path.exists(pic_path):
-                                                    try:
-                                                        print(f"🖼️ Inserting picture: {pic_path}")
-                                                        # Direct insertion attempt
-                                                        shape.insert_picture(pic_path)
-                                                    except Exception as img_error:
-                                                        print(f"❌ Error inserting image: {str(img_error)}")
-                                                        # Try to insert in text frame as fallback
-                                                        if hasattr(shape, 'text_frame'):
-                                                            shape.text_frame.text = f"[Image: {os.path.basename(pic_path)}]"
-                                                else:
-                                                    print(f"⚠️ Image file not found: {pic_path} (exists check failed)")
-                                                    if hasattr(shape, 'text_frame'):
-                                                        shape.text_frame.text = f"[Missing image: {os.path.basename(pic_path)}]"
-                                        except Exception as e:
-                                            print(f"⚠️ Error handling picture placeholder: {e}")
-                                            traceback.print_exc()
-                                            if hasattr(shape, 'text_frame'):
-                                                shape.text_frame.text = "[Image error]"
-                            
-                            if not placeholder_found:
-                                print(f"⚠️ Placeholder with index {index} not found in slide {slide_index+1}")
-                        
-                        except ValueError as e:
-                            print(f"⚠️ Error processing placeholder {placeholder_name}: {e}")
-                            continue
-                
-                except Exception as e:
-                    print(f"❌ Error adding slide {slide_index+1}: {e}")
-                    traceback.print_exc()
-                    continue
-            else:
-                print(f"⚠️ Layout '{layout_name}' not found in the template. Available layouts: {layout_names}")
-
-        if slides_added == 0:
-            raise HTTPException(status_code=400, detail="No slides could be added to the presentation. Check log for details.")
-            
-        print(f"📊 Total slides added: {slides_added}")
-            
-        # Save temporary presentation
-        temp_ppt_path = "temp.pptx"
-        prs.save(temp_ppt_path)
-        print(f"💾 Saved temporary presentation to {temp_ppt_path}")
-
-        prs_1 = Presentation(template_dir)
-        total__template_slides = len(prs_1.slides)
+        if download:
+            pptx_bytes = await asyncio.to_thread(build_presentation_bytes, template_dir, json_data, workspace, optimize_images)
+            print(f"✅ Presentation generated in {time.time() - start_time:.2f}s")
+            return Response(
+                content=pptx_bytes,
+                media_type=PPTX_MEDIA_TYPE,
+                headers={"Content-Disposition": f'attachment; filename="{os.path.basename(output_ppt_filename)}"'}
+            )
 
-        # Load the presentation again to process slides
-        prs = Presentation(temp_ppt_path)
-        total_slides = len(prs.slides)
-        
-        # Only remove slides if there are enough slides
-        remove_slides_count = total__template_slides 
-        if total_slides > remove_slides_count:
-            slides_to_remove = remove_slides_count
-            print(f"🧹 Removing {slides_to_remove} slides from the beginning")
-            
-            for _ in range(slides_to_remove):
-                rId = prs.slides._sldIdLst[0].rId
-                prs.part.drop_rel(rId)
-                del prs.slides._sldIdLst[0]
-        else:
-            print(f"⚠️ Not removing slides: only {total_slides} slides available, need more than {remove_slides_count}")
+        await asyncio.to_thread(build_presentation, template_dir, json_data, output_ppt_path, workspace, optimize_images)
 
-        # Save the final presentation
-        prs.save(str(output_ppt_path))
-        print(f"✅ Final presentation saved to {output_ppt_path}")
-        
-        # Clean up temp file
-        os.remove(temp_ppt_path)
-        
         elapsed = time.time() - start_time
         print(f"✅ Presentation generated in {elapsed:.2f}s")
 
@@ -1624,24 +2441,243 @@ async def generate_presentation_from_execution_json(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error generating presentation: {str(e)}")
 
+@app.post("/generate-presentations/batch")
+async def generate_presentations_batch(
+    template_names: List[str] = Form(...),
+    job_id: Optional[str] = Form(None),
+    optimize_images: bool = Form(True),
+    mapper: Optional[str] = Form(None),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Render the job's updated_slides_data.json into several templates in one request.
+
+    Layout mapping runs concurrently for all templates and each deck is built
+    as soon as its mapping is ready, so comparing N templates costs about one
+    mapping plus one render instead of N sequential runs of
+    /execution-agent-parsing and /generate-presentation. A template that fails
+    is reported in its own result without failing the others.
+    """
+    workspace = resolve_workspace(job_id)
+    start_time = time.time()
+    slides_data_path = workspace.metadata_dir / "updated_slides_data.json"
+    if not slides_data_path.exists():
+        raise HTTPException(status_code=404, detail="updated_slides_data.json not found. Make sure process-slides-data was called.")
+    slides_data = load_json(slides_data_path)
+
+    # Resolve every template up front so a typo fails fast; names that resolve to the same file render once
+    template_paths = {}
+    for template_name in template_names:
+        template_path = resolve_template_path(template_name)
+        template_paths.setdefault(template_path, template_name)
+    print(f"📚 Rendering {len(template_paths)} templates for job {workspace.job_id}")
+
+    client = get_mistral_client(settings.MISTRAL_API_KEY)
+    workspace.output_dir.mkdir(parents=True, exist_ok=True)
+
+    async def render_template(template_path: Path, template_name: str) -> dict:
+        template_start = time.time()
+        template_index = await asyncio.to_thread(get_template_index, template_path)
+        processed_layout = layout_placeholder_keys(template_index.layout_details)
+        execution_agent_json = await choose_slide_layouts(
+            client, settings, slides_data, template_index, processed_layout, mapper
+        )
+        save_json(execution_agent_json, workspace.metadata_dir / f"execution_agent_{template_path.stem}.json")
+
+        output_filename = f"{template_path.stem}_presentation.pptx"
+        slides_added = await asyncio.to_thread(
+            build_presentation, template_path, execution_agent_json,
+            workspace.output_dir / output_filename, workspace, optimize_images
+        )
+        elapsed = round(time.time() - template_start, 2)
+        print(f"✅ {template_name}: {slides_added} slides in {elapsed:.2f}s")
+        return {
+            "template": template_name,
+            "filename": output_filename,
+            "path": str(workspace.output_dir / output_filename),
+            "slides_added": slides_added,
+            "time": elapsed
+        }
+
+    results = await asyncio.gather(
+        *(render_template(path, name) for path, name in template_paths.items()),
+        return_exceptions=True
+    )
+
+    presentations = []
+    for (template_path, template_name), result in zip(template_paths.items(), results):
+        if isinstance(result, Exception):
+            detail = result.detail if isinstance(result, HTTPException) else str(result)
+            print(f"❌ {template_name} failed: {detail}")
+            presentations.append({"template": template_name, "error": detail})
+        else:
+            presentations.append(result)
+
+    if not any("error" not in item for item in presentations):
+        raise HTTPException(status_code=500, detail={"message": "No presentation could be generated", "presentations": presentations})
+
+    elapsed = time.time() - start_time
+    print(f"✅ Batch of {len(presentations)} templates completed in {elapsed:.2f}s")
+    return {
+        "message": "Presentations generated",
+        "job_id": workspace.job_id,
+        "presentations": presentations,
+        "total_time": round(elapsed, 2)
+    }
+
+@app.post("/pipeline/run")
+async def run_pipeline(
+    document_url: str = Form(...),
+    template_name: str = Form("template.pptx"),
+    student_level: str = Form("masters student"),
+    num_slides: int = Form(10),
+    selected_topics: List[str] = Form([]),
+    enhance: bool = Form(True),
+    optimize_images: bool = Form(True),
+    output_ppt_filename: str = Form("generated_presentation.pptx"),
+    job_id: Optional[str] = Form(None),
+    generation_mode: str = Form("auto"),
+    layout_mapper: Optional[str] = Form(None),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Run the whole deck pipeline server-side in one call.
+
+    The stages form a small dependency graph: template layout extraction and
+    OCR figure saving run concurrently with LLM slide generation, formula
+    rendering starts per slide while the deck is still streaming in and
+    overlaps with the figure branch, and intermediate results are
+    handed between stages in memory (the usual JSON files are still written
+    to the job workspace so single-step endpoints can resume from them).
+    """
+    by_section = use_section_mode(generation_mode, num_slides, settings)
+    # Reuse the job created by analyze/url or analyze/pdf, otherwise start a new one
+    workspace = resolve_workspace(job_id) if job_id else create_workspace()
+    template_path = resolve_template_path(template_name)
+    start_time = time.time()
+    timings = {}
+    print(f"\n🚀 Starting pipeline for job {workspace.job_id} with template {template_path.name}")
+
+    async def run_stage(name, fn, *args):
+        # Mistral stages are coroutines on the shared async client, CPU/file stages run in a thread
+        stage_start = time.time()
+        if asyncio.iscoroutinefunction(fn):
+            result = await fn(*args)
+        else:
+            result = await asyncio.to_thread(fn, *args)
+        timings[name] = round(time.time() - stage_start, 2)
+        print(f"⏱️ Stage '{name}' completed in {timings[name]:.2f}s")
+        return result
+
+    def template_stage():
+        layout_details = extract_layout_details(template_path, workspace)
+        return layout_details, convert_layout_placeholders(layout_details, workspace)
+
+    async def figures_stage():
+        ocr_response = await run_figure_ocr(client, settings, document_url)
+        return await asyncio.to_thread(save_figures, ocr_response.model_dump(), workspace)
+
+    client = get_mistral_client(settings.MISTRAL_API_KEY)
+    filtered_prerequisites = load_prerequisites(workspace, selected_topics, required=False)
+
+    # Independent branches start right away
+    template_task = asyncio.create_task(run_stage("template-layout", template_stage))
+    figures_task = asyncio.create_task(run_stage("figures", figures_stage))
+    pending = [template_task, figures_task]
+    completed = False
+
+    try:
+        # Large decks are generated per section; otherwise streamed so the formulas
+        # of early slides render while later slides are still being written
+        slides_data = await run_stage(
+            "slide-data-gen", generate_slide_data_by_section if by_section else generate_slide_data_streaming,
+            client, settings, workspace, student_level, document_url, num_slides, filtered_prerequisites
+        )
+
+        # Formulas only depend on the slide content, so render them while OCR may still be running
+        formulas_task = asyncio.create_task(
+            run_stage("formulas", process_formulas_parallel, slides_data, workspace.formulas_dir)
+        )
+        pending.append(formulas_task)
+
+        try:
+            figures_metadata = await figures_task
+        except Exception as e:
+            print(f"⚠️ Figure extraction failed, continuing without figures: {e}")
+            figures_metadata = {}
+        slides_data = await formulas_task
+        attach_figures(slides_data, figures_metadata)
+        updated_slides_path = workspace.metadata_dir / "updated_slides_data.json"
+        save_json(slides_data, updated_slides_path)
+
+        if enhance and settings.ENHANCE_AGENT_ID:
+            enhanced_slides, message = await run_stage("enhance", enhance_slides, client, settings, slides_data)
+            print(f"🔍 Enhancer: {message}")
+            if enhanced_slides is not None:
+                slides_data = enhanced_slides
+                save_json(slides_data, updated_slides_path)
+
+        layout_details, processed_layout = await template_task
+        execution_agent_json = await run_stage(
+            "layout-mapping", choose_slide_layouts,
+            client, settings, slides_data, get_template_index(template_path), processed_layout, layout_mapper
+        )
+        save_json(execution_agent_json, workspace.metadata_dir / "execution_agent.json")
+
+        output_ppt_path = workspace.output_dir / os.path.basename(output_ppt_filename)
+        slides_added = await run_stage(
+            "generate-presentation", build_presentation,
+            template_path, execution_agent_json, output_ppt_path, workspace, optimize_images
+        )
+        completed = True
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"🚨 Pipeline failed for job {workspace.job_id}: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Pipeline failed: {str(e)}")
+    finally:
+        for task in pending:
+            if not task.done():
+                task.cancel()
+        # Wait for the cancelled branches and retrieve every exception, so none is reported as never retrieved
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        if not completed:
+            for task_result in results:
+                if isinstance(task_result, Exception):
+                    print(f"⚠️ Another pipeline stage also failed: {task_result}")
+
+    elapsed = time.time() - start_time
+    print(f"✅ Pipeline completed in {elapsed:.2f}s: {timings}")
+    return {
+        "message": "Presentation generated successfully",
+        "job_id": workspace.job_id,
+        "path": str(output_ppt_path),
+        "slides_added": slides_added,
+        "timings": timings,
+        "total_time": round(elapsed, 2)
+    }
+
 @app.get("/download-presentation")
-async def download_presentation(filename: str = "modified_presentation.pptx"):
+async def download_presentation(filename: str = "modified_presentation.pptx", job_id: Optional[str] = None):
     """Download the generated presentation"""
-    file_path = Path("data/output") / filename
+    workspace = resolve_workspace(job_id)
+    file_path = workspace.output_dir / os.path.basename(filename)
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="Presentation file not found")
     return FileResponse(file_path, filename=filename)
 
 @app.post("/cleanup-data")
-async def cleanup_data(should_clean: bool = Form(False)):
+async def cleanup_data(should_clean: bool = Form(False), job_id: Optional[str] = Form(None)):
     """
     Optional cleanup endpoint - only to be called manually when needed, 
     not automatically after successful generation
     """
+    workspace = resolve_workspace(job_id)
     try:
         if should_clean:
             # Clean directories only if explicitly requested
-            clean_directories(["data/figures", "data/formulas"])
+            workspace.remove()
             return {"message": "Successfully cleaned up data directories"}
         else:
             return {"message": "No cleanup performed - set should_clean=true to perform cleanup"}
@@ -1738,9 +2774,17 @@ async def api_generate_podcast(
         
         if not document_url:
             raise HTTPException(status_code=400, detail="document_url is required")
+        
+        # Background mode returns a job id right away, progress is polled from /podcast-jobs/{job_id}
+        if request.get("background", False):
+            return start_podcast_job(document_url, prompt_modifiers).to_dict()
+        
+        # Streaming mode returns once the dialogue is ready, the audio is served from /podcast/{filename}
+        if request.get("stream", False):
+            return await asyncio.to_thread(start_podcast_stream, document_url, prompt_modifiers)
             
-        # Call the generate_podcast function from the imported module
-        result = generate_podcast(document_url, prompt_modifiers)
+        # Call the generate_podcast function from the imported module, off the event loop
+        result = await asyncio.to_thread(generate_podcast, document_url, prompt_modifiers)
         
         return result
         
@@ -1777,8 +2821,8 @@ async def legacy_generate_podcast(
         if language:
             prompt_modifiers["language"] = language
             
-        # Call the generate_podcast function from the imported module
-        result = generate_podcast(document_url, prompt_modifiers)
+        # Call the generate_podcast function from the imported module, off the event loop
+        result = await asyncio.to_thread(generate_podcast, document_url, prompt_modifiers)
         
         return result
         
@@ -1787,9 +2831,23 @@ async def legacy_generate_podcast(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error generating podcast: {str(e)}")
 
+@app.get("/podcast-jobs/{job_id}")
+async def get_podcast_job_status(job_id: str):
+    """Poll a background podcast job for its status, segment progress and result URLs"""
+    job = get_podcast_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Podcast job '{job_id}' not found")
+    return job.to_dict()
+
 @app.get("/podcast/{filename}")
 async def get_podcast_file(filename: str):
     """Get podcast file by filename"""
+    # Podcasts still being synthesized are sent as a chunked MP3 stream
+    stream = get_podcast_stream(filename)
+    if stream is not None:
+        print(f"Streaming podcast file: {filename}")
+        return podcast_stream_response(stream)
+    
     podcast_path = Path("podcast") / filename
     if not podcast_path.exists():
         raise HTTPException(status_code=404, detail=f"Podcast file '{filename}' not found")
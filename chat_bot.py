@@ -2,6 +2,8 @@ import os
 import re
 import uuid
 import time
+import hashlib
+import asyncio
 from typing import List, Optional, Dict, Any
 from urllib.parse import urlparse
 from functools import lru_cache
@@ -21,7 +23,10 @@ os.environ['SSL_CERT_DIR'] = ''
 os.environ['REQUESTS_CA_BUNDLE'] = ''
 os.environ['CURL_CA_BUNDLE'] = ''
 
-from mistralai import Mistral
+from ocr_cache import ocr_document_async, ocr_markdown
+from mistral_client import get_mistral_client
+from single_flight import single_flight, flight_key
+from utils import parse_arxiv_url, canonical_document_id
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_mistralai import MistralAIEmbeddings, ChatMistralAI
 from langchain.schema import HumanMessage
@@ -41,7 +46,7 @@ CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
 MAX_COLLECTIONS = int(os.getenv("MAX_COLLECTIONS", "4"))
 
 # Initialize clients
-mistral_client = Mistral(api_key=MISTRAL_API_KEY)
+mistral_client = get_mistral_client(MISTRAL_API_KEY)
 embeddings = MistralAIEmbeddings()
 
 # Collection tracking
@@ -62,7 +67,8 @@ app.add_middleware(
 
 # RAG LLM setup
 LLM_MODEL = os.getenv("MISTRAL_MODEL", "mistral-large-latest")
-llm = ChatMistralAI(model=LLM_MODEL, temperature=0.3)
+# LangChain talks to Mistral through its own HTTP client, so it retries 429/5xx itself
+llm = ChatMistralAI(model=LLM_MODEL, temperature=0.3, max_retries=int(os.getenv("MISTRAL_MAX_RETRIES", "5")))
 
 # Enhanced prompt template
 RAG_PROMPT = (
@@ -124,7 +130,12 @@ def sanitize_filename(name: str) -> str:
 
 def get_collection_name(url_or_filename: str) -> str:
     """Generate a collection name from URL or filename."""
-    if url_or_filename.startswith(('http://', 'https://')):
+    arxiv = parse_arxiv_url(url_or_filename)
+    if arxiv is not None:
+        # Same name for abs/pdf/.pdf spellings of one paper version
+        arxiv_id, version = arxiv
+        base_name = f"arxiv-{arxiv_id.replace('.', '-')}{version or ''}"
+    elif url_or_filename.startswith(('http://', 'https://')):
         # Handle URL
         parsed = urlparse(url_or_filename)
         path = parsed.path
@@ -163,26 +174,10 @@ def get_or_create_vectorstore(collection_name: str) -> Chroma:
     
     return vectorstore
 
-def perform_ocr_from_url(url: str) -> str:
-    """Call Mistral OCR and extract markdown if available, else fallback to plain text blocks."""
-    resp = mistral_client.ocr.process(
-        model="mistral-ocr-latest",
-        document={"type": "document_url", "document_url": url},
-        include_image_base64=False
-    )
-    contents: List[str] = []
-    # If response has markdown pages
-    for page in getattr(resp, "pages", []):
-        md = getattr(page, "markdown", None)
-        if md:
-            contents.append(md)
-        else:
-            # fallback to blocks
-            for block in getattr(page, "blocks", []):
-                text = getattr(block, "text", None)
-                if text:
-                    contents.append(text)
-    return "\n\n".join(contents)
+async def perform_ocr_from_url(url: str) -> str:
+    """Call Mistral OCR (through the shared OCR cache) and extract markdown if available, else fallback to plain text blocks."""
+    resp = await ocr_document_async(mistral_client, document_url=url)
+    return ocr_markdown(resp)
 
 def ingest_text(text: str, collection_name: str, source_metadata: dict) -> int:
     """Ingest text into a specified collection with source metadata."""
@@ -211,7 +206,7 @@ async def ingest_url(document_url: str = Form(...)):
         collection_name = get_collection_name(document_url)
         
         # Extract text using OCR
-        text = perform_ocr_from_url(document_url)
+        text = await perform_ocr_from_url(document_url)
         
         # Source metadata
         source_metadata = {
@@ -222,7 +217,7 @@ async def ingest_url(document_url: str = Form(...)):
         }
         
         # Ingest text
-        chunks = ingest_text(text, collection_name, source_metadata)
+        chunks = await asyncio.to_thread(ingest_text, text, collection_name, source_metadata)
         
         processing_time = time.time() - start_time
         
@@ -243,15 +238,10 @@ async def ingest_file(file: UploadFile = File(...)):
         # Generate collection name from filename
         collection_name = get_collection_name(file.filename)
         
-        # Upload to Mistral for OCR
-        uploaded = mistral_client.files.upload(
-            file={"file_name": file.filename, "content": await file.read()},
-            purpose="ocr"
-        )
-        signed = mistral_client.files.get_signed_url(file_id=uploaded.id)
-        
-        # Extract text using OCR
-        text = perform_ocr_from_url(signed.url)
+        # Extract text using OCR, uploading to Mistral only on a cache miss
+        content = await file.read()
+        resp = await ocr_document_async(mistral_client, document_bytes=content, file_name=file.filename)
+        text = ocr_markdown(resp)
         
         # Source metadata
         source_metadata = {
@@ -259,11 +249,11 @@ async def ingest_file(file: UploadFile = File(...)):
             "type": "file",
             "title": file.filename,
             "ingested_at": time.time(),
-            "file_id": uploaded.id
+            "sha256": hashlib.sha256(content).hexdigest()
         }
         
         # Ingest text
-        chunks = ingest_text(text, collection_name, source_metadata)
+        chunks = await asyncio.to_thread(ingest_text, text, collection_name, source_metadata)
         
         processing_time = time.time() - start_time
         
@@ -301,7 +291,7 @@ async def query(request: QueryRequest):
         all_docs = []
         for collection_name in collections_to_search:
             try:
-                docs = get_cached_retrieval(request.question, collection_name, request.k)
+                docs = await asyncio.to_thread(get_cached_retrieval, request.question, collection_name, request.k)
                 all_docs.extend(docs)
             except Exception as e:
                 print(f"Error retrieving from collection {collection_name}: {e}")
@@ -323,7 +313,7 @@ async def query(request: QueryRequest):
         prompt = RAG_PROMPT.format(context=context, question=request.question)
         
         # Get answer from LLM
-        result = llm.invoke([HumanMessage(content=prompt)])
+        result = await llm.ainvoke([HumanMessage(content=prompt)])
         answer = str(result.content).strip()
         
         # Add assistant message to history
@@ -371,6 +361,37 @@ async def chat(
     # Call query endpoint
     return await query(request)
 
+async def ensure_url_collection(document_url: str) -> str:
+    """Return the collection for a document URL, ingesting the document first if needed."""
+    # First, check if we already have a collection for this URL
+    # Generate a deterministic collection name from the URL
+    collection_name = get_collection_name(document_url)
+    
+    # Check if this URL has already been processed (names only differ by their timestamp suffix)
+    base_name = collection_name.rsplit("_", 1)[0]
+    for coll in collections:
+        if coll["name"].rsplit("_", 1)[0] == base_name:
+            print(f"Using existing collection for URL: {coll['name']}")
+            return coll["name"]
+    
+    # If not processed, ingest the document
+    print(f"Ingesting new document from URL: {document_url}")
+    # Extract text using OCR
+    text = await perform_ocr_from_url(document_url)
+    
+    # Source metadata
+    source_metadata = {
+        "source": document_url,
+        "type": "url",
+        "title": urlparse(document_url).path.split("/")[-1],
+        "ingested_at": time.time()
+    }
+    
+    # Ingest text
+    chunks = await asyncio.to_thread(ingest_text, text, collection_name, source_metadata)
+    print(f"Ingested document with {chunks} chunks into collection: {collection_name}")
+    return collection_name
+
 @app.post("/chat_by_url")
 async def chat_by_url(
     question: str,
@@ -380,37 +401,11 @@ async def chat_by_url(
 ):
     """Process a document URL and then answer questions about it."""
     try:
-        # First, check if we already have a collection for this URL
-        # Generate a deterministic collection name from the URL
-        collection_name = get_collection_name(document_url)
-        
-        # Check if this URL has already been processed
-        url_collection_exists = False
-        for coll in collections:
-            if coll["name"].startswith(collection_name.split("_")[0]):
-                url_collection_exists = True
-                collection_name = coll["name"]
-                break
-        
-        # If not processed, ingest the document
-        if not url_collection_exists:
-            print(f"Ingesting new document from URL: {document_url}")
-            # Extract text using OCR
-            text = perform_ocr_from_url(document_url)
-            
-            # Source metadata
-            source_metadata = {
-                "source": document_url,
-                "type": "url",
-                "title": urlparse(document_url).path.split("/")[-1],
-                "ingested_at": time.time()
-            }
-            
-            # Ingest text
-            chunks = ingest_text(text, collection_name, source_metadata)
-            print(f"Ingested document with {chunks} chunks into collection: {collection_name}")
-        else:
-            print(f"Using existing collection for URL: {collection_name}")
+        # Concurrent questions about the same URL wait for a single ingestion
+        collection_name = await single_flight.do(
+            flight_key("ingest_url", document=canonical_document_id(document_url)),
+            lambda: ensure_url_collection(document_url)
+        )
         
         # Now create request for chat query
         request = QueryRequest(
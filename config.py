@@ -9,11 +9,40 @@ class Config:
         self.FIGURES_DIR = self.BASE_DIR / "data" / "figures"
         self.FORMULAS_DIR = self.BASE_DIR / "data" / "formulas"
         self.PRESENTATION_TEMPLATE_DIR = self.BASE_DIR / "data" / "upload"
+        self.OUTPUT_DIR = self.BASE_DIR / "data" / "output"
+        self.JOBS_DIR = self.BASE_DIR / "data" / "jobs"
+        self.CACHE_DIR = Path(os.getenv("CACHE_DIR", self.BASE_DIR / "data" / "cache"))
+        self.JOB_TTL_HOURS = float(os.getenv("JOB_TTL_HOURS", "24"))
+        self.FORMULA_CACHE_MAX_MB = float(os.getenv("FORMULA_CACHE_MAX_MB", "256"))
+        # Prerequisite analyses are reused across jobs until they expire (0 keeps them until evicted)
+        self.ANALYSIS_CACHE_TTL_HOURS = float(os.getenv("ANALYSIS_CACHE_TTL_HOURS", "168"))
+        self.ANALYSIS_CACHE_MAX_MB = float(os.getenv("ANALYSIS_CACHE_MAX_MB", "64"))
+        # OCR responses keep their page images when a caller asked for them, so they get their own budget
+        self.OCR_CACHE_MAX_MB = float(os.getenv("OCR_CACHE_MAX_MB", "512"))
+        # Figures and formulas are resized to their placeholder at this resolution before embedding
+        self.IMAGE_DPI = int(os.getenv("IMAGE_DPI", "150"))
+        self.IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+        self.IMAGE_CACHE_MAX_MB = float(os.getenv("IMAGE_CACHE_MAX_MB", "256"))
+        self.IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+        # Shared Mistral HTTP connection pool
+        self.MISTRAL_POOL_SIZE = int(os.getenv("MISTRAL_POOL_SIZE", "20"))
+        self.MISTRAL_KEEPALIVE_SECONDS = float(os.getenv("MISTRAL_KEEPALIVE_SECONDS", "60"))
+        self.MISTRAL_CONNECT_TIMEOUT = float(os.getenv("MISTRAL_CONNECT_TIMEOUT", "10"))
+        self.MISTRAL_TIMEOUT = float(os.getenv("MISTRAL_TIMEOUT", "300"))
+        # Client-side rate limits (0 disables a limit) and retry with backoff on 429/5xx
+        self.MISTRAL_REQUESTS_PER_MINUTE = float(os.getenv("MISTRAL_REQUESTS_PER_MINUTE", "60"))
+        self.MISTRAL_TOKENS_PER_MINUTE = float(os.getenv("MISTRAL_TOKENS_PER_MINUTE", "500000"))
+        self.MISTRAL_MAX_RETRIES = int(os.getenv("MISTRAL_MAX_RETRIES", "5"))
+        self.MISTRAL_BACKOFF_BASE = float(os.getenv("MISTRAL_BACKOFF_BASE", "1"))
+        self.MISTRAL_BACKOFF_MAX = float(os.getenv("MISTRAL_BACKOFF_MAX", "60"))
         # Ensure directories exist
         self.TEMPLATE_METADATA_DIR.mkdir(parents=True, exist_ok=True)
         self.PRESENTATION_TEMPLATE_DIR.mkdir(parents=True, exist_ok=True)
         self.FIGURES_DIR.mkdir(parents=True, exist_ok=True)
         self.FORMULAS_DIR.mkdir(parents=True, exist_ok=True)
+        self.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        self.JOBS_DIR.mkdir(parents=True, exist_ok=True)
+        self.CACHE_DIR.mkdir(parents=True, exist_ok=True)
         self.student_levels = {
             "1": "PhD researcher",
             "2": "Master's student", 
@@ -30,6 +59,9 @@ class Config:
             "formulas": str(self.FORMULAS_DIR),
             "student_level": self.student_levels[self.STUDENT_LEVEL],
             "template_dir": str(self.PRESENTATION_TEMPLATE_DIR),
+            "output": str(self.OUTPUT_DIR),
+            "jobs": str(self.JOBS_DIR),
+            "cache": str(self.CACHE_DIR),
         }
 
 # API keys
@@ -44,7 +76,10 @@ TTS_CONFIG = {
     "sdp_ratio": 0.8,       # Attention control parameter
     "noise_scale": 0.6,     # Noise for variance adaptor
     "noise_scale_w": 0.8,   # Noise for duration predictor
-    "speed": 1.0            # Speech speed
+    "speed": 1.0,           # Speech speed
+    "preload": os.getenv("TTS_PRELOAD", "false").lower() in ("1", "true", "yes"),  # Load and warm up the model at startup
+    "workers": int(os.getenv("TTS_WORKERS", "1")),  # >1 synthesizes dialogue lines in a process pool
+    "cache_max_mb": float(os.getenv("TTS_CACHE_MAX_MB", "512"))  # Disk budget for synthesized lines
 }
 
 # File paths
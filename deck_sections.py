@@ -0,0 +1,80 @@
+from typing import List
+
+# Title and agenda slides are written from the outline, not by a section call
+FIXED_SLIDES = 2
+
+
+def allocate_section_slides(sections: list, total: int) -> list:
+    """
+    Clamp the outline's slide counts so every section gets at least one slide and the sections fit in total.
+
+    total is the slide budget of the sections alone, i.e. the deck size minus
+    FIXED_SLIDES. Sections beyond the budget are dropped, then the largest
+    sections are trimmed until the counts add up to at most total.
+    """
+    sections = [s for s in sections if s.title.strip()][:max(total, 0)]
+    for section in sections:
+        section.num_slides = max(1, section.num_slides)
+    overflow = sum(s.num_slides for s in sections) - total
+    # Trim the largest sections first
+    while overflow > 0:
+        largest = max(sections, key=lambda s: s.num_slides)
+        if largest.num_slides == 1:
+            break
+        largest.num_slides -= 1
+        overflow -= 1
+    return sections
+
+
+class SectionMerger:
+    """
+    Assemble title, agenda and section slides into one deck, in deck order.
+
+    Sections are added one at a time as they are ready, so the merged slides
+    can be streamed. Formulas already shown on an earlier slide are dropped,
+    formula names are made unique across sections, and the deck is cut off at
+    max_slides.
+    """
+
+    def __init__(self, outline, max_slides: int):
+        self.outline = outline
+        self.max_slides = max_slides
+        self.slides: List[dict] = []
+        self.seen_formulas = set()
+        self.used_names = set()
+
+    def opening_slides(self) -> List[dict]:
+        return self._append([
+            {"title": self.outline.title, "subtitle": self.outline.subtitle, "text": [], "formula_images": [], "picture": []},
+            {"title": "Agenda", "subtitle": None, "text": [s.title for s in self.outline.sections], "formula_images": [], "picture": []}
+        ])
+
+    def add_section(self, slides: List[dict]) -> List[dict]:
+        """Add the slides of the next section and return the ones that made it into the deck"""
+        for slide in slides:
+            formulas = []
+            for item in slide.get("formula_images") or []:
+                if not isinstance(item, dict) or "formula" not in item or "name" not in item:
+                    continue
+                if item["formula"] in self.seen_formulas:
+                    continue
+                self.seen_formulas.add(item["formula"])
+                # Formula names become image file names, so they must be unique across sections
+                name = item["name"]
+                suffix = 2
+                while name in self.used_names:
+                    name = f"{item['name']}_{suffix}"
+                    suffix += 1
+                self.used_names.add(name)
+                formulas.append({"formula": item["formula"], "name": name})
+            slide["formula_images"] = formulas
+        return self._append(slides)
+
+    def _append(self, slides: List[dict]) -> List[dict]:
+        slides = slides[:max(0, self.max_slides - len(self.slides))]
+        self.slides.extend(slides)
+        return slides
+
+    def result(self) -> dict:
+        return {"content": self.slides}
+
@@ -0,0 +1,121 @@
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+class DiskLRUCache:
+    """
+    Size-bounded, content-addressed file cache on disk.
+
+    Entries are stored as {directory}/{key}{suffix}. Reading an entry bumps its
+    mtime, and when the entries grow over max_bytes the least recently used
+    ones are deleted. Caches live under config.CACHE_DIR (data/cache unless
+    overridden), which clean_directories() does not touch, so entries survive
+    job cleanup and process restarts.
+
+    The directory is scanned once when the cache is created. After that every
+    process keeps its own index of entry sizes in recency order plus a running
+    total, so puts and evictions never walk the directory again.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, suffix: str = ""):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Entry file name -> size in bytes, least recently used first
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._load_index()
+
+    def _load_index(self):
+        entries = []
+        for path in self.directory.iterdir():
+            # Temporary files may belong to a write in progress in another process
+            if path.name.startswith(".tmp_") or not path.is_file():
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, path.name, stat.st_size))
+        entries.sort()
+        with self._lock:
+            for _, name, size in entries:
+                self._index[name] = size
+                self._total += size
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Optional[Path]:
+        """Return the path of a cached entry, or None on a miss"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(path.name)
+            return None
+        with self._lock:
+            if path.name in self._index:
+                self._index.move_to_end(path.name)
+            else:
+                # Written by another process (e.g. a pool worker) after our index was built
+                self._remember(path.name, path.stat().st_size)
+        return path
+
+    def put(self, key: str, src_path) -> Path:
+        """Copy a file into the cache"""
+        tmp_path = self.directory / f".tmp_{uuid.uuid4().hex}{self.suffix}"
+        shutil.copyfile(src_path, tmp_path)
+        return self._commit(key, tmp_path)
+
+    def put_bytes(self, key: str, data: bytes) -> Path:
+        """Write raw bytes into the cache"""
+        tmp_path = self.directory / f".tmp_{uuid.uuid4().hex}{self.suffix}"
+        tmp_path.write_bytes(data)
+        return self._commit(key, tmp_path)
+
+    def _commit(self, key: str, tmp_path: Path) -> Path:
+        # os.replace is atomic, so readers never see a half written entry
+        path = self.path_for(key)
+        size = tmp_path.stat().st_size
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._remember(path.name, size)
+        self.evict()
+        return path
+
+    def _remember(self, name: str, size: int):
+        self._forget(name)
+        self._index[name] = size
+        self._total += size
+
+    def _forget(self, name: str):
+        size = self._index.pop(name, None)
+        if size is not None:
+            self._total -= size
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        if self.max_bytes <= 0:
+            return
+        with self._lock:
+            # Never drop the entry that was just written, even if it alone is over budget
+            while self._total > self.max_bytes and len(self._index) > 1:
+                name, size = self._index.popitem(last=False)
+                self._total -= size
+                (self.directory / name).unlink(missing_ok=True)
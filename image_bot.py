@@ -19,7 +19,8 @@ from pydantic import BaseModel
 
 from pyppeteer import launch
 import matplotlib.pyplot as plt
-from mistralai import Mistral
+from ocr_cache import ocr_document_async
+from mistral_client import get_mistral_client
 from dotenv import load_dotenv
 
 print("Starting image_bot.py - Initializing system...")
@@ -37,7 +38,7 @@ else:
 
 # Initialize Mistral client
 print("Initializing Mistral client...")
-mistral_client = Mistral(api_key=MISTRAL_API_KEY)
+mistral_client = get_mistral_client(MISTRAL_API_KEY)
 print("Mistral client initialized successfully")
 
 # Create directories for storing images and code
@@ -134,15 +135,11 @@ class ImageResponse(BaseModel):
 print("Models defined successfully")
 
 # Function to extract text from document URLs using Mistral OCR
-def perform_ocr_from_url(url: str) -> str:
+async def perform_ocr_from_url(url: str) -> str:
     """Call Mistral OCR and extract markdown if available, else fallback to plain text blocks."""
     print(f"Starting OCR extraction from URL: {url}")
     try:
-        resp = mistral_client.ocr.process(
-            model="mistral-ocr-latest",
-            document={"type": "document_url", "document_url": url},
-            include_image_base64=False
-        )
+        resp = await ocr_document_async(mistral_client, document_url=url)
         print(f"OCR response received, processing content...")
         
         contents: List[str] = []
@@ -174,7 +171,7 @@ def perform_ocr_from_url(url: str) -> str:
         raise
 
 # Extract paper summary for context
-def extract_paper_summary(paper_text: str) -> str:
+async def extract_paper_summary(paper_text: str) -> str:
     """Extract a concise summary of the paper to use as context."""
     print(f"Generating paper summary from {len(paper_text)} chars of text")
     
@@ -196,7 +193,7 @@ def extract_paper_summary(paper_text: str) -> str:
     
     print("Calling Mistral API to generate paper summary...")
     try:
-        resp = mistral_client.chat.complete(
+        resp = await mistral_client.chat.complete_async(
             model="mistral-large-latest",
             messages=[
                 {"role": "system", "content": prompt},
@@ -283,7 +280,7 @@ TEMPLATES = {
 print("Templates defined successfully")
 
 # Route request to determine the best visualization mode
-def llm_route(prompt: str) -> str:
+async def llm_route(prompt: str) -> str:
     print(f"Auto-detecting visualization mode for prompt: '{prompt[:50]}...'")
     routing_prompt = (
         "Classify the user request into one of: html, graph, plot.\n"
@@ -294,7 +291,7 @@ def llm_route(prompt: str) -> str:
     )
     try:
         print("Calling Mistral API for visualization mode detection...")
-        resp = mistral_client.chat.complete(
+        resp = await mistral_client.chat.complete_async(
             model="mistral-tiny-latest",
             messages=[
                 {'role': 'system', 'content': routing_prompt},
@@ -328,7 +325,7 @@ async def generate_html_image(prompt: str, output_path: str, paper_context: str
     
     try:
         print("Calling Mistral API to generate HTML code...")
-        resp = mistral_client.chat.complete(
+        resp = await mistral_client.chat.complete_async(
             model="mistral-large-latest",
             messages=[
                 {'role': 'system', 'content': 'Mode: html'},
@@ -533,7 +530,7 @@ def execute_python(code: str, output_path: str, image_name: str = "") -> str:
         raise Exception(f"Failed to generate image at {output_path}")
 
 # Generate graph visualization
-def generate_graph_image(prompt: str, output_path: str, paper_context: str = "", image_name: str = "") -> str:
+async def generate_graph_image(prompt: str, output_path: str, paper_context: str = "", image_name: str = "") -> str:
     """Generate graph/diagram visualization for prompt."""
     print(f"Generating graph visualization for prompt: '{prompt[:50]}...'")
     print(f"Paper context available: {len(paper_context) > 0}, length: {len(paper_context)} chars")
@@ -549,7 +546,7 @@ def generate_graph_image(prompt: str, output_path: str, paper_context: str = "",
     
     try:
         print("Calling Mistral API to generate graph code...")
-        resp = mistral_client.chat.complete(
+        resp = await mistral_client.chat.complete_async(
             model="mistral-large-latest",
             messages=[
                 {'role': 'system', 'content': 'Mode: graph'},
@@ -578,7 +575,7 @@ def generate_graph_image(prompt: str, output_path: str, paper_context: str = "",
         # Pass the image name to execute_python
         
         print("Executing graph code...")
-        return execute_python(python_code, output_path, image_name)
+        return await asyncio.to_thread(execute_python, python_code, output_path, image_name)
     except Exception as e:
         print(f"ERROR during graph generation: {str(e)}")
         traceback.print_exc()
@@ -586,7 +583,7 @@ def generate_graph_image(prompt: str, output_path: str, paper_context: str = "",
         raise
 
 # Generate plot/chart
-def generate_plot_image(prompt: str, output_path: str, paper_context: str = "", image_name: str = "") -> str:
+async def generate_plot_image(prompt: str, output_path: str, paper_context: str = "", image_name: str = "") -> str:
     """Generate plot/chart visualization for prompt."""
     print(f"Generating plot/chart for prompt: '{prompt[:50]}...'")
     print(f"Paper context available: {len(paper_context) > 0}, length: {len(paper_context)} chars")
@@ -602,7 +599,7 @@ def generate_plot_image(prompt: str, output_path: str, paper_context: str = "",
     
     try:
         print("Calling Mistral API to generate plot code...")
-        resp = mistral_client.chat.complete(
+        resp = await mistral_client.chat.complete_async(
             model="mistral-large-latest",
             messages=[
                 {'role': 'system', 'content': 'Mode: plot'},
@@ -631,7 +628,7 @@ def generate_plot_image(prompt: str, output_path: str, paper_context: str = "",
         
         print("Executing plot code...")
         # Pass the image name to execute_python
-        return execute_python(python_code, output_path, image_name)
+        return await asyncio.to_thread(execute_python, python_code, output_path, image_name)
     except Exception as e:
         print(f"ERROR during plot generation: {str(e)}")
         traceback.print_exc()
@@ -660,12 +657,12 @@ async def add_paper_context(request: PaperContextRequest):
         
         # Extract text from paper
         print("Extracting text from paper URL...")
-        paper_text = perform_ocr_from_url(request.document_url)
+        paper_text = await perform_ocr_from_url(request.document_url)
         print(f"Text extraction complete. Text length: {len(paper_text)} chars")
         
         # Extract a summary for use as context
         print("Generating paper summary...")
-        paper_summary = extract_paper_summary(paper_text)
+        paper_summary = await extract_paper_summary(paper_text)
         print(f"Summary generated. Summary length: {len(paper_summary)} chars")
         
         # Save in our context storage
@@ -706,10 +703,10 @@ async def generate_image(request: ImageRequest):
         if request.document_url and session_id not in PAPER_CONTEXTS:
             print(f"Processing document URL since context not available for session {session_id}")
             try:
-                paper_text = perform_ocr_from_url(request.document_url)
+                paper_text = await perform_ocr_from_url(request.document_url)
                 print(f"Paper text extracted: {len(paper_text)} chars")
                 
-                paper_summary = extract_paper_summary(paper_text)
+                paper_summary = await extract_paper_summary(paper_text)
                 print(f"Paper summary created: {len(paper_summary)} chars")
                 
                 PAPER_CONTEXTS[session_id] = paper_summary
@@ -732,7 +729,7 @@ async def generate_image(request: ImageRequest):
         mode = request.mode
         if not mode:
             print("No visualization mode specified, using auto-detection")
-            mode = llm_route(request.prompt)
+            mode = await llm_route(request.prompt)
             print(f"Auto-detected mode: {mode}")
         else:
             print(f"Using specified mode: {mode}")
@@ -755,11 +752,11 @@ async def generate_image(request: ImageRequest):
             print("HTML visualization complete")
         elif mode == 'graph':
             print("Generating graph/diagram visualization...")
-            generate_graph_image(request.prompt, output_path, paper_context, image_name)
+            await generate_graph_image(request.prompt, output_path, paper_context, image_name)
             print("Graph visualization complete")
         elif mode == 'plot':
             print("Generating plot/chart visualization...")
-            generate_plot_image(request.prompt, output_path, paper_context, image_name)
+            await generate_plot_image(request.prompt, output_path, paper_context, image_name)
             print("Plot visualization complete")
         else:
             print(f"ERROR: Invalid mode: {mode}")
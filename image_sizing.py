@@ -0,0 +1,170 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from config import config
+from disk_cache import DiskLRUCache
+
+EMU_PER_INCH = 914400
+# Images with at most this many distinct colours (formulas, diagrams, plots) stay lossless
+PNG_MAX_COLORS = 512
+
+# Resized variants keyed by (source hash, target size, dpi), shared by every job
+resized_image_cache = DiskLRUCache(
+    config.CACHE_DIR / "images",
+    max_bytes=int(config.IMAGE_CACHE_MAX_MB * 1024 * 1024)
+)
+
+# (path, mtime, size) -> content hash, so an image used on several slides is hashed once
+_digests: Dict[Tuple[str, int, int], str] = {}
+_digests_lock = threading.Lock()
+
+
+def image_digest(image_path) -> str:
+    stat = os.stat(image_path)
+    key = (str(image_path), stat.st_mtime_ns, stat.st_size)
+    digest = _digests.get(key)
+    if digest is None:
+        digest = hashlib.sha256(Path(image_path).read_bytes()).hexdigest()
+        with _digests_lock:
+            _digests[key] = digest
+    return digest
+
+
+def target_pixels(width_emu: int, height_emu: int, dpi: int) -> Tuple[int, int]:
+    """Pixel size of a placeholder printed at dpi"""
+    return (
+        max(1, round(width_emu / EMU_PER_INCH * dpi)),
+        max(1, round(height_emu / EMU_PER_INCH * dpi))
+    )
+
+
+def has_transparency(image: Image.Image) -> bool:
+    if image.mode in ("RGBA", "LA"):
+        return image.getchannel("A").getextrema()[0] < 255
+    return image.mode == "P" and "transparency" in image.info
+
+
+def choose_format(image: Image.Image) -> str:
+    """PNG for transparent or flat-colour images (formulas, diagrams), JPEG for photographic content"""
+    if has_transparency(image):
+        return "PNG"
+    if image.convert("RGB").getcolors(maxcolors=PNG_MAX_COLORS) is not None:
+        return "PNG"
+    return "JPEG"
+
+
+def encode_image(image: Image.Image, image_format: str) -> bytes:
+    buffer = io.BytesIO()
+    if image_format == "JPEG":
+        image.convert("RGB").save(buffer, "JPEG", quality=config.IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        if image.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+            image = image.convert("RGBA")
+        image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def fit_image_to_placeholder(image_path, width_emu: Optional[int], height_emu: Optional[int], dpi: int = None) -> Optional[bytes]:
+    """
+    Return the encoded bytes of the image sized for a placeholder, or None when the original is already small enough.
+
+    The image is scaled down (never up) until it just covers the placeholder at
+    dpi pixels per inch, matching how insert_picture crops it to fill the
+    frame, then re-encoded as PNG or JPEG depending on its content. Variants
+    are memoized in resized_image_cache by (source hash, target size, dpi), so
+    a figure reused across slides or decks is only resized once. The bytes are
+    returned rather than a cache path, since another process may evict the
+    cache file before the deck is assembled.
+    """
+    if not width_emu or not height_emu:
+        return None
+    dpi = dpi or config.IMAGE_DPI
+    target_width, target_height = target_pixels(width_emu, height_emu, dpi)
+    key = f"{image_digest(image_path)}_{target_width}x{target_height}_{dpi}"
+
+    for suffix in (".png", ".jpg"):
+        cached = resized_image_cache.get(key + suffix)
+        if cached is not None:
+            try:
+                return cached.read_bytes()
+            except FileNotFoundError:
+                # Evicted between the lookup and the read, resize again
+                break
+
+    with Image.open(image_path) as image:
+        image.load()
+        scale = max(target_width / image.width, target_height / image.height)
+        if scale < 1:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            resized = image.resize(size, Image.LANCZOS)
+        else:
+            resized = image
+        image_format = choose_format(resized)
+        data = encode_image(resized, image_format)
+
+    # Nothing to gain: keep embedding the original file
+    if scale >= 1 and len(data) >= os.path.getsize(image_path):
+        return None
+
+    suffix = ".jpg" if image_format == "JPEG" else ".png"
+    resized_image_cache.put_bytes(key + suffix, data)
+    print(f"🔍 Resized {os.path.basename(str(image_path))} to {resized.width}x{resized.height} {image_format} ({len(data) // 1024} KB)")
+    return data
+
+
+# Pillow only releases the GIL for part of decoding/resizing, so deck images are prepared in processes
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_image_pool(workers: int = config.IMAGE_WORKERS) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_image_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+
+
+def prepare_images(jobs: List[Tuple[str, int, int]], dpi: int = None) -> Dict[Tuple[str, int, int], Optional[bytes]]:
+    """
+    Fit many (path, width_emu, height_emu) images at once.
+
+    Jobs run in the shared process pool when there is more than one image and
+    more than one worker. Returns the ready-to-embed bytes per job (None when
+    the original file should be embedded as is); jobs that fail are left out
+    so the caller can fall back to the original image.
+    """
+    dpi = dpi or config.IMAGE_DPI
+    prepared = {}
+    if len(jobs) < 2 or config.IMAGE_WORKERS < 2:
+        for job in jobs:
+            try:
+                prepared[job] = fit_image_to_placeholder(*job, dpi)
+            except Exception as e:
+                print(f"⚠️ Image preparation failed for {job[0]}: {e}")
+        return prepared
+
+    pool = get_image_pool()
+    futures = {job: pool.submit(fit_image_to_placeholder, *job, dpi) for job in jobs}
+    for job, future in futures.items():
+        try:
+            prepared[job] = future.result()
+        except Exception as e:
+            print(f"⚠️ Image preparation failed for {job[0]}: {e}")
+    return prepared
@@ -11,7 +11,9 @@ from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, HttpUrl
 from typing import Optional, List
 import uvicorn
-from mistralai import Mistral
+from ocr_cache import ocr_document_async
+from utils import canonical_document_id
+from mistral_client import get_mistral_client as get_shared_mistral_client
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
@@ -35,14 +37,12 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # Mount static files directory
 app.mount("/figures", StaticFiles(directory=OUTPUT_DIR), name="figures")
 
-# Initialize Mistral client
+# Shared, connection-pooled Mistral client
 def get_mistral_client():
     api_key = os.getenv("MISTRAL_API_KEY", "")
     if not api_key:
         raise ValueError("MISTRAL_API_KEY environment variable is not set")
-    client = Mistral(api_key=api_key)
-    print(f"Mistral client initialized with API key: {api_key[:5]}*****")
-    return client
+    return get_shared_mistral_client(api_key)
 
 # Utility functions
 def extract_figure_tag(markdown, image_id):
@@ -204,6 +204,21 @@ def save_html_output(html_content, output_path=os.path.join(OUTPUT_DIR, "gallery
     
     return output_path
 
+def gallery_source_path():
+    return os.path.join(OUTPUT_DIR, "gallery_source.json")
+
+def read_gallery_source():
+    """Canonical id of the document the current gallery was built from, if any"""
+    try:
+        with open(gallery_source_path(), "r", encoding="utf-8") as f:
+            return json.load(f).get("document_id")
+    except (OSError, ValueError):
+        return None
+
+def write_gallery_source(document_id):
+    with open(gallery_source_path(), "w", encoding="utf-8") as f:
+        json.dump({"document_id": document_id}, f)
+
 def clean_output_dir():
     """Clean the output directory to prepare for new processing"""
     try:
@@ -224,25 +239,20 @@ async def process_and_generate_gallery(document_url=None, file_path=None):
         
         client = get_mistral_client()
         
-        # Process document with OCR
+        # Process document with OCR (served from the shared OCR cache when possible)
         if document_url:
-            ocr_response = client.ocr.process(
-                model="mistral-ocr-latest",
-                document={
-                    "type": "document_url",
-                    "document_url": document_url
-                },
+            ocr_response = await ocr_document_async(
+                client,
+                document_url=document_url,
                 include_image_base64=True
             )
         elif file_path:
             with open(file_path, "rb") as f:
                 file_content = f.read()
-            ocr_response = client.ocr.process(
-                model="mistral-ocr-latest",
-                document={
-                    "type": "document_content",
-                    "document_content": base64.b64encode(file_content).decode()
-                },
+            ocr_response = await ocr_document_async(
+                client,
+                document_bytes=file_content,
+                file_name=os.path.basename(file_path),
                 include_image_base64=True
             )
         else:
@@ -256,6 +266,8 @@ async def process_and_generate_gallery(document_url=None, file_path=None):
         
         # Save HTML content
         gallery_path = save_html_output(html_content)
+        if document_url:
+            write_gallery_source(canonical_document_id(document_url))
         
         return {
             "data": data,
@@ -334,9 +346,10 @@ async def process_document_url(
                 content={"message": f"API configuration error: {str(e)}"}
             )
         
-        # Only process if there isn't already a gallery
+        # Only process if there isn't already a gallery for this paper (any URL spelling)
         data_path = os.path.join(OUTPUT_DIR, "images.json")
-        if os.path.exists(data_path):
+        document_id = canonical_document_id(str(request.document_url))
+        if os.path.exists(data_path) and read_gallery_source() == document_id:
             return {"message": "Gallery already exists. Access at /gallery"}
             
         # Add task to background
@@ -0,0 +1,184 @@
+from typing import Dict, List, Optional, Tuple
+
+from template_registry import TemplateIndex
+
+# PP_PLACEHOLDER type ids grouped by the content they can take
+TITLE_TYPES = {1, 3}       # TITLE, CENTER_TITLE
+SUBTITLE_TYPES = {4}       # SUBTITLE
+BODY_TYPES = {2, 7}        # BODY, OBJECT
+OBJECT_TYPES = {7}         # OBJECT (content) placeholders take either text or an image
+PICTURE_TYPES = {18}       # PICTURE
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+
+
+def layout_slots(layout: dict) -> Dict[str, List[str]]:
+    """
+    Placeholder keys (name_idx) of a layout grouped into title/subtitle/body/picture, in idx order.
+
+    "object" repeats the body placeholders that are OBJECT placeholders, which
+    can hold an image when the layout has no free picture placeholder.
+    """
+    slots = {"title": [], "subtitle": [], "body": [], "picture": [], "object": []}
+    for idx, placeholder in sorted(layout["placeholders"].items()):
+        key = f"{placeholder['name']}_{idx}"
+        type_id = placeholder.get("type_id")
+        if type_id in TITLE_TYPES:
+            slots["title"].append(key)
+        elif type_id in SUBTITLE_TYPES:
+            slots["subtitle"].append(key)
+        elif type_id in BODY_TYPES:
+            slots["body"].append(key)
+            if type_id in OBJECT_TYPES:
+                slots["object"].append(key)
+        elif type_id in PICTURE_TYPES:
+            slots["picture"].append(key)
+    return slots
+
+
+def slide_images(slide: dict) -> List[str]:
+    """Rendered formula and figure paths of a slide, formulas first"""
+    images = []
+    for item in slide.get("formula_images") or []:
+        path = item.get("formula") if isinstance(item, dict) else item
+        if isinstance(path, str) and path.lower().endswith(IMAGE_EXTENSIONS):
+            images.append(path)
+    for path in slide.get("picture") or []:
+        if isinstance(path, str) and path.lower().endswith(IMAGE_EXTENSIONS):
+            images.append(path)
+    return images
+
+
+def image_slots(slots: Dict[str, List[str]], images: int, bullets: int) -> List[str]:
+    """
+    Placeholders that receive a slide's images, in image order.
+
+    Picture placeholders are used first, then OBJECT placeholders from the
+    last one backwards, keeping the first body placeholder for the bullets.
+    """
+    keys = slots["picture"][:images]
+    reserved = slots["body"][:1] if bullets else []
+    spare = [key for key in reversed(slots.get("object", [])) if key not in reserved]
+    return keys + spare[:images - len(keys)]
+
+
+def score_layout(slots: Dict[str, List[str]], bullets: int, images: int, is_title_slide: bool) -> float:
+    """
+    How well a layout fits a slide's content; higher is better.
+
+    Content that would have nowhere to go costs the most, then empty
+    placeholders left on the slide, then small preferences (a subtitle frame
+    for the title slide, a single body for plain text slides).
+    """
+    score = 0.0
+    score += 3 if slots["title"] else -5
+
+    pictures = len(slots["picture"])
+    in_pictures = min(images, pictures)
+    in_objects = len(image_slots(slots, images, bullets)) - in_pictures
+    unplaced = images - in_pictures - in_objects
+    # A picture placeholder is the better home for an image than a content placeholder
+    score += 4 * in_pictures + 3 * in_objects - 6 * unplaced - 2 * (pictures - in_pictures)
+
+    bodies = len(slots["body"]) - in_objects
+    if bullets:
+        score += 3 if bodies else -6
+        score -= max(0, bodies - 1)
+    else:
+        score -= 2 * bodies
+
+    if is_title_slide:
+        score += 3 if slots["subtitle"] else 0
+        score -= 4 * pictures
+    else:
+        score -= len(slots["subtitle"])
+    return score
+
+
+def split_evenly(items: List[str], parts: int) -> List[List[str]]:
+    size, extra = divmod(len(items), parts)
+    chunks, start = [], 0
+    for part in range(parts):
+        end = start + size + (1 if part < extra else 0)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
+def fill_layout(slots: Dict[str, List[str]], slide: dict, images: List[str], is_title_slide: bool) -> Dict[str, object]:
+    """Placeholder key -> content for one slide on the chosen layout"""
+    placeholders = {}
+    title = slide.get("title") or ""
+    subtitle = slide.get("subtitle") or ""
+    bullets = [str(line) for line in slide.get("text") or [] if str(line).strip()]
+
+    # Content slides use their headline as the title, the title slide keeps both
+    if is_title_slide or not subtitle:
+        heading = title
+    else:
+        heading = subtitle
+    if slots["title"]:
+        placeholders[slots["title"][0]] = heading
+    if is_title_slide and subtitle:
+        if slots["subtitle"]:
+            placeholders[slots["subtitle"][0]] = subtitle
+        elif slots["body"]:
+            bullets = [subtitle] + bullets
+
+    image_keys = image_slots(slots, len(images), len(bullets))
+    bodies = [key for key in slots["body"] if key not in image_keys]
+    if bullets and bodies:
+        for key, chunk in zip(bodies, split_evenly(bullets, len(bodies))):
+            if chunk:
+                placeholders[key] = "\n".join(chunk)
+
+    for key, image in zip(image_keys, images):
+        placeholders[key] = image
+    return placeholders
+
+
+def plan_slide_layouts(slides_data: dict, template_index: TemplateIndex) -> Tuple[dict, List[int]]:
+    """
+    Choose a layout for every slide and map its content onto placeholder keys, without an LLM.
+
+    Layouts are scored from the placeholder types and counts in the template
+    index against each slide's title, bullets and images, so the result is
+    deterministic and only ever uses layouts and placeholders the template has.
+
+    Returns:
+    - The execution agent JSON structure, {"slides": [{"slide_name", "placeholders"}]}.
+    - Indexes of the slides whose images did not all fit on their best layout.
+    """
+    layouts = [(name, layout_slots(layout)) for name, layout in template_index.layouts.items()]
+    if not layouts:
+        raise ValueError(f"Template {template_index.path.name} has no layouts")
+
+    slides = []
+    incomplete = []
+    for slide_index, slide in enumerate(slides_data.get("content", [])):
+        is_title_slide = slide_index == 0
+        images = slide_images(slide)
+        bullets = len([line for line in slide.get("text") or [] if str(line).strip()])
+
+        # Ties go to the layout listed first in the template
+        best_name, best_slots = max(
+            layouts,
+            key=lambda item: score_layout(item[1], bullets, len(images), is_title_slide)
+        )
+        room = len(image_slots(best_slots, len(images), bullets))
+        if len(images) > room:
+            print(f"⚠️ Slide {slide_index + 1}: layout '{best_name}' has room for {room} of {len(images)} images")
+            incomplete.append(slide_index)
+        slides.append({
+            "slide_name": best_name,
+            "placeholders": fill_layout(best_slots, slide, images, is_title_slide)
+        })
+    return {"slides": slides}, incomplete
+
+
+def layout_summary(execution_json: dict) -> Optional[str]:
+    """Short 'layout x count' description of a mapping for logs"""
+    counts: Dict[str, int] = {}
+    for slide in execution_json.get("slides", []):
+        counts[slide["slide_name"]] = counts.get(slide["slide_name"], 0) + 1
+    return ", ".join(f"{name} x{count}" for name, count in counts.items()) or None
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import httpx
+from mistralai import Mistral
+
+from config import config
+
+# One client (and one pair of HTTP connection pools) per API key for the whole process
+_clients: Dict[str, Mistral] = {}
+_clients_lock = threading.Lock()
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+# Endpoints billed by tokens; other calls (files, OCR) only count as requests
+TOKEN_METERED_PATHS = ("/v1/chat/completions", "/v1/agents/completions")
+DOCUMENT_TOKEN_ESTIMATE = 8000
+DEFAULT_MAX_TOKENS_ESTIMATE = 1000
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_minute.
+
+    Callers reserve tokens up front and then sleep for however long the bucket
+    needs to pay the reservation back, so concurrent callers are spaced out
+    instead of all failing together. A rate of 0 disables the bucket.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = rate_per_minute
+        self.fill_rate = rate_per_minute / 60.0
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1) -> float:
+        """Take amount tokens and return the number of seconds to wait before using them"""
+        if self.capacity <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+            self.updated = now
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.fill_rate)
+
+
+class MistralRateLimiter:
+    """Requests/min and tokens/min budgets shared by every Mistral call in the process"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def reserve(self, request: httpx.Request) -> float:
+        wait = self.requests.reserve(1)
+        if request.url.path.endswith(TOKEN_METERED_PATHS):
+            wait = max(wait, self.tokens.reserve(estimate_tokens(request)))
+        return wait
+
+
+def estimate_tokens(request: httpx.Request) -> int:
+    """Rough token cost of a completion request: ~4 characters per token plus the completion budget"""
+    try:
+        body = json.loads(request.content or b"{}")
+    except (ValueError, httpx.RequestNotRead):
+        return DEFAULT_MAX_TOKENS_ESTIMATE
+    tokens = body.get("max_tokens") or DEFAULT_MAX_TOKENS_ESTIMATE
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += len(content) // 4
+        elif isinstance(content, list):
+            for chunk in content:
+                if chunk.get("type") == "document_url":
+                    tokens += DOCUMENT_TOKEN_ESTIMATE
+                else:
+                    tokens += len(str(chunk.get("text", ""))) // 4
+    return tokens
+
+
+rate_limiter = MistralRateLimiter(config.MISTRAL_REQUESTS_PER_MINUTE, config.MISTRAL_TOKENS_PER_MINUTE)
+
+
+def backoff_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """Retry-After when the server sends one, otherwise full-jitter exponential backoff"""
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), config.MISTRAL_BACKOFF_MAX)
+            except ValueError:
+                pass
+    return random.uniform(0, min(config.MISTRAL_BACKOFF_MAX, config.MISTRAL_BACKOFF_BASE * (2 ** attempt)))
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """httpx transport that applies the shared rate limits and retries 429/5xx responses with backoff"""
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            wait = rate_limiter.reserve(request)
+            if wait:
+                time.sleep(wait)
+            try:
+                response = self.transport.handle_request(request)
+            except RETRY_EXCEPTIONS as e:
+                if attempt >= config.MISTRAL_MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt)
+                print(f"⚠️ Mistral connection error ({e}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= config.MISTRAL_MAX_RETRIES:
+                    return response
+                delay = backoff_delay(attempt, response)
+                response.close()
+                print(f"⚠️ Mistral returned {response.status_code} for {request.url.path}, retry {attempt + 1} in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of RateLimitedTransport, waits with asyncio.sleep so the event loop stays free"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            wait = rate_limiter.reserve(request)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                response = await self.transport.handle_async_request(request)
+            except RETRY_EXCEPTIONS as e:
+                if attempt >= config.MISTRAL_MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt)
+                print(f"⚠️ Mistral connection error ({e}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= config.MISTRAL_MAX_RETRIES:
+                    return response
+                delay = backoff_delay(attempt, response)
+                await response.aclose()
+                print(f"⚠️ Mistral returned {response.status_code} for {request.url.path}, retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.MISTRAL_POOL_SIZE,
+        max_keepalive_connections=config.MISTRAL_POOL_SIZE,
+        keepalive_expiry=config.MISTRAL_KEEPALIVE_SECONDS
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(config.MISTRAL_TIMEOUT, connect=config.MISTRAL_CONNECT_TIMEOUT)
+
+
+def get_mistral_client(api_key: Optional[str] = None) -> Mistral:
+    """
+    Return the shared Mistral client for an API key (MISTRAL_API_KEY by default).
+
+    The client is built once per process on pooled keep-alive httpx clients, so
+    consecutive calls reuse open TLS connections instead of reconnecting. Pool
+    size and timeouts come from MISTRAL_POOL_SIZE, MISTRAL_KEEPALIVE_SECONDS,
+    MISTRAL_CONNECT_TIMEOUT and MISTRAL_TIMEOUT. Every request goes through the
+    process-wide rate limiter and is retried with backoff on 429 and 5xx.
+
+    Inside async handlers use the SDK's *_async methods on it (chat.complete_async,
+    chat.parse_async, agents.complete_async, ocr.process_async, files.upload_async),
+    so an LLM call does not block the event loop while it is in flight.
+    """
+    api_key = api_key or os.getenv("MISTRAL_API_KEY", "")
+    if not api_key:
+        raise ValueError("MISTRAL_API_KEY environment variable is required")
+    client = _clients.get(api_key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(api_key)
+            if client is None:
+                client = Mistral(
+                    api_key=api_key,
+                    client=httpx.Client(
+                        transport=RateLimitedTransport(httpx.HTTPTransport(limits=_pool_limits())),
+                        timeout=_timeout(),
+                        follow_redirects=True
+                    ),
+                    async_client=httpx.AsyncClient(
+                        transport=AsyncRateLimitedTransport(httpx.AsyncHTTPTransport(limits=_pool_limits())),
+                        timeout=_timeout(),
+                        follow_redirects=True
+                    ),
+                    timeout_ms=int(config.MISTRAL_TIMEOUT * 1000)
+                )
+                _clients[api_key] = client
+                print(f"🔌 Mistral client ready (pool size {config.MISTRAL_POOL_SIZE})")
+    return client
+
+
+async def close_mistral_clients():
+    """Close the pooled connections, e.g. from a FastAPI shutdown handler"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            client.sdk_configuration.client.close()
+            await client.sdk_configuration.async_client.aclose()
+        except Exception as e:
+            print(f"⚠️ Error closing Mistral client: {e}")
@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+from mistralai import Mistral
+from mistralai.models import OCRResponse
+
+from config import config
+from disk_cache import DiskLRUCache
+from single_flight import single_flight, flight_key
+from utils import canonical_document_id, canonical_document_url
+
+OCR_CACHE_DIR = Path(config.CACHE_DIR) / "ocr"
+DEFAULT_OCR_MODEL = "mistral-ocr-latest"
+
+# One JSON entry (response plus metadata) per document and OCR model
+ocr_cache = DiskLRUCache(
+    OCR_CACHE_DIR,
+    max_bytes=int(config.OCR_CACHE_MAX_MB * 1024 * 1024),
+    suffix=".json"
+)
+
+
+def url_cache_key(document_url: str, model: str = DEFAULT_OCR_MODEL) -> str:
+    """Cache key for a document fetched by URL, every spelling of an arXiv paper shares one key"""
+    return hashlib.sha256(f"url|{model}|{canonical_document_id(document_url)}".encode("utf-8")).hexdigest()
+
+
+def bytes_cache_key(content: bytes, model: str = DEFAULT_OCR_MODEL) -> str:
+    """Cache key for an uploaded document, based on the sha256 of its bytes"""
+    digest = hashlib.sha256(content).hexdigest()
+    return hashlib.sha256(f"sha256|{model}|{digest}".encode("utf-8")).hexdigest()
+
+
+def ocr_markdown(ocr_response) -> str:
+    """Join the markdown of every page, falling back to plain text blocks"""
+    contents = []
+    for page in getattr(ocr_response, "pages", []):
+        md = getattr(page, "markdown", None)
+        if md:
+            contents.append(md)
+        else:
+            for block in getattr(page, "blocks", []):
+                text = getattr(block, "text", None)
+                if text:
+                    contents.append(text)
+    return "\n\n".join(contents)
+
+
+def load_cached_ocr(key: str, include_image_base64: bool = False) -> Optional[OCRResponse]:
+    """
+    Return a cached OCR response, or None on a miss.
+
+    An entry saved without page images does not satisfy a request for images.
+    """
+    path = ocr_cache.get(key)
+    if path is None:
+        return None
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+        if include_image_base64 and not entry["meta"].get("include_image_base64"):
+            return None
+        return OCRResponse.model_validate(entry["response"])
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable OCR cache entry {key}: {e}")
+        return None
+
+
+def strip_image_payloads(data: dict) -> dict:
+    """Drop the base64 data of every extracted image, keeping ids and bounding boxes"""
+    for page in data.get("pages") or []:
+        for image in page.get("images") or []:
+            image["image_base64"] = None
+    return data
+
+
+def save_cached_ocr(key: str, ocr_response, source: str, model: str, include_image_base64: bool):
+    """Write an OCR response and its metadata to the cache as one JSON entry"""
+    try:
+        data = ocr_response.model_dump() if hasattr(ocr_response, "model_dump") else ocr_response
+        if not include_image_base64:
+            data = strip_image_payloads(data)
+        meta = {
+            "source": source,
+            "model": model,
+            "include_image_base64": include_image_base64,
+            "pages": len(data.get("pages") or []),
+            "created_at": time.time()
+        }
+        ocr_cache.put_bytes(key, json.dumps({"meta": meta, "response": data}).encode("utf-8"))
+    except Exception as e:
+        print(f"⚠️ Could not cache OCR result for {source}: {e}")
+
+
+def _cache_entry_for(document_url: Optional[str], document_bytes: Optional[bytes], model: str):
+    if document_bytes is not None:
+        return bytes_cache_key(document_bytes, model), f"sha256:{hashlib.sha256(document_bytes).hexdigest()}"
+    if document_url:
+        return url_cache_key(document_url, model), canonical_document_id(document_url)
+    raise ValueError("Either document_url or document_bytes must be provided")
+
+
+async def ocr_document_async(
+    client: Mistral,
+    document_url: Optional[str] = None,
+    document_bytes: Optional[bytes] = None,
+    file_name: str = "document.pdf",
+    model: str = DEFAULT_OCR_MODEL,
+    include_image_base64: bool = False
+) -> OCRResponse:
+    """
+    OCR a document through the shared cache.
+
+    Args:
+    - client: Mistral client used on a cache miss.
+    - document_url: URL of the document, its canonical id is the cache key.
+    - document_bytes: Raw PDF bytes, keyed by their sha256 and uploaded on a miss.
+    - file_name: File name used when uploading document_bytes.
+    - model: OCR model name, part of the cache key.
+    - include_image_base64: Whether page images are needed.
+
+    Cache file IO runs in a thread, and concurrent misses for the same document
+    share one upstream OCR call.
+
+    Returns:
+    - The OCR response, either from the cache or from Mistral.
+    """
+    key, source = _cache_entry_for(document_url, document_bytes, model)
+
+    cached = await asyncio.to_thread(load_cached_ocr, key, include_image_base64)
+    if cached is not None:
+        print(f"⚡ OCR cache hit for {source}")
+        return cached
+
+    return await single_flight.do(
+        flight_key("ocr", model, str(include_image_base64), key),
+        lambda: _ocr_document_miss(client, key, source, document_url, document_bytes, file_name, model, include_image_base64)
+    )
+
+
+async def _ocr_document_miss(client, key, source, document_url, document_bytes, file_name, model, include_image_base64):
+    # An earlier flight may have filled the cache between our lookup and this call
+    cached = await asyncio.to_thread(load_cached_ocr, key, include_image_base64)
+    if cached is not None:
+        return cached
+
+    start_time = time.time()
+    if document_bytes is not None:
+        uploaded = await client.files.upload_async(
+            file={"file_name": file_name, "content": document_bytes},
+            purpose="ocr"
+        )
+        document_url = (await client.files.get_signed_url_async(file_id=uploaded.id)).url
+    else:
+        document_url = canonical_document_url(document_url)
+
+    ocr_response = await client.ocr.process_async(
+        model=model,
+        document={"type": "document_url", "document_url": document_url},
+        include_image_base64=include_image_base64
+    )
+    print(f"📄 OCR for {source} completed in {time.time() - start_time:.2f}s")
+
+    await asyncio.to_thread(save_cached_ocr, key, ocr_response, source, model, include_image_base64)
+    return ocr_response
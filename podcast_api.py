@@ -1,10 +1,15 @@
 from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable, Union
 import json
 import os
-from melo.api import TTS
+import asyncio
+import time
+import uuid
+import threading
+import subprocess
+import numpy as np
 from pydub import AudioSegment
 import shutil
 from pathlib import Path
@@ -26,7 +31,8 @@ from config import (
     LENGTH_MODIFIERS
 )
 
-from mistralai import Mistral
+from mistral_client import get_mistral_client
+from tts_registry import get_tts_pool, shutdown_tts_pool, synthesize_segment, warm_up_tts_model, load_cached_segment, cache_segment
 
 # Get Mistral API key from .env file
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY", "")
@@ -50,11 +56,26 @@ class PodcastDialogue(BaseModel):
 class PodcastRequest(BaseModel):
     document_url: str
     prompt_modifiers: Optional[Dict[str, str]] = None
+    stream: bool = False
+    background: bool = False
 
 class PodcastResponse(BaseModel):
     podcast_url: str
     transcript_url: str
     dialogue: PodcastDialogue
+    streaming: bool = False
+
+class PodcastJobResponse(BaseModel):
+    job_id: str
+    status: str  # queued, generating_dialogue, synthesizing, encoding, completed or failed
+    total_segments: int = 0
+    completed_segments: int = 0
+    podcast_url: Optional[str] = None
+    transcript_url: Optional[str] = None
+    dialogue: Optional[PodcastDialogue] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
 
 # Initialize FastAPI
 app = FastAPI(title="Podcast Generator API", 
@@ -67,10 +88,286 @@ if not MISTRAL_API_KEY:
 else:
     print(f"Initializing Mistral client with API key: {MISTRAL_API_KEY[:5]}...")
     
-client = Mistral(api_key=MISTRAL_API_KEY) if MISTRAL_API_KEY else None
+client = get_mistral_client(MISTRAL_API_KEY) if MISTRAL_API_KEY else None
+
+@app.on_event("startup")
+async def preload_tts_model():
+    """Optionally load the TTS model before the first podcast request"""
+    if TTS_CONFIG["preload"]:
+        await asyncio.to_thread(warm_up_tts_model, TTS_CONFIG["language"], TTS_CONFIG["device"])
+
+@app.on_event("shutdown")
+async def stop_tts_pool():
+    """Stop the synthesis worker processes"""
+    shutdown_tts_pool()
+
+def iter_segments(segment_jobs: List[tuple]):
+    """
+    Synthesize (text, speaker) jobs and yield their (samples, sampling_rate) in dialogue order.
+
+    Lines already in the TTS segment cache are not synthesized again. With
+    TTS_CONFIG["workers"] > 1 the remaining lines are fanned out to a process pool
+    whose workers each hold a warm model, otherwise they run one by one in this
+    process. Either way a segment is yielded as soon as it and all earlier ones are ready.
+    """
+    language, device = TTS_CONFIG["language"], TTS_CONFIG["device"]
+    cached = [load_cached_segment(text, speaker, language) for text, speaker in segment_jobs]
+    misses = sum(1 for segment in cached if segment is None)
+    print(f"TTS cache: {len(segment_jobs) - misses} hits, {misses} lines to synthesize")
+    
+    workers = TTS_CONFIG["workers"]
+    futures = [None] * len(segment_jobs)
+    if workers > 1 and misses > 1:
+        print(f"Synthesizing {misses} segments with {workers} TTS workers")
+        pool = get_tts_pool(workers, language, device)
+        futures = [
+            pool.submit(synthesize_segment, text, speaker, language, device) if cached[i] is None else None
+            for i, (text, speaker) in enumerate(segment_jobs)
+        ]
+    
+    try:
+        for i, (text, speaker) in enumerate(segment_jobs):
+            if cached[i] is not None:
+                yield cached[i]
+                continue
+            try:
+                if futures[i] is not None:
+                    segment = futures[i].result()
+                else:
+                    print(f"Generating audio for segment {i+1}/{len(segment_jobs)} ({speaker})")
+                    segment = synthesize_segment(text, speaker, language, device)
+            except Exception as e:
+                print(f"Error processing segment {i}: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Error processing segment {i}: {str(e)}")
+            cache_segment(text, speaker, language, segment)
+            yield segment
+    finally:
+        # Drop queued lines nobody will consume (error or abandoned stream)
+        for future in futures:
+            if future is not None:
+                future.cancel()
 
-def generate_podcast(document_url: str, prompt_modifiers: Optional[Dict[str, str]] = None):
-    """Generate podcast from document URL"""
+def synthesize_segments(segment_jobs: List[tuple], progress: Optional[Callable[[int, int], None]] = None) -> List[tuple]:
+    """
+    Synthesize (text, speaker) jobs and return their (samples, sampling_rate) in dialogue order.
+
+    progress, if given, is called with (completed, total) after every segment.
+    """
+    start_time = time.time()
+    segments = []
+    for segment in iter_segments(segment_jobs):
+        segments.append(segment)
+        if progress:
+            progress(len(segments), len(segment_jobs))
+    print(f"Synthesized {len(segments)} segments in {time.time() - start_time:.2f}s")
+    return segments
+
+def assemble_pcm(segments: List[tuple], pause_ms: int = PAUSE_DURATION):
+    """
+    Join (samples, sampling_rate) segments into one 16-bit PCM buffer with a pause after each.
+
+    The output buffer is allocated once at its final size, instead of growing an
+    AudioSegment on every addition.
+    """
+    sampling_rate = segments[0][1]
+    pause_samples = int(sampling_rate * pause_ms / 1000)
+    total_samples = sum(len(samples) + pause_samples for samples, _ in segments)
+    
+    pcm = np.zeros(total_samples, dtype=np.int16)  # zeros double as the pauses
+    offset = 0
+    for samples, rate in segments:
+        if rate != sampling_rate:
+            raise ValueError(f"Segment sampling rate {rate} does not match {sampling_rate}")
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        pcm[offset:offset + len(samples)] = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+        offset += len(samples) + pause_samples
+    return pcm, sampling_rate
+
+def export_pcm(pcm, sampling_rate: int, output_path, format: str = "mp3"):
+    """Encode a mono 16-bit PCM buffer in a single ffmpeg pass (output_path may be a file object)"""
+    audio = AudioSegment(data=pcm.tobytes(), sample_width=2, frame_rate=sampling_rate, channels=1)
+    audio.export(output_path, format=format)
+    return output_path
+
+class Mp3StreamEncoder:
+    """
+    One ffmpeg process that turns PCM written over time into a single continuous MP3 stream.
+
+    Encoded bytes are handed to on_chunk from a reader thread as soon as ffmpeg
+    emits them, so the output is one MP3 stream with one set of encoder state
+    instead of a run of separately encoded files.
+    """
+
+    def __init__(self, sampling_rate: int, on_chunk: Callable[[bytes], None], chunk_size: int = 16 * 1024):
+        self.process = subprocess.Popen(
+            [
+                AudioSegment.converter, "-hide_banner", "-loglevel", "error",
+                "-f", "s16le", "-ar", str(sampling_rate), "-ac", "1", "-i", "pipe:0",
+                # The output is not seekable, so no Xing header that could never be filled in
+                "-f", "mp3", "-write_xing", "0", "-flush_packets", "1", "pipe:1"
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        self.reader = threading.Thread(target=self._read, args=(on_chunk, chunk_size), daemon=True)
+        self.reader.start()
+
+    def _read(self, on_chunk: Callable[[bytes], None], chunk_size: int):
+        while True:
+            chunk = self.process.stdout.read1(chunk_size)
+            if not chunk:
+                return
+            on_chunk(chunk)
+
+    def write(self, pcm):
+        self.process.stdin.write(pcm.tobytes())
+        self.process.stdin.flush()
+
+    def close(self):
+        """Flush the encoder and wait until every encoded byte has been delivered"""
+        self.process.stdin.close()
+        self.reader.join()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed: {self.process.stderr.read().decode(errors='replace').strip()}")
+
+    def abort(self):
+        self.process.kill()
+        self.process.wait()
+        self.reader.join()
+
+class PodcastStream:
+    """
+    MP3 chunks of a podcast that is still being synthesized.
+
+    Every dialogue line (plus its pause) is fed to one continuous encoder, so the
+    chunks in order are a single MP3 stream, and the same bytes are written to
+    the podcast file instead of encoding the audio a second time.
+    """
+
+    def __init__(self, stream_id: str):
+        self.stream_id = stream_id
+        self.filename = f"stream_{stream_id}.mp3"
+        self.transcript_path = f"podcast/transcript_{stream_id}.md"
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.error: Optional[str] = None
+        self.updated_at = time.time()
+
+    async def iter_chunks(self, poll_interval: float = 0.1):
+        """
+        Yield the MP3 chunks as they are encoded.
+
+        Raises once synthesis or encoding has failed, which aborts the response
+        instead of ending a truncated MP3 as if it were complete.
+        """
+        index = 0
+        while True:
+            if index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            elif self.error is not None:
+                raise RuntimeError(f"Podcast stream {self.stream_id} failed: {self.error}")
+            elif self.done:
+                return
+            else:
+                await asyncio.sleep(poll_interval)
+
+# Podcasts being streamed, keyed by file name (stream_{id}.mp3).
+# Failed streams stay for PODCAST_JOB_TTL seconds so /podcast/{filename} can report their error.
+PODCAST_STREAMS: Dict[str, PodcastStream] = {}
+
+def get_podcast_stream(filename: str) -> Optional[PodcastStream]:
+    """Return the in-progress or failed stream for a podcast file name, if any"""
+    stream = PODCAST_STREAMS.get(filename)
+    if stream is not None and stream.done and stream.error is None:
+        return None
+    return stream
+
+def podcast_stream_response(stream: PodcastStream) -> StreamingResponse:
+    """Chunked MP3 response for a stream, or the error of a stream that has already failed"""
+    if stream.error is not None:
+        raise HTTPException(status_code=500, detail=f"Podcast generation failed: {stream.error}")
+    return StreamingResponse(stream.iter_chunks(), media_type="audio/mpeg")
+
+def _run_podcast_stream(stream: PodcastStream, segment_jobs: List[tuple]):
+    output_path = Path("podcast") / stream.filename
+    partial_path = output_path.with_suffix(".part")
+    encoder = None
+    segment_count = 0
+    start_time = time.time()
+    try:
+        with open(partial_path, "wb") as output:
+            def on_chunk(chunk: bytes):
+                output.write(chunk)
+                stream.chunks.append(chunk)
+
+            try:
+                for samples, sampling_rate in iter_segments(segment_jobs):
+                    if encoder is None:
+                        encoder = Mp3StreamEncoder(sampling_rate, on_chunk)
+                    pcm, _ = assemble_pcm([(samples, sampling_rate)], PAUSE_DURATION)
+                    encoder.write(pcm)
+                    segment_count += 1
+                    if segment_count == 1:
+                        print(f"First podcast audio sent to the encoder after {time.time() - start_time:.2f}s")
+                if encoder is not None:
+                    encoder.close()
+            except BaseException:
+                if encoder is not None:
+                    encoder.abort()
+                raise
+        
+        # The streamed bytes are the finished file, so the same URL keeps working once streaming is over
+        if segment_count:
+            os.replace(partial_path, output_path)
+        print(f"Podcast stream {stream.stream_id} completed in {time.time() - start_time:.2f}s")
+    except Exception as e:
+        print(f"Error in podcast stream {stream.stream_id}: {str(e)}")
+        stream.error = str(e)
+        # Only the error is kept around, readers that are mid-stream stop at it
+        stream.chunks = []
+    finally:
+        partial_path.unlink(missing_ok=True)
+        stream.updated_at = time.time()
+        stream.done = True
+        if stream.error is None:
+            PODCAST_STREAMS.pop(stream.filename, None)
+
+def start_podcast_stream(document_url: str, prompt_modifiers: Optional[Dict[str, str]] = None):
+    """
+    Generate the dialogue, then synthesize it in a background thread while the audio is streamed.
+
+    Returns as soon as the dialogue is known; podcast_url points at a file that is
+    streamed chunk by chunk from /podcast/{filename} until synthesis has finished.
+    """
+    dialogue_json = generate_dialogue(document_url, prompt_modifiers)
+    segment_jobs, transcript = build_segment_jobs(dialogue_json)
+    
+    cutoff = time.time() - PODCAST_JOB_TTL
+    for filename, old_stream in list(PODCAST_STREAMS.items()):
+        if old_stream.done and old_stream.updated_at < cutoff:
+            PODCAST_STREAMS.pop(filename, None)
+    
+    # Per-stream files, so concurrent streams never overwrite each other's transcript
+    stream = PodcastStream(uuid.uuid4().hex)
+    print(f"Saving transcript to {stream.transcript_path}")
+    with open(stream.transcript_path, "w") as f:
+        f.write(transcript)
+    
+    PODCAST_STREAMS[stream.filename] = stream
+    threading.Thread(target=_run_podcast_stream, args=(stream, segment_jobs), daemon=True).start()
+    print(f"Streaming podcast as podcast/{stream.filename}")
+    
+    return {
+        "podcast_url": f"podcast/{stream.filename}",
+        "transcript_url": stream.transcript_path,
+        "dialogue": dialogue_json,
+        "streaming": True
+    }
+
+def generate_dialogue(document_url: str, prompt_modifiers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Ask Mistral for the podcast dialogue of a document"""
     
     # Check if Mistral client is initialized
     if not client:
@@ -149,9 +446,8 @@ def generate_podcast(document_url: str, prompt_modifiers: Optional[Dict[str, str
         with open(PATHS["podcast_data"], 'w') as file:
             json.dump(dialogue_text, file, indent=2)
         
-        # Load dialogue from file (sometimes needed to handle JSON string within JSON)
-        with open(PATHS["podcast_data"], "r") as file:
-            dialogue_json = json.load(file)
+        # Parse from memory rather than re-reading the shared file, which a concurrent job may overwrite
+        dialogue_json = dialogue_text
         
         # Handle nested JSON if needed
         if isinstance(dialogue_json, str):
@@ -164,107 +460,182 @@ def generate_podcast(document_url: str, prompt_modifiers: Optional[Dict[str, str
         print(f"Error in Mistral API call: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error in Mistral API call: {str(e)}")
 
-    # Create audio segments and transcript
-    audio_segments = []
+    return dialogue_json
+
+def build_segment_jobs(dialogue_json: Dict[str, Any]):
+    """Turn the dialogue into (text, speaker) synthesis jobs plus the markdown transcript"""
     transcript = ""
+    dialogue_lines = dialogue_json.get("dialogue", [])
 
-    # Create TTS model once to avoid reloading
-    print(f"Initializing TTS model with language={TTS_CONFIG['language']}, device={TTS_CONFIG['device']}")
-    model = TTS(language=TTS_CONFIG["language"], device=TTS_CONFIG["device"])
-    
-    # Get available speaker IDs from the model
-    available_speakers = model.hps.data.spk2id
-    print(f"Available speaker IDs: {available_speakers}")
-    
-    for i, line in enumerate(dialogue_json.get("dialogue", [])):
+    # Resolve every line to a text/speaker pair first, so segments can be synthesized in any order
+    segment_jobs = []
+    for line in dialogue_lines:
         speaker = line.get("speaker", "Unknown")
         text = line.get("text", "")
         
-        print(f"Processing dialogue item {i+1}/{len(dialogue_json.get('dialogue', []))}: {speaker[:10]}...")
-        
         # Add to transcript
         if speaker == "Jane":
             transcript += f"**Host**: {text}\n\n"
+            speaker_key = TTS_CONFIG["host_speaker_id"]
         else:
             transcript += f"**{dialogue_json.get('name_of_guest', 'Guest')}**: {text}\n\n"
+            speaker_key = TTS_CONFIG["guest_speaker_id"]
+        
+        segment_jobs.append((text, speaker_key))
 
-        # Set speaker ID from config
-        try:
-            if speaker == "Jane":
-                speaker_id = model.hps.data.spk2id[TTS_CONFIG["host_speaker_id"]]
-                print(f"Using host speaker ID: {TTS_CONFIG['host_speaker_id']} -> {speaker_id}")
-            else:
-                speaker_id = model.hps.data.spk2id[TTS_CONFIG["guest_speaker_id"]]
-                print(f"Using guest speaker ID: {TTS_CONFIG['guest_speaker_id']} -> {speaker_id}")
-
-            # Generate speech segment
-            temp_file = PATHS["temp_segment_format"].format(i)
-            print(f"Generating audio for segment {i+1} to {temp_file}")
-            model.tts_to_file(
-                text=text,
-                speaker_id=speaker_id,
-                output_path=temp_file,
-                sdp_ratio=TTS_CONFIG["sdp_ratio"],
-                noise_scale=TTS_CONFIG["noise_scale"],
-                noise_scale_w=TTS_CONFIG["noise_scale_w"],
-                speed=TTS_CONFIG["speed"]
-            )
-            
-            # Combine audio files
-            print(f"Loading audio segment from {temp_file}")
-            segment = AudioSegment.from_file(temp_file)
-            audio_segments.append(segment)
-            
-            # Add pause between segments
-            print(f"Adding {PAUSE_DURATION}ms pause")
-            pause = AudioSegment.silent(duration=PAUSE_DURATION)
-            audio_segments.append(pause)
-        except Exception as e:
-            print(f"Error processing segment {i}: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Error processing segment {i}: {str(e)}")
+    return segment_jobs, transcript
+
+def generate_podcast(
+    document_url: str,
+    prompt_modifiers: Optional[Dict[str, str]] = None,
+    podcast_output: str = PATHS["podcast_output"],
+    transcript_output: str = PATHS["transcript_output"],
+    job: Optional["PodcastJob"] = None
+):
+    """Generate podcast from document URL, reporting progress to job if given"""
+    if job:
+        job.update(status="generating_dialogue")
+    dialogue_json = generate_dialogue(document_url, prompt_modifiers)
+    segment_jobs, transcript = build_segment_jobs(dialogue_json)
+
+    if job:
+        job.update(status="synthesizing", total_segments=len(segment_jobs))
+    segments = synthesize_segments(
+        segment_jobs,
+        progress=(lambda done, total: job.update(completed_segments=done)) if job else None
+    )
 
     # Combine and save audio segments
-    if audio_segments:
-        print(f"Combining {len(audio_segments)} audio segments")
-        combined_audio = sum(audio_segments)
+    if segments:
+        print(f"Combining {len(segments)} audio segments")
+        if job:
+            job.update(status="encoding")
+        pcm, sampling_rate = assemble_pcm(segments, PAUSE_DURATION)
         
-        print(f"Exporting podcast to {PATHS['podcast_output']}")
-        combined_audio.export(PATHS["podcast_output"], format="mp3")
+        print(f"Exporting podcast to {podcast_output}")
+        export_pcm(pcm, sampling_rate, podcast_output, format="mp3")
         
         # Save transcript
-        print(f"Saving transcript to {PATHS['transcript_output']}")
-        with open(PATHS["transcript_output"], "w") as f:
+        print(f"Saving transcript to {transcript_output}")
+        with open(transcript_output, "w") as f:
             f.write(transcript)
     else:
         print("No audio segments generated")
     
     print("Podcast generation completed successfully")
     return {
-        "podcast_url": PATHS["podcast_output"],
-        "transcript_url": PATHS["transcript_output"],
+        "podcast_url": podcast_output,
+        "transcript_url": transcript_output,
         "dialogue": dialogue_json
     }
 
-@app.post("/generate-podcast/", response_model=PodcastResponse)
+class PodcastJob:
+    """Status of a podcast generated in the background, polled through /podcast-jobs/{job_id}"""
+
+    def __init__(self, document_url: str, prompt_modifiers: Optional[Dict[str, str]] = None):
+        self.job_id = uuid.uuid4().hex
+        self.document_url = document_url
+        self.prompt_modifiers = prompt_modifiers
+        self.status = "queued"
+        self.total_segments = 0
+        self.completed_segments = 0
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    def update(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.updated_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total_segments": self.total_segments,
+            "completed_segments": self.completed_segments,
+            "podcast_url": self.result["podcast_url"] if self.result else None,
+            "transcript_url": self.result["transcript_url"] if self.result else None,
+            "dialogue": self.result["dialogue"] if self.result else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+# Background podcast jobs by id, finished jobs are dropped after PODCAST_JOB_TTL seconds
+PODCAST_JOBS: Dict[str, PodcastJob] = {}
+PODCAST_JOB_TTL = 24 * 3600
+
+def _run_podcast_job(job: PodcastJob):
+    try:
+        # Per-job files, so concurrent jobs never overwrite each other's audio
+        job.result = generate_podcast(
+            job.document_url,
+            job.prompt_modifiers,
+            podcast_output=f"podcast/podcast_{job.job_id}.mp3",
+            transcript_output=f"podcast/transcript_{job.job_id}.md",
+            job=job
+        )
+        job.update(status="completed")
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        print(f"Error in podcast job {job.job_id}: {detail}")
+        job.update(status="failed", error=detail)
+
+def start_podcast_job(document_url: str, prompt_modifiers: Optional[Dict[str, str]] = None) -> PodcastJob:
+    """Queue a podcast generation on a background thread and return its job right away"""
+    cutoff = time.time() - PODCAST_JOB_TTL
+    for job_id, old_job in list(PODCAST_JOBS.items()):
+        if old_job.status in ("completed", "failed") and old_job.updated_at < cutoff:
+            PODCAST_JOBS.pop(job_id, None)
+    
+    job = PodcastJob(document_url, prompt_modifiers)
+    PODCAST_JOBS[job.job_id] = job
+    threading.Thread(target=_run_podcast_job, args=(job,), daemon=True).start()
+    print(f"Started podcast job {job.job_id}")
+    return job
+
+def get_podcast_job(job_id: str) -> Optional[PodcastJob]:
+    return PODCAST_JOBS.get(job_id)
+
+@app.post("/generate-podcast/", response_model=Union[PodcastResponse, PodcastJobResponse])
 async def create_podcast(background_tasks: BackgroundTasks, request: PodcastRequest):
     """
     Generate a podcast from a document URL.
     
     - **document_url**: URL to the document (e.g., PDF, web page)
     - **prompt_modifiers**: Optional modifiers for the system prompt
+    - **stream**: Return once the dialogue is ready and stream the audio while it is synthesized
+    - **background**: Return a job right away, poll /podcast-jobs/{job_id} for progress
     """
     try:
         print(f"Received podcast generation request for URL: {request.document_url}")
-        # Run podcast generation
-        result = generate_podcast(request.document_url, request.prompt_modifiers)
+        # Run podcast generation off the event loop
+        if request.background:
+            return start_podcast_job(request.document_url, request.prompt_modifiers).to_dict()
+        if request.stream:
+            return await asyncio.to_thread(start_podcast_stream, request.document_url, request.prompt_modifiers)
+        result = await asyncio.to_thread(generate_podcast, request.document_url, request.prompt_modifiers)
         return result
     except Exception as e:
         print(f"Error generating podcast: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate podcast: {str(e)}")
 
+@app.get("/podcast-jobs/{job_id}", response_model=PodcastJobResponse)
+async def get_podcast_job_status(job_id: str):
+    """Get the status, progress and, once completed, the result of a background podcast job"""
+    job = get_podcast_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Podcast job not found")
+    return job.to_dict()
+
 @app.get("/podcast/{filename}")
 async def get_podcast(filename: str):
-    """Get podcast file"""
+    """Get podcast file, streaming it while it is still being synthesized"""
+    stream = get_podcast_stream(filename)
+    if stream is not None:
+        return podcast_stream_response(stream)
     file_path = f"podcast/{filename}"
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Podcast not found")
@@ -71,6 +71,43 @@ const GeneratingPage = () => {
     }
   };
 
+  // Server-sent events call: onEvent gets (event, data) for every event until the stream ends
+  const streamAPI = async (endpoint, formData, errorMessage, onEvent) => {
+    const response = await fetch(`http://localhost:8000/${endpoint}`, {
+      method: 'POST',
+      body: formData
+    });
+    if (!response.ok) {
+      const data = await response.json().catch(() => ({}));
+      throw new Error(`${errorMessage}: ${data.detail || response.statusText}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let lastData = null;
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+      for (const raw of events) {
+        const eventLine = raw.split('\n').find(line => line.startsWith('event: '));
+        const dataLine = raw.split('\n').find(line => line.startsWith('data: '));
+        if (!eventLine || !dataLine) continue;
+        const event = eventLine.slice(7);
+        const data = JSON.parse(dataLine.slice(6));
+        if (event === 'error') {
+          throw new Error(`${errorMessage}: ${data.detail}`);
+        }
+        onEvent(event, data);
+        lastData = data;
+      }
+    }
+    return lastData;
+  };
+
   // Process gallery in parallel
   const processGallery = async (documentUrl) => {
     try {
@@ -152,25 +189,32 @@ const GeneratingPage = () => {
       const safeTemplateName = templateName;
       console.log('🔍 Using template:', safeTemplateName);
 
-      // 1. First analyze the document to generate prerequisites
+      // 1. Every later step runs inside the job workspace created by the analysis.
+      // The upload step already analyzed the document, so its job is reused.
       setStatus('Analyzing prerequisites...');
       setProgress(10);
-      const prereqFormData = new FormData();
-      prereqFormData.append("url", documentUrl);
-      prereqFormData.append("student_level", location.state.studentLevel);
-      await callAPI('analyze/url', prereqFormData, 'Prerequisites analysis failed');
+      let jobId = location.state.jobId;
+      if (!jobId) {
+        const prereqFormData = new FormData();
+        prereqFormData.append("url", documentUrl);
+        prereqFormData.append("student_level", location.state.studentLevel);
+        const analysisResult = await callAPI('analyze/url', prereqFormData, 'Prerequisites analysis failed');
+        jobId = analysisResult.job_id;
+      }
+      console.log('🔍 Job ID:', jobId);
       
       // 2. Extract template layout (standard timeout)
       setStatus('Processing template...');
       setProgress(20);
       const templateFormData = new FormData();
       templateFormData.append("template_name", safeTemplateName);
+      templateFormData.append("job_id", jobId);
       await callAPI('extract-template-layout', templateFormData, 'Template layout extraction failed');
       
       // 3. Convert placeholders (standard timeout)
       setProgress(30);
       const placeholdersFormData = new FormData();
-      placeholdersFormData.append("layout_extracted_path", "data/metadata/layout_details.json");
+      placeholdersFormData.append("job_id", jobId);
       await callAPI('convert-placeholders', placeholdersFormData, 'Placeholder conversion failed');
       
       // 4. OCR on URL for figures (standard timeout)
@@ -183,7 +227,7 @@ const GeneratingPage = () => {
       
       // 5. Save figures from OCR (standard timeout)
       setProgress(50);
-      const figuresResult = await callAPI('save-figures', ocrResult.ocr_response, 'Figure saving failed');
+      const figuresResult = await callAPI(`save-figures?job_id=${jobId}`, ocrResult.ocr_response, 'Figure saving failed');
       
       // 6. Generate slide data (EXTENDED 10-min timeout)
       setStatus('Creating slide content...');
@@ -192,6 +236,7 @@ const GeneratingPage = () => {
       slideFormData.append("student_level", studentLevelText);
       slideFormData.append("document_url", documentUrl);
       slideFormData.append("num_slides", numSlides);
+      slideFormData.append("job_id", jobId);
       
       // Add selected topics if available
       if (location.state.selectedPrerequisites) {
@@ -216,23 +261,33 @@ const GeneratingPage = () => {
         console.log('No selectedPrerequisites found in location.state');
       }
       
-      await callAPI('slide-data-gen', slideFormData, 'Slide data generation failed', true);
+      // Streamed so progress shows each slide as soon as it is written
+      await streamAPI('slide-data-gen/stream', slideFormData, 'Slide data generation failed', (event, data) => {
+        if (event === 'slide') {
+          console.log(`🧩 Slide ${data.index + 1} ready:`, data.slide.title);
+          setStatus(`Creating slide content... ${data.index + 1}/${numSlides} slides ready`);
+          setProgress(60 + Math.min(9, Math.floor(((data.index + 1) / numSlides) * 10)));
+        }
+      });
       
       // 7. Process slides data (standard timeout)
       setStatus('Processing slides...');
       setProgress(70);
-      await callAPI('process-slides-data', new FormData(), 'Slide processing failed');
+      const jobFormData = new FormData();
+      jobFormData.append("job_id", jobId);
+      await callAPI('process-slides-data', jobFormData, 'Slide processing failed');
 
       // 8. Enhance slides data (standard timeout)
       setStatus('Enhancing slides...');
       setProgress(80);
-      await callAPI('enhace-slides-agent', new FormData(), 'Slide enhancement failed');
+      await callAPI('enhace-slides-agent', jobFormData, 'Slide enhancement failed');
       
       // 8. Execute agent parsing (EXTENDED 10-min timeout)
       setStatus('Designing your presentation...');
       setProgress(90);
       const agentFormData = new FormData();
       agentFormData.append("template_name", safeTemplateName);
+      agentFormData.append("job_id", jobId);
       console.log('🔍 Execution agent using template:', safeTemplateName);
       
       try {
@@ -255,7 +310,7 @@ const GeneratingPage = () => {
       pptFormData.append("template_name", safeTemplateName);
       pptFormData.append("execution_json_filename", "execution_agent.json");
       pptFormData.append("output_ppt_filename", "generated_presentation.pptx");
-      pptFormData.append("processed_layout_filename", "processed_layout.json");
+      pptFormData.append("job_id", jobId);
       console.log('🔍 Generating presentation with template:', safeTemplateName);
       
       await callAPI(
@@ -272,6 +327,7 @@ const GeneratingPage = () => {
       navigate('/success', { 
         state: { 
           fileName: 'generated_presentation.pptx',
+          jobId: jobId,
           galleryEnabled: location.state.settings.generate_gallery,
           paperUrl: paperUrl,
           galleryLoaded: galleryLoaded,
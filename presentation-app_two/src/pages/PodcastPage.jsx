@@ -55,8 +55,10 @@ const PodcastPage = () => {
       console.log('Using document URL:', documentUrl);
 
       // Create request payload using the new format
+      // Stream the audio so playback can start while later lines are still being synthesized
       const payload = {
         document_url: documentUrl,
+        stream: true,
         prompt_modifiers: {
           tone: tone.toLowerCase(),
           length: length,
@@ -177,8 +177,9 @@ const SuccessPage = () => {
   const [errorMsg, setErrorMsg] = useState('');
   const [downloadCompleted, setDownloadCompleted] = useState(false);
   
-  const { fileName, galleryEnabled, paperUrl, ocrProcessed } = location.state || { 
+  const { fileName, jobId, galleryEnabled, paperUrl, ocrProcessed } = location.state || { 
     fileName: 'generated_presentation.pptx',
+    jobId: null,
     galleryEnabled: false,
     paperUrl: null,
     ocrProcessed: false
@@ -188,7 +189,9 @@ const SuccessPage = () => {
   const cleanupData = async () => {
     try {
       console.log("Cleaning up figures and formulas data...");
-      await axios.post('http://localhost:8000/cleanup-data');
+      const formData = new FormData();
+      if (jobId) formData.append("job_id", jobId);
+      await axios.post('http://localhost:8000/cleanup-data', formData);
       console.log("Cleanup completed successfully");
     } catch (error) {
       console.error("Error cleaning up data:", error);
@@ -196,7 +199,8 @@ const SuccessPage = () => {
   };
   
   const handleDownload = () => {
-    window.location.href = `http://localhost:8000/download-presentation?filename=${fileName}`;
+    const jobQuery = jobId ? `&job_id=${jobId}` : '';
+    window.location.href = `http://localhost:8000/download-presentation?filename=${fileName}${jobQuery}`;
     
     // Mark as downloaded and clean up after a small delay to ensure download started
     if (!downloadCompleted) {
@@ -3,9 +3,6 @@ import { useNavigate } from 'react-router-dom';
 import { useDropzone } from 'react-dropzone';
 import axios from 'axios';
 
-// Cache for URL analysis results
-const analysisCache = {};
-
 const UploadPage = () => {
   const [arxivUrl, setArxivUrl] = useState('');
   const [pdfFile, setPdfFile] = useState(null);
@@ -75,23 +72,8 @@ const UploadPage = () => {
           throw new Error('Invalid arXiv URL format');
         }
 
-        // Check if we have cached results for this URL
-        if (analysisCache[arxivUrl]) {
-          console.log('Using cached analysis for URL:', arxivUrl);
-          addToRecentUrls(arxivUrl);
-          
-          navigate('/select', { 
-            state: { 
-              sourceType: 'url',
-              sourceIdentifier: arxivUrl,
-              paperUrl: arxivUrl,
-              prerequisites: analysisCache[arxivUrl]
-            } 
-          });
-          return;
-        }
-
-        // Create form data for URL analysis
+        // Always analyze, even for a URL seen before: the server caches the analysis,
+        // and every call returns a fresh job, while an earlier job may have been cleaned up.
         const formData = new FormData();
         formData.append('url', arxivUrl);
         formData.append('student_level', '2'); // Default to masters student
@@ -103,8 +85,6 @@ const UploadPage = () => {
           throw new Error('Failed to analyze paper. Please try again.');
         }
 
-        // Cache the analysis results
-        analysisCache[arxivUrl] = response.data.prerequisites;
         addToRecentUrls(arxivUrl);
         
         // Navigate with the prerequisite data and source info
@@ -113,7 +93,8 @@ const UploadPage = () => {
             sourceType: 'url',
             sourceIdentifier: arxivUrl,
             paperUrl: arxivUrl,
-            prerequisites: response.data.prerequisites
+            prerequisites: response.data.prerequisites,
+            jobId: response.data.job_id
           } 
         });
       }
@@ -133,7 +114,8 @@ const UploadPage = () => {
             sourceType: 'pdf',
             sourceIdentifier: 'uploaded-pdf',
             paperUrl: "uploaded-pdf",
-            prerequisites: response.data.prerequisites
+            prerequisites: response.data.prerequisites,
+            jobId: response.data.job_id
           } 
         });
       }
@@ -0,0 +1,45 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+
+def flight_key(operation: str, model: str = "", prompt: str = "", document: str = "") -> str:
+    """Key for an upstream call: identical (operation, model, prompt, document) share one flight"""
+    payload = json.dumps([operation, model, prompt, document])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesce identical in-flight coroutine calls.
+
+    The first caller for a key starts the work as a task; callers arriving while
+    it runs await the same task instead of repeating the upstream call. The task
+    is shielded, so one caller disconnecting does not cancel it for the others.
+    Results are not kept once the call completes, caching is left to the callers.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._land(key, done))
+        else:
+            print(f"🔗 Joining in-flight call {key[:12]}")
+        return await asyncio.shield(task)
+
+    def _land(self, key: str, task: asyncio.Task):
+        # Retrieve the exception here, every waiter may have been cancelled and never see it
+        if not task.cancelled() and task.exception() is not None:
+            print(f"⚠️ In-flight call {key[:12]} failed: {task.exception()}")
+        if self._tasks.get(key) is task:
+            self._tasks.pop(key)
+
+
+# Shared by every module in the process
+single_flight = SingleFlight()
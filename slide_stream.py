@@ -0,0 +1,60 @@
+import json
+from typing import List
+
+
+class SlideStreamParser:
+    """
+    Incrementally pull finished slides out of a streamed deck JSON.
+
+    The LLM answers with {"content": [{slide}, {slide}, ...]}. Chunks are fed
+    as they arrive and every slide object is returned as soon as its closing
+    brace is seen, without waiting for the rest of the deck. Brackets inside
+    JSON strings (LaTeX formulas are full of them) are ignored.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.stack = []
+        self.in_string = False
+        self.escaped = False
+        self.slide_start = None
+        self.slides_emitted = 0
+
+    def feed(self, chunk: str) -> List[dict]:
+        """Add a chunk of the response and return the slides it completed"""
+        slides = []
+        offset = len(self.text)
+        self.text += chunk
+
+        for i, char in enumerate(chunk, start=offset):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+
+            if char == '"':
+                self.in_string = True
+            elif char in "{[":
+                # A slide is an object directly inside the array of the root object
+                if char == "{" and self.stack == ["{", "["]:
+                    self.slide_start = i
+                self.stack.append(char)
+            elif char in "}]":
+                if self.stack:
+                    self.stack.pop()
+                if char == "}" and self.stack == ["{", "["] and self.slide_start is not None:
+                    try:
+                        slides.append(json.loads(self.text[self.slide_start:i + 1]))
+                        self.slides_emitted += 1
+                    except json.JSONDecodeError as e:
+                        print(f"⚠️ Skipping unparsable streamed slide: {e}")
+                    self.slide_start = None
+        return slides
+
+    def result(self) -> dict:
+        """Parse the complete response once the stream has ended"""
+        return json.loads(self.text)
@@ -0,0 +1,155 @@
+import copy
+import hashlib
+import io
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pptx import Presentation
+
+from config import config
+
+
+class TemplateIndex:
+    """
+    Parsed layouts and placeholders of one .pptx template.
+
+    layouts maps a layout name to its position in the slide master and its
+    placeholders by idx (name, type and geometry in EMU), so filling a slide
+    never needs to walk the master or the shapes of a layout again.
+    """
+
+    def __init__(self, path: Path, digest: str, layouts: Dict[str, dict], layout_details: List[dict], sample_slides: int):
+        self.path = path
+        self.digest = digest
+        self.layouts = layouts
+        self.layout_details = layout_details
+        self.sample_slides = sample_slides
+
+    @property
+    def layout_names(self) -> List[str]:
+        return [layout["name"] for layout in self.layout_details]
+
+    def layout_position(self, layout_name: str) -> Optional[int]:
+        layout = self.layouts.get(layout_name)
+        return layout["position"] if layout else None
+
+    def placeholder(self, layout_name: str, idx: int) -> Optional[dict]:
+        layout = self.layouts.get(layout_name)
+        return layout["placeholders"].get(idx) if layout else None
+
+
+# Indexes and stripped packages keyed by template content hash
+_indexes: Dict[str, TemplateIndex] = {}
+_stripped_templates: Dict[str, bytes] = {}
+# (path, mtime, size) -> content hash, so unchanged files are not re-hashed on every request
+_digests: Dict[Tuple[str, int, int], str] = {}
+_lock = threading.Lock()
+
+
+def template_digest(template_path: Path) -> str:
+    """sha256 of a template file, memoized on its path, mtime and size"""
+    stat = os.stat(template_path)
+    key = (str(template_path), stat.st_mtime_ns, stat.st_size)
+    digest = _digests.get(key)
+    if digest is None:
+        digest = hashlib.sha256(Path(template_path).read_bytes()).hexdigest()
+        with _lock:
+            # Older versions of the same file are never looked up again
+            for old_key in [k for k in _digests if k[0] == key[0]]:
+                del _digests[old_key]
+            _digests[key] = digest
+    return digest
+
+
+def _build_index(template_path: Path, digest: str) -> TemplateIndex:
+    prs = Presentation(template_path)
+    layouts = {}
+    layout_details = []
+    for position, layout in enumerate(prs.slide_master.slide_layouts):
+        placeholders = {}
+        layout_info = {"name": layout.name, "placeholders": []}
+        for placeholder in layout.placeholders:
+            idx = placeholder.placeholder_format.idx
+            placeholders[idx] = {
+                "name": placeholder.name,
+                "type": str(placeholder.placeholder_format.type),
+                "type_id": int(placeholder.placeholder_format.type),
+                "left": placeholder.left,
+                "top": placeholder.top,
+                "width": placeholder.width,
+                "height": placeholder.height
+            }
+            layout_info["placeholders"].append({
+                "name": placeholder.name,
+                "type": str(placeholder.placeholder_format.type),
+                "index": idx
+            })
+        # First layout wins on duplicate names, as the old linear scan did
+        layouts.setdefault(layout.name, {"position": position, "placeholders": placeholders})
+        layout_details.append(layout_info)
+    return TemplateIndex(Path(template_path), digest, layouts, layout_details, len(prs.slides))
+
+
+def get_template_index(template_path: Path) -> TemplateIndex:
+    """Return the index of a template, parsing the file only the first time its content is seen"""
+    digest = template_digest(template_path)
+    index = _indexes.get(digest)
+    if index is None:
+        start_time = time.time()
+        index = _build_index(template_path, digest)
+        with _lock:
+            _indexes[digest] = index
+        print(f"📑 Indexed template {Path(template_path).name} ({len(index.layouts)} layouts) in {time.time() - start_time:.2f}s")
+    return index
+
+
+def get_layout_details(template_path: Path) -> List[dict]:
+    """Layouts and placeholders in the layout_details.json format, safe for callers to modify"""
+    return copy.deepcopy(get_template_index(template_path).layout_details)
+
+
+def remove_all_slides(prs: Presentation):
+    """Drop every slide of a presentation, keeping its masters and layouts"""
+    sld_id_lst = prs.slides._sldIdLst
+    for sld_id in list(sld_id_lst):
+        prs.part.drop_rel(sld_id.rId)
+        sld_id_lst.remove(sld_id)
+
+
+def load_stripped_template(template_path: Path) -> Presentation:
+    """
+    Open a template with its sample slides already removed.
+
+    The stripped package is built once per template content and kept in
+    memory, so every deck starts from it instead of adding slides behind the
+    samples and deleting them in a second save/load cycle.
+    """
+    digest = template_digest(template_path)
+    blob = _stripped_templates.get(digest)
+    if blob is None:
+        prs = Presentation(template_path)
+        sample_slides = len(prs.slides)
+        remove_all_slides(prs)
+        buffer = io.BytesIO()
+        prs.save(buffer)
+        blob = buffer.getvalue()
+        with _lock:
+            _stripped_templates[digest] = blob
+        print(f"🧹 Stripped {sample_slides} sample slides from {Path(template_path).name}")
+    return Presentation(io.BytesIO(blob))
+
+
+def index_templates(directory: Path = config.PRESENTATION_TEMPLATE_DIR) -> int:
+    """Index and strip every template in the upload folder, e.g. at startup"""
+    count = 0
+    for template_path in sorted(Path(directory).glob("*.pptx")):
+        try:
+            get_template_index(template_path)
+            load_stripped_template(template_path)
+            count += 1
+        except Exception as e:
+            print(f"⚠️ Could not index template {template_path.name}: {e}")
+    return count
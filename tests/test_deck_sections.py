@@ -0,0 +1,85 @@
+from dataclasses import dataclass
+
+from deck_sections import FIXED_SLIDES, SectionMerger, allocate_section_slides
+
+
+@dataclass
+class Section:
+    title: str
+    num_slides: int
+    summary: str = ""
+
+
+@dataclass
+class Outline:
+    title: str
+    subtitle: str
+    sections: list
+
+
+def counts(sections):
+    return [section.num_slides for section in sections]
+
+
+def test_counts_within_budget_are_kept():
+    sections = [Section("a", 2), Section("b", 3)]
+    assert counts(allocate_section_slides(sections, 8)) == [2, 3]
+
+
+def test_largest_sections_are_trimmed_first():
+    sections = [Section("a", 2), Section("b", 6), Section("c", 3)]
+    assert counts(allocate_section_slides(sections, 7)) == [2, 2, 3]
+
+
+def test_every_section_gets_at_least_one_slide():
+    sections = [Section("a", 0), Section("b", -1), Section("c", 4)]
+    assert counts(allocate_section_slides(sections, 6)) == [1, 1, 4]
+
+
+def test_sections_beyond_the_budget_and_untitled_ones_are_dropped():
+    sections = [Section(" ", 1), Section("a", 1), Section("b", 1), Section("c", 1)]
+    allocated = allocate_section_slides(sections, 2)
+    assert [section.title for section in allocated] == ["a", "b"]
+
+
+def test_no_budget_leaves_no_sections():
+    assert allocate_section_slides([Section("a", 3)], 0) == []
+
+
+def merged_deck(num_slides, section_slides):
+    sections = allocate_section_slides([Section(f"s{i}", 3) for i in range(len(section_slides))], num_slides - FIXED_SLIDES)
+    merger = SectionMerger(Outline("Title", "Subtitle", sections), num_slides)
+    merger.opening_slides()
+    for slides in section_slides[:len(sections)]:
+        merger.add_section(slides)
+    return merger.result()["content"]
+
+
+def test_merged_deck_never_exceeds_the_requested_size():
+    section_slides = [[{"title": f"s{i}-{j}"} for j in range(3)] for i in range(4)]
+    for num_slides in (3, 5, 8, 20):
+        deck = merged_deck(num_slides, section_slides)
+        assert len(deck) <= num_slides
+        assert [slide["title"] for slide in deck[:2]] == ["Title", "Agenda"]
+
+
+def test_repeated_formulas_are_dropped_and_names_made_unique():
+    outline = Outline("Title", "Subtitle", [Section("a", 1), Section("b", 1)])
+    merger = SectionMerger(outline, 10)
+    merger.opening_slides()
+    first = merger.add_section([{"formula_images": [{"formula": "x^2", "name": "square"}]}])
+    second = merger.add_section([{"formula_images": [
+        {"formula": "x^2", "name": "square"},
+        {"formula": "y^2", "name": "square"},
+        "not a formula"
+    ]}])
+    assert first[0]["formula_images"] == [{"formula": "x^2", "name": "square"}]
+    assert second[0]["formula_images"] == [{"formula": "y^2", "name": "square_2"}]
+
+
+def test_add_section_returns_only_the_slides_that_fit():
+    outline = Outline("Title", "Subtitle", [Section("a", 3)])
+    merger = SectionMerger(outline, 4)
+    assert len(merger.opening_slides()) == 2
+    assert merger.add_section([{"title": "1"}, {"title": "2"}, {"title": "3"}]) == [{"title": "1", "formula_images": []}, {"title": "2", "formula_images": []}]
+    assert merger.add_section([{"title": "4"}]) == []
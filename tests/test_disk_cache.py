@@ -0,0 +1,79 @@
+import os
+
+from disk_cache import DiskLRUCache
+
+
+def entry_names(cache):
+    return sorted(path.name for path in cache.directory.iterdir())
+
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = DiskLRUCache(tmp_path, max_bytes=1024, suffix=".bin")
+    path = cache.put_bytes("key", b"data")
+    assert path == tmp_path / "key.bin"
+    assert cache.get("key") == path
+    assert path.read_bytes() == b"data"
+    assert cache.get("missing") is None
+
+
+def test_put_copies_a_file(tmp_path):
+    source = tmp_path / "source.png"
+    source.write_bytes(b"png")
+    cache = DiskLRUCache(tmp_path / "cache", max_bytes=1024, suffix=".png")
+    assert cache.put("key", source).read_bytes() == b"png"
+    assert source.exists()
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    cache = DiskLRUCache(tmp_path, max_bytes=250, suffix=".bin")
+    cache.put_bytes("a", b"x" * 100)
+    cache.put_bytes("b", b"x" * 100)
+    assert cache.get("a") is not None  # a is now more recent than b
+    cache.put_bytes("c", b"x" * 100)
+    assert entry_names(cache) == ["a.bin", "c.bin"]
+    assert cache.total_bytes == 200
+    assert len(cache) == 2
+
+
+def test_overwriting_an_entry_replaces_its_size(tmp_path):
+    cache = DiskLRUCache(tmp_path, max_bytes=1024, suffix=".bin")
+    cache.put_bytes("a", b"x" * 100)
+    cache.put_bytes("a", b"x" * 10)
+    assert cache.total_bytes == 10
+    assert len(cache) == 1
+
+
+def test_entry_larger_than_the_budget_is_kept(tmp_path):
+    cache = DiskLRUCache(tmp_path, max_bytes=50, suffix=".bin")
+    cache.put_bytes("small", b"x" * 10)
+    path = cache.put_bytes("large", b"x" * 100)
+    assert path.exists()
+    assert entry_names(cache) == ["large.bin"]
+
+
+def test_zero_budget_never_evicts(tmp_path):
+    cache = DiskLRUCache(tmp_path, max_bytes=0, suffix=".bin")
+    for key in "abc":
+        cache.put_bytes(key, b"x" * 100)
+    assert entry_names(cache) == ["a.bin", "b.bin", "c.bin"]
+
+
+def test_index_is_rebuilt_from_disk_in_mtime_order(tmp_path):
+    for age, name in enumerate(["new.bin", "old.bin"]):
+        path = tmp_path / name
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 - age * 100, 1000 - age * 100))
+    (tmp_path / ".tmp_partial.bin").write_bytes(b"x" * 100)
+
+    cache = DiskLRUCache(tmp_path, max_bytes=250, suffix=".bin")
+    assert cache.total_bytes == 200
+    cache.put_bytes("newest", b"x" * 100)
+    assert "old.bin" not in entry_names(cache)
+    assert {"new.bin", "newest.bin"} <= set(entry_names(cache))
+
+
+def test_get_forgets_entries_deleted_behind_its_back(tmp_path):
+    cache = DiskLRUCache(tmp_path, max_bytes=1024, suffix=".bin")
+    cache.put_bytes("a", b"x" * 100).unlink()
+    assert cache.get("a") is None
+    assert cache.total_bytes == 0
@@ -0,0 +1,143 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pptx")
+
+from layout_mapper import fill_layout, layout_slots, plan_slide_layouts, score_layout, split_evenly
+
+TITLE_ONLY = {"title": ["Title 1_0"], "subtitle": [], "body": [], "picture": []}
+TITLE_SLIDE = {"title": ["Title 1_0"], "subtitle": ["Subtitle 2_1"], "body": [], "picture": []}
+TITLE_AND_CONTENT = {"title": ["Title 1_0"], "subtitle": [], "body": ["Content 2_1"], "picture": []}
+TWO_CONTENT = {"title": ["Title 1_0"], "subtitle": [], "body": ["Content 2_1", "Content 3_2"], "picture": []}
+PICTURE_WITH_CAPTION = {"title": ["Title 1_0"], "subtitle": [], "body": ["Text 3_2"], "picture": ["Picture 2_1"]}
+BLANK = {"title": [], "subtitle": [], "body": [], "picture": []}
+
+LAYOUTS = {
+    "title_only": TITLE_ONLY,
+    "title_slide": TITLE_SLIDE,
+    "title_and_content": TITLE_AND_CONTENT,
+    "two_content": TWO_CONTENT,
+    "picture_with_caption": PICTURE_WITH_CAPTION,
+    "blank": BLANK,
+}
+
+
+def best_layout(bullets, images, is_title_slide):
+    return max(LAYOUTS, key=lambda name: score_layout(LAYOUTS[name], bullets, images, is_title_slide))
+
+
+def test_title_slide_prefers_a_subtitle_frame():
+    assert best_layout(0, 0, True) == "title_slide"
+
+
+def test_text_slide_prefers_a_single_body():
+    assert best_layout(5, 0, False) == "title_and_content"
+
+
+def test_image_slide_prefers_a_picture_placeholder():
+    assert best_layout(3, 1, False) == "picture_with_caption"
+
+
+def test_content_without_a_place_costs_more_than_empty_placeholders():
+    assert score_layout(PICTURE_WITH_CAPTION, 0, 1, False) > score_layout(TITLE_ONLY, 0, 1, False)
+    assert score_layout(TITLE_AND_CONTENT, 4, 0, False) > score_layout(TITLE_ONLY, 4, 0, False)
+    assert score_layout(TITLE_ONLY, 0, 0, False) > score_layout(BLANK, 0, 0, False)
+
+
+def test_title_slide_avoids_picture_layouts():
+    assert score_layout(TITLE_SLIDE, 0, 0, True) > score_layout(PICTURE_WITH_CAPTION, 0, 0, True)
+
+
+def test_layout_slots_groups_placeholders_by_type_in_idx_order():
+    layout = {"placeholders": {
+        13: {"name": "Picture Placeholder 3", "type_id": 18},
+        0: {"name": "Title 1", "type_id": 1},
+        2: {"name": "Content Placeholder 2", "type_id": 7},
+        1: {"name": "Text Placeholder 4", "type_id": 2},
+        10: {"name": "Date Placeholder", "type_id": 16},
+    }}
+    assert layout_slots(layout) == {
+        "title": ["Title 1_0"],
+        "subtitle": [],
+        "body": ["Text Placeholder 4_1", "Content Placeholder 2_2"],
+        "picture": ["Picture Placeholder 3_13"],
+        "object": ["Content Placeholder 2_2"],
+    }
+
+
+def test_split_evenly_puts_the_remainder_first():
+    assert split_evenly(["a", "b", "c", "d", "e"], 2) == [["a", "b", "c"], ["d", "e"]]
+    assert split_evenly(["a"], 2) == [["a"], []]
+
+
+def test_fill_layout_uses_the_headline_and_splits_bullets():
+    slide = {"title": "Section", "subtitle": "Headline", "text": ["a", "b", "c", " "]}
+    assert fill_layout(TWO_CONTENT, slide, [], False) == {
+        "Title 1_0": "Headline",
+        "Content 2_1": "a\nb",
+        "Content 3_2": "c",
+    }
+
+
+def template_index(layouts):
+    """Just the parts of a TemplateIndex the mapper reads"""
+    return SimpleNamespace(path=Path("template.pptx"), layouts={
+        name: {"position": position, "placeholders": placeholders}
+        for position, (name, placeholders) in enumerate(layouts.items())
+    })
+
+
+# Like data/upload/7.pptx: content placeholders (OBJECT) but no PICTURE placeholder anywhere
+NO_PICTURE_TEMPLATE = {
+    "Title Slide": {0: {"name": "Title 1", "type_id": 3}, 1: {"name": "Subtitle 2", "type_id": 4}},
+    "Title and Content": {0: {"name": "Title 1", "type_id": 1}, 1: {"name": "Content Placeholder 2", "type_id": 7}},
+    "Two Content": {
+        0: {"name": "Title 1", "type_id": 1},
+        1: {"name": "Content Placeholder 2", "type_id": 7},
+        2: {"name": "Content Placeholder 3", "type_id": 7},
+    },
+}
+
+DECK = {"content": [
+    {"title": "Paper", "subtitle": "A subtitle", "text": []},
+    {"title": "Method", "subtitle": "Architecture", "text": ["a", "b"], "picture": ["data/figures/fig_1.png"]},
+    {"title": "Method", "subtitle": "Loss", "text": [], "formula_images": [{"formula": "data/formulas/loss.png", "name": "loss"}]},
+]}
+
+
+def test_images_go_into_content_placeholders_without_picture_layouts():
+    mapping, incomplete = plan_slide_layouts(DECK, template_index(NO_PICTURE_TEMPLATE))
+    assert incomplete == []
+    title, figure, formula = mapping["slides"]
+    assert title["slide_name"] == "Title Slide"
+    assert figure == {"slide_name": "Two Content", "placeholders": {
+        "Title 1_0": "Architecture",
+        "Content Placeholder 2_1": "a\nb",
+        "Content Placeholder 3_2": "data/figures/fig_1.png",
+    }}
+    assert formula == {"slide_name": "Title and Content", "placeholders": {
+        "Title 1_0": "Loss",
+        "Content Placeholder 2_1": "data/formulas/loss.png",
+    }}
+
+
+def test_slides_whose_images_cannot_be_placed_are_reported():
+    text_only = {
+        "Title Slide": NO_PICTURE_TEMPLATE["Title Slide"],
+        "Title and Text": {0: {"name": "Title 1", "type_id": 1}, 1: {"name": "Text Placeholder 2", "type_id": 2}},
+    }
+    _, incomplete = plan_slide_layouts(DECK, template_index(text_only))
+    assert incomplete == [1, 2]
+
+
+def test_picture_placeholders_are_preferred_over_content_placeholders():
+    template = dict(NO_PICTURE_TEMPLATE, **{"Picture with Caption": {
+        0: {"name": "Title 1", "type_id": 1},
+        1: {"name": "Picture Placeholder 2", "type_id": 18},
+        2: {"name": "Text Placeholder 3", "type_id": 2},
+    }})
+    mapping, incomplete = plan_slide_layouts(DECK, template_index(template))
+    assert incomplete == []
+    assert mapping["slides"][1]["slide_name"] == "Picture with Caption"
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight, flight_key
+
+
+def test_flight_key_separates_every_field():
+    assert flight_key("ocr", "m", "p", "d") == flight_key("ocr", "m", "p", "d")
+    assert flight_key("ocr", "m", "p", "d") != flight_key("ocr", "m", "pd", "")
+    assert flight_key("ocr", "m") != flight_key("analysis", "m")
+
+
+def test_concurrent_calls_with_the_same_key_share_one_call():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flight._tasks == {}
+
+
+def test_different_keys_and_later_calls_run_again():
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0)
+        return value
+
+    async def main():
+        flight = SingleFlight()
+        first = await asyncio.gather(flight.do("a", lambda: fetch("a")), flight.do("b", lambda: fetch("b")))
+        # Results are not cached once the flight has landed
+        second = await flight.do("a", lambda: fetch("a"))
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == ["a", "b"]
+    assert second == "a"
+    assert calls == ["a", "b", "a"]
+
+
+def test_errors_reach_every_waiter():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    async def main():
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert len(results) == 3
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_cancelling_one_waiter_does_not_cancel_the_call():
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "result"
+
+    async def main():
+        flight = SingleFlight()
+        first = asyncio.ensure_future(flight.do("key", fetch))
+        second = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "result"
+
+
+def test_failure_is_retrieved_when_every_waiter_was_cancelled(capsys):
+    loop_errors = []
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: loop_errors.append(context))
+        flight = SingleFlight()
+        waiter = asyncio.ensure_future(flight.do("key", fail))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0.05)
+        return flight
+
+    flight = asyncio.run(main())
+    assert flight._tasks == {}
+    assert "upstream failed" in capsys.readouterr().out
+    assert loop_errors == []
@@ -0,0 +1,60 @@
+import json
+
+from slide_stream import SlideStreamParser
+
+DECK = {
+    "content": [
+        {"title": "Attention", "subtitle": "Intro", "text": ["a", "b"], "formula_images": [], "picture": []},
+        {
+            "title": "Scaled dot product",
+            "subtitle": None,
+            "text": ["uses {braces} and [brackets] in text", "a \"quoted\" word"],
+            "formula_images": [{"formula": "\\frac{QK^T}{\\sqrt{d_k}}", "name": "attention"}],
+            "picture": ["figure 2"]
+        },
+        {"title": "Results", "subtitle": "BLEU", "text": [], "formula_images": [], "picture": []}
+    ]
+}
+
+
+def feed_in_chunks(parser, text, size):
+    slides = []
+    for start in range(0, len(text), size):
+        slides.extend(parser.feed(text[start:start + size]))
+    return slides
+
+
+def test_emits_every_slide_in_order_for_any_chunk_size():
+    text = json.dumps(DECK)
+    for size in (1, 3, 7, 64, len(text)):
+        parser = SlideStreamParser()
+        assert feed_in_chunks(parser, text, size) == DECK["content"]
+        assert parser.slides_emitted == len(DECK["content"])
+        assert parser.result() == DECK
+
+
+def test_slide_is_emitted_as_soon_as_it_is_closed():
+    text = json.dumps(DECK)
+    first_end = text.index('"picture": []}') + len('"picture": []}')
+    parser = SlideStreamParser()
+    assert parser.feed(text[:first_end - 1]) == []
+    assert parser.feed(text[first_end - 1:first_end]) == [DECK["content"][0]]
+
+
+def test_brackets_inside_strings_are_ignored():
+    parser = SlideStreamParser()
+    slides = parser.feed('{"content": [{"title": "x}]{", "text": ["\\"}"]}')
+    assert slides == [{"title": "x}]{", "text": ['"}']}]
+
+
+def test_nested_objects_are_not_emitted_as_slides():
+    parser = SlideStreamParser()
+    slides = parser.feed('{"content": [{"formula_images": [{"formula": "x", "name": "y"}]}]}')
+    assert slides == [{"formula_images": [{"formula": "x", "name": "y"}]}]
+
+
+def test_incomplete_stream_keeps_finished_slides():
+    text = json.dumps(DECK)
+    parser = SlideStreamParser()
+    slides = parser.feed(text[:text.index('"title": "Results"')])
+    assert slides == DECK["content"][:2]
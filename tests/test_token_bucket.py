@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("mistralai")
+
+import mistral_client
+from mistral_client import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(mistral_client.time, "monotonic", fake)
+    return fake
+
+
+def test_zero_rate_disables_the_bucket(clock):
+    bucket = TokenBucket(0)
+    assert all(bucket.reserve(1000) == 0.0 for _ in range(10))
+
+
+def test_burst_up_to_capacity_does_not_wait(clock):
+    bucket = TokenBucket(60)
+    assert [bucket.reserve(1) for _ in range(60)] == [0.0] * 60
+
+
+def test_reservations_over_capacity_are_spaced_at_the_fill_rate(clock):
+    bucket = TokenBucket(60)  # one token per second
+    bucket.reserve(60)
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    assert bucket.reserve(1) == pytest.approx(2.0)
+
+
+def test_bucket_refills_over_time_but_not_past_capacity(clock):
+    bucket = TokenBucket(60)
+    bucket.reserve(60)
+    clock.now += 30
+    assert bucket.reserve(30) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+    clock.now += 3600
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_single_reservation_larger_than_capacity_is_capped(clock):
+    bucket = TokenBucket(60)
+    assert bucket.reserve(10_000) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
@@ -0,0 +1,44 @@
+import pytest
+
+from utils import canonical_document_id, canonical_document_url, parse_arxiv_url
+
+
+@pytest.mark.parametrize("url", [
+    "https://arxiv.org/abs/1706.03762",
+    "https://arxiv.org/pdf/1706.03762",
+    "https://arxiv.org/pdf/1706.03762.pdf",
+    "http://arxiv.org/abs/1706.03762/",
+    "https://www.arxiv.org/abs/1706.03762?context=cs",
+    "https://export.arxiv.org/abs/1706.03762#section",
+    "  https://arxiv.org/abs/1706.03762  ",
+])
+def test_unversioned_spellings(url):
+    assert parse_arxiv_url(url) == ("1706.03762", None)
+
+
+@pytest.mark.parametrize("url", [
+    "https://arxiv.org/abs/2406.15758v2",
+    "https://arxiv.org/pdf/2406.15758v2",
+    "https://arxiv.org/pdf/2406.15758v2.pdf",
+])
+def test_versioned_spellings(url):
+    assert parse_arxiv_url(url) == ("2406.15758", "v2")
+
+
+@pytest.mark.parametrize("url", [
+    "https://example.com/abs/1706.03762",
+    "https://arxiv.org/list/cs.CL/recent",
+    "https://arxiv.org/abs/hep-th/9901001",
+    "arxiv.org/abs/1706.03762",
+    "",
+])
+def test_non_arxiv_urls(url):
+    assert parse_arxiv_url(url) is None
+
+
+def test_canonical_id_and_url():
+    assert canonical_document_id("https://arxiv.org/pdf/1706.03762.pdf") == "arxiv:1706.03762"
+    assert canonical_document_id("https://arxiv.org/abs/1706.03762v5") == "arxiv:1706.03762v5"
+    assert canonical_document_url("https://arxiv.org/abs/1706.03762v5") == "https://arxiv.org/pdf/1706.03762v5"
+    assert canonical_document_id(" https://example.com/paper.pdf ") == "https://example.com/paper.pdf"
+    assert canonical_document_url("https://example.com/paper.pdf") == "https://example.com/paper.pdf"
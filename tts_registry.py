@@ -0,0 +1,177 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Tuple
+
+import numpy as np
+
+from config import TTS_CONFIG, config
+from disk_cache import DiskLRUCache
+
+# Loaded MeloTTS models, keyed by (language, device)
+_models: Dict[Tuple[str, str], object] = {}
+_registry_lock = threading.Lock()
+_load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+
+def get_tts_model(language: str = TTS_CONFIG["language"], device: str = TTS_CONFIG["device"]):
+    """
+    Return the process-wide TTS model for a language/device pair.
+
+    The model is loaded on first use only; melo is imported lazily so services
+    that never synthesize speech do not pay for it at startup.
+    """
+    key = (language, device)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+
+    # One loader per key, other callers wait for it instead of loading a second copy
+    with load_lock:
+        model = _models.get(key)
+        if model is None:
+            from melo.api import TTS
+
+            start_time = time.time()
+            print(f"🔊 Loading TTS model language={language}, device={device}")
+            model = TTS(language=language, device=device)
+            _models[key] = model
+            print(f"✅ TTS model loaded in {time.time() - start_time:.2f}s")
+    return model
+
+
+def warm_up_tts_model(language: str = TTS_CONFIG["language"], device: str = TTS_CONFIG["device"]):
+    """Load the model and run one short synthesis so lazily loaded submodules are ready too"""
+    model = get_tts_model(language, device)
+    speaker_id = next(iter(model.hps.data.spk2id.values()))
+    fd, tmp_path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        start_time = time.time()
+        model.tts_to_file(text="Hello.", speaker_id=speaker_id, output_path=tmp_path, quiet=True)
+        print(f"🔥 TTS model warmed up in {time.time() - start_time:.2f}s")
+    finally:
+        os.remove(tmp_path)
+    return model
+
+
+# Process pool whose workers each hold their own warm model
+_pool = None
+_pool_workers = 0
+
+
+def _init_tts_worker(language: str, device: str):
+    # Runs once in every worker process; one synthesis thread per process avoids oversubscribing the cores
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    get_tts_model(language, device)
+
+
+def synthesize_segment(text: str, speaker: str, language: str = TTS_CONFIG["language"], device: str = TTS_CONFIG["device"]):
+    """
+    Synthesize one dialogue line with the given speaker accent (e.g. EN-US).
+
+    Returns:
+    - (samples, sampling_rate) with the raw float32 mono samples, nothing is written to disk.
+    """
+    model = get_tts_model(language, device)
+    audio = model.tts_to_file(
+        text=text,
+        speaker_id=model.hps.data.spk2id[speaker],
+        output_path=None,
+        sdp_ratio=TTS_CONFIG["sdp_ratio"],
+        noise_scale=TTS_CONFIG["noise_scale"],
+        noise_scale_w=TTS_CONFIG["noise_scale_w"],
+        speed=TTS_CONFIG["speed"],
+        quiet=True
+    )
+    return audio, model.hps.data.sampling_rate
+
+
+def get_tts_pool(workers: int = TTS_CONFIG["workers"], language: str = TTS_CONFIG["language"], device: str = TTS_CONFIG["device"]):
+    """
+    Return the shared synthesis process pool, creating it on first use.
+
+    Workers are spawned (not forked) so torch state is never shared, and load
+    their model once in the initializer, so later podcasts start warm.
+    """
+    global _pool, _pool_workers
+    with _registry_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            print(f"🔊 Starting TTS process pool with {workers} workers")
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_tts_worker,
+                initargs=(language, device)
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_tts_pool():
+    global _pool
+    with _registry_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+
+
+# Synthesized lines, shared by every podcast so reruns only pay for changed lines
+segment_cache = DiskLRUCache(
+    config.CACHE_DIR / "tts",
+    max_bytes=int(TTS_CONFIG["cache_max_mb"] * 1024 * 1024),
+    suffix=".npz"
+)
+
+
+def segment_cache_key(text: str, speaker: str, language: str = TTS_CONFIG["language"]) -> str:
+    """Cache key covering everything that changes the synthesized audio"""
+    params = {
+        "text": text,
+        "speaker": speaker,
+        "language": language,
+        "sdp_ratio": TTS_CONFIG["sdp_ratio"],
+        "noise_scale": TTS_CONFIG["noise_scale"],
+        "noise_scale_w": TTS_CONFIG["noise_scale_w"],
+        "speed": TTS_CONFIG["speed"]
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def load_cached_segment(text: str, speaker: str, language: str = TTS_CONFIG["language"]):
+    """Return a cached (samples, sampling_rate) for the line, or None on a miss"""
+    path = segment_cache.get(segment_cache_key(text, speaker, language))
+    if path is None:
+        return None
+    try:
+        with np.load(path) as data:
+            return data["samples"], int(data["sampling_rate"])
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable TTS cache entry {path}: {e}")
+        return None
+
+
+def cache_segment(text: str, speaker: str, language: str, segment):
+    """Store a synthesized (samples, sampling_rate) line in the segment cache"""
+    samples, sampling_rate = segment
+    try:
+        buffer = io.BytesIO()
+        np.savez(buffer, samples=np.asarray(samples, dtype=np.float32), sampling_rate=sampling_rate)
+        segment_cache.put_bytes(segment_cache_key(text, speaker, language), buffer.getvalue())
+    except Exception as e:
+        print(f"⚠️ Could not cache TTS segment: {e}")
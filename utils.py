@@ -1,6 +1,12 @@
 import json
 from pathlib import Path
 import re
+from typing import Optional, Tuple
+
+# abs/ and pdf/ pages, optional .pdf suffix and vN version of the same paper
+ARXIV_URL_PATTERN = re.compile(
+    r'^https?://(?:www\.|export\.)?arxiv\.org/(?:abs|pdf)/(\d{4}\.\d+)(v\d+)?(?:\.pdf)?/?(?:[?#].*)?$'
+)
 
 def load_json(path: Path):
     with open(path, "r", encoding="utf-8") as f:
@@ -19,6 +25,34 @@ def load_json(path: Path):
 
     return parsed
 
+def parse_arxiv_url(url: str) -> Optional[Tuple[str, Optional[str]]]:
+    """Return (arxiv id, version) for an arXiv URL, version is None for an unversioned URL"""
+    match = ARXIV_URL_PATTERN.match(url.strip())
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+def canonical_document_id(url: str) -> str:
+    """
+    Cache identity of a document URL.
+
+    Every spelling of the same arXiv paper and version (abs/ or pdf/, with or
+    without .pdf) maps to arxiv:<id>[vN]; any other URL is returned stripped.
+    """
+    parsed = parse_arxiv_url(url)
+    if parsed is None:
+        return url.strip()
+    arxiv_id, version = parsed
+    return f"arxiv:{arxiv_id}{version or ''}"
+
+def canonical_document_url(url: str) -> str:
+    """URL to fetch a document from, arXiv pages are resolved to their PDF"""
+    parsed = parse_arxiv_url(url)
+    if parsed is None:
+        return url.strip()
+    arxiv_id, version = parsed
+    return f"https://arxiv.org/pdf/{arxiv_id}{version or ''}"
+
 def save_json(data, path: Path):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4)
@@ -0,0 +1,107 @@
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from config import config
+
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class JobWorkspace:
+    """
+    Directory tree holding every intermediate file of one deck generation job.
+
+    Each job gets its own metadata/figures/formulas/output folders under
+    data/jobs/{job_id}, so several papers can be processed by the same worker
+    without overwriting each other's JSON files or images. A workspace without
+    a job id maps onto the legacy shared data/ directories.
+    """
+
+    def __init__(self, job_id: Optional[str] = None):
+        self.job_id = job_id
+        if job_id is None:
+            self.root = config.BASE_DIR / "data"
+            self.metadata_dir = Path(config.TEMPLATE_METADATA_DIR)
+            self.figures_dir = Path(config.FIGURES_DIR)
+            self.formulas_dir = Path(config.FORMULAS_DIR)
+            self.output_dir = Path(config.OUTPUT_DIR)
+        else:
+            self.root = Path(config.JOBS_DIR) / job_id
+            self.metadata_dir = self.root / "metadata"
+            self.figures_dir = self.root / "figures"
+            self.formulas_dir = self.root / "formulas"
+            self.output_dir = self.root / "output"
+
+    @property
+    def dirs(self):
+        return [self.metadata_dir, self.figures_dir, self.formulas_dir, self.output_dir]
+
+    def ensure(self) -> "JobWorkspace":
+        for directory in self.dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+        return self
+
+    def exists(self) -> bool:
+        return self.root.is_dir()
+
+    def remove(self):
+        """Delete the job directory (the legacy workspace is only emptied)"""
+        if self.job_id is not None:
+            shutil.rmtree(self.root, ignore_errors=True)
+            return
+        for directory in [self.figures_dir, self.formulas_dir]:
+            if directory.exists():
+                for path in directory.iterdir():
+                    if path.is_dir():
+                        shutil.rmtree(path, ignore_errors=True)
+                    else:
+                        path.unlink(missing_ok=True)
+
+
+def create_workspace() -> JobWorkspace:
+    """Create a fresh job workspace with a random job id"""
+    prune_workspaces()
+    workspace = JobWorkspace(uuid.uuid4().hex).ensure()
+    print(f"📁 Created job workspace {workspace.job_id}")
+    return workspace
+
+
+def open_workspace(job_id: Optional[str] = None) -> JobWorkspace:
+    """
+    Return the workspace for an existing job.
+
+    Raises:
+    - ValueError if the job id is malformed
+    - FileNotFoundError if no workspace exists for the job id
+    """
+    if not job_id:
+        return JobWorkspace().ensure()
+    if not JOB_ID_PATTERN.match(job_id):
+        raise ValueError(f"Invalid job id: {job_id}")
+    workspace = JobWorkspace(job_id)
+    if not workspace.exists():
+        raise FileNotFoundError(f"Job {job_id} not found. Run analyze/url or analyze/pdf first.")
+    # Keep active jobs away from prune_workspaces
+    os.utime(workspace.root)
+    return workspace.ensure()
+
+
+def prune_workspaces(max_age_hours: Optional[float] = None):
+    """Remove job workspaces that have not been modified for max_age_hours"""
+    if max_age_hours is None:
+        max_age_hours = config.JOB_TTL_HOURS
+    jobs_dir = Path(config.JOBS_DIR)
+    if max_age_hours <= 0 or not jobs_dir.exists():
+        return
+    cutoff = time.time() - max_age_hours * 3600
+    for job_dir in jobs_dir.iterdir():
+        try:
+            if job_dir.is_dir() and job_dir.stat().st_mtime < cutoff:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                print(f"🧹 Removed expired job workspace {job_dir.name}")
+        except Exception as e:
+            print(f"❌ Error pruning {job_dir}: {e}")